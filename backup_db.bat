@@ -0,0 +1,16 @@
+@echo off
+chcp 65001 >nul
+title Home Inn Cafe - Backup
+
+REM Hot backup of db.sqlite3 - safe to run while the tills are in service.
+REM Schedule with Windows Task Scheduler, e.g. every hour:
+REM   schtasks /create /tn "HomeInnCafeBackup" /sc hourly /tr "%~dp0backup_db.bat"
+
+cd /d "%~dp0"
+
+python manage.py backup_db
+if %errorlevel% neq 0 (
+    echo.
+    echo ❌ Backup failed! See the errors above.
+    exit /b 1
+)
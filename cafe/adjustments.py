@@ -0,0 +1,124 @@
+"""
+Voids and partial refunds.
+
+A sale is never edited away or deleted. ``void_order`` and ``refund_items``
+mark the reversed quantities on the order and its lines, so raw queries
+can net them out. In the same transaction they append an
+``OrderAdjustment`` audit row and an ``OrderChange`` for replication, and
+subtract the reversal from the hourly rollups of the original order's
+hour. Reports therefore stay correct without recomputing history.
+
+Every write is a conditional UPDATE and the order row is always written
+first. Two tills reversing the same order serialize on that row, and
+neither can refund a line twice.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Order, OrderAdjustment, OrderChange, OrderItem
+from .rollups import apply_delta
+
+
+CHANGE_ACTIONS = {
+    OrderAdjustment.KIND_VOID: OrderChange.ACTION_VOID,
+    OrderAdjustment.KIND_REFUND: OrderChange.ACTION_REFUND,
+}
+
+
+class AdjustmentError(Exception):
+    """A void or refund that cannot be applied; the message is user-facing."""
+
+    def __init__(self, message, status=400):
+        self.message = message
+        self.status = status
+        super().__init__(message)
+
+
+def _get_order(order_id):
+    # Archived orders are closed history and cannot be reversed
+    order = Order.objects.filter(id=order_id).first()
+    if order is None:
+        raise AdjustmentError('الطلب غير موجود أو مؤرشف', status=404)
+    return order
+
+
+def void_order(order_id, reason=''):
+    """Void a whole order, reversing whatever has not been refunded yet."""
+    order = _get_order(order_id)
+
+    with transaction.atomic():
+        if not Order.objects.filter(id=order.id, is_voided=False).update(is_voided=True):
+            raise AdjustmentError('الطلب ملغى مسبقاً', status=409)
+
+        # The order row is written, so its lines can no longer change under us
+        lines = [
+            (item.item_name, item.quantity - item.refunded_quantity, item.unit_price)
+            for item in OrderItem.objects.filter(order_id=order.id)
+            if item.quantity > item.refunded_quantity
+        ]
+        amount = sum(quantity * unit_price for _, quantity, unit_price in lines)
+
+        OrderItem.objects.filter(order_id=order.id).update(refunded_quantity=F('quantity'))
+        Order.objects.filter(id=order.id).update(refunded_amount=F('refunded_amount') + amount)
+
+        return _record(order, OrderAdjustment.KIND_VOID, amount, lines, reason, orders_delta=-1)
+
+
+def refund_items(order_id, quantities, reason=''):
+    """Refund part of an order; ``quantities`` maps order line id to quantity."""
+    order = _get_order(order_id)
+    if not quantities:
+        raise AdjustmentError('لا توجد أصناف للاسترداد')
+
+    order_lines = OrderItem.objects.filter(order_id=order.id).in_bulk(list(quantities))
+    lines = []
+    for line_id, quantity in sorted(quantities.items()):
+        line = order_lines.get(line_id)
+        if line is None:
+            raise AdjustmentError('الصنف غير موجود في الطلب')
+        if quantity < 1:
+            raise AdjustmentError('كمية غير صالحة')
+        lines.append((line, quantity))
+    amount = sum(line.unit_price * quantity for line, quantity in lines)
+
+    with transaction.atomic():
+        if not Order.objects.filter(id=order.id, is_voided=False).update(
+            refunded_amount=F('refunded_amount') + amount
+        ):
+            raise AdjustmentError('الطلب ملغى مسبقاً', status=409)
+
+        for line, quantity in lines:
+            if not OrderItem.objects.filter(
+                id=line.id, refunded_quantity__lte=F('quantity') - quantity
+            ).update(refunded_quantity=F('refunded_quantity') + quantity):
+                raise AdjustmentError(f'الكمية المستردة أكبر من المتبقي: {line.item_name}')
+
+        return _record(
+            order, OrderAdjustment.KIND_REFUND, amount,
+            [(line.item_name, quantity, line.unit_price) for line, quantity in lines],
+            reason, orders_delta=0,
+        )
+
+
+def _record(order, kind, amount, lines, reason, orders_delta):
+    """Audit row, replication entry and compensating rollup deltas."""
+    adjustment = OrderAdjustment.objects.create(
+        order_id=order.id,
+        order_number=order.order_number,
+        kind=kind,
+        amount=amount,
+        lines=[[item_name, quantity, quantity * unit_price] for item_name, quantity, unit_price in lines],
+        reason=reason,
+    )
+    OrderChange.objects.create(order_id=order.id, action=CHANGE_ACTIONS[kind])
+
+    item_deltas = defaultdict(lambda: [0, 0])
+    for item_name, quantity, unit_price in lines:
+        item_deltas[item_name][0] -= quantity
+        item_deltas[item_name][1] -= quantity * unit_price
+    apply_delta(order.created_at, orders_delta, -amount, item_deltas)
+
+    return adjustment
@@ -1,6 +1,36 @@
-from django.contrib import admin
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Category, MenuItem, Order, OrderItem
+from .adjustments import AdjustmentError, void_order
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, BranchDailySales, BranchOrder, BundleItem, Category, ImageBlob,
+    Ingredient, MenuItem, Order, OrderAdjustment, OrderItem, PriceRule, ProfileCapture, RecipeLine, Shift,
+    Station, SyncState, Ticket,
+)
+from .paginators import EstimatedCountPaginator
+from .profiling import COOKIE_NAME, SALT, token_max_age
+from .routers import reporting
+from .storage import image_storage
+
+
+class ReportingChangelistMixin:
+    """Serve changelist pages (GET only) from the read-only reporting database."""
+    
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with reporting():
+            response = super().changelist_view(request, extra_context)
+            # Render inside the block; the result list is evaluated lazily
+            if hasattr(response, 'render'):
+                response.render()
+        return response
 
 
 # Customize admin site header for Arabic
@@ -9,24 +39,42 @@ admin.site.site_title = 'هوم إن كافيه'
 admin.site.index_title = 'إدارة المقهى'
 
 
+@admin.register(Station)
+class StationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'order', 'is_active']
+    list_editable = ['order', 'is_active']
+    prepopulated_fields = {'slug': ['name']}
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'order', 'is_active', 'items_count', 'created_at']
-    list_editable = ['order', 'is_active']
+    list_display = ['name', 'order', 'is_active', 'station', 'items_count', 'created_at']
+    list_editable = ['order', 'is_active', 'station']
     search_fields = ['name']
-    list_filter = ['is_active']
+    list_filter = ['is_active', 'station']
     ordering = ['order']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('station').annotate(items_count=Count('items'))
+    
     def items_count(self, obj):
-        return obj.items.count()
+        return obj.items_count
     items_count.short_description = 'عدد الأصناف'
+    items_count.admin_order_field = 'items_count'
+
+
+class RecipeLineInline(admin.TabularInline):
+    model = RecipeLine
+    extra = 1
+    autocomplete_fields = ['ingredient']
 
 
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'display_price', 'is_available', 'image_preview']
-    list_editable = ['is_available']
+    list_display = ['name', 'category', 'display_price', 'is_available', 'stock_quantity', 'image_preview']
+    list_editable = ['is_available', 'stock_quantity']
     list_filter = ['category', 'is_available']
+    list_select_related = ['category']
     search_fields = ['name', 'description']
     ordering = ['category__order', 'name']
     
@@ -35,9 +83,10 @@ class MenuItemAdmin(admin.ModelAdmin):
             'fields': ('name', 'category', 'price', 'description')
         }),
         ('الصورة والحالة', {
-            'fields': ('image', 'is_available')
+            'fields': ('image', 'is_available', 'stock_quantity')
         }),
     )
+    inlines = [RecipeLineInline]
     
     def display_price(self, obj):
         return f"{obj.price:,} د.ع"
@@ -51,10 +100,100 @@ class MenuItemAdmin(admin.ModelAdmin):
     image_preview.short_description = 'الصورة'
 
 
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ['name', 'stock_quantity', 'unit', 'updated_at']
+    list_editable = ['stock_quantity']
+    search_fields = ['name']
+
+
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'image_preview', 'display_size', 'ref_count', 'created_at', 'updated_at']
+    list_filter = ['ref_count']
+    readonly_fields = ['name', 'size', 'ref_count', 'created_at', 'updated_at']
+    
+    def display_size(self, obj):
+        return f"{obj.size / 1024:,.0f} KB"
+    display_size.short_description = 'الحجم'
+    display_size.admin_order_field = 'size'
+    
+    def image_preview(self, obj):
+        return format_html(
+            '<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 4px;" />',
+            image_storage().url(obj.name)
+        )
+    image_preview.short_description = 'الصورة'
+    
+    def has_add_permission(self, request):
+        return False  # Created by uploads; deleted by gc_images
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class BundleItemInline(admin.TabularInline):
+    model = BundleItem
+    extra = 2
+    autocomplete_fields = ['menu_item']
+
+
+WEEKDAY_NAMES = ['الاثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد']
+
+
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'display_scope', 'display_price', 'display_window', 'is_active']
+    list_editable = ['is_active']
+    list_filter = ['kind', 'is_active']
+    list_select_related = ['menu_item', 'category']
+    search_fields = ['name']
+    autocomplete_fields = ['menu_item', 'category']
+    
+    fieldsets = (
+        ('القاعدة', {
+            'fields': ('name', 'kind', 'is_active')
+        }),
+        ('السعر', {
+            'fields': ('menu_item', 'category', 'percent_off', 'fixed_price'),
+            'description': 'للخصم: اختر صنفاً أو تصنيفاً (أو لا شيء لكل القائمة) ثم النسبة أو السعر. '
+                           'لعرض المجموعة: السعر الثابت فقط، والأصناف في الجدول أدناه.'
+        }),
+        ('التوقيت', {
+            'fields': ('weekdays', 'start_time', 'end_time')
+        }),
+    )
+    inlines = [BundleItemInline]
+    
+    def display_scope(self, obj):
+        if obj.kind == PriceRule.KIND_BUNDLE:
+            return 'مجموعة'
+        return obj.menu_item or obj.category or 'كل القائمة'
+    display_scope.short_description = 'يطبق على'
+    
+    def display_price(self, obj):
+        if obj.percent_off is not None:
+            return f"-{obj.percent_off}%"
+        return f"{obj.fixed_price:,} د.ع"
+    display_price.short_description = 'السعر / الخصم'
+    
+    def display_window(self, obj):
+        days = '، '.join(WEEKDAY_NAMES[int(day)] for day in sorted(obj.weekdays)) or 'كل الأيام'
+        if obj.start_time is None:
+            return days
+        return f"{days} {obj.start_time:%H:%M}-{obj.end_time:%H:%M}"
+    display_window.short_description = 'التوقيت'
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ['item_name', 'quantity', 'unit_price', 'subtotal']
+    readonly_fields = ['item_name', 'quantity', 'unit_price', 'subtotal', 'refunded_quantity', 'list_price',
+                       'price_rule_name']
+    exclude = ['price_rule']
     can_delete = False
     
     def has_add_permission(self, request, obj=None):
@@ -62,14 +201,20 @@ class OrderItemInline(admin.TabularInline):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ['order_number', 'created_at', 'display_total', 'display_paid', 'display_change', 'is_printed']
-    list_filter = ['is_printed', 'created_at']
+class OrderAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ['order_number', 'created_at', 'display_total', 'display_paid', 'display_change', 'is_printed',
+                    'is_voided']
+    list_filter = ['is_printed', 'is_voided', 'created_at']
     search_fields = ['order_number']
-    readonly_fields = ['order_number', 'created_at', 'total_amount', 'amount_paid', 'change_given']
+    readonly_fields = ['order_number', 'created_at', 'total_amount', 'amount_paid', 'change_given',
+                       'is_voided', 'refunded_amount']
+    actions = ['void_selected']
     ordering = ['-created_at']
-    date_hierarchy = 'created_at'
     inlines = [OrderItemInline]
+    # No date_hierarchy: its drilldown runs DISTINCT date queries over the
+    # whole table. The created_at list filter offers fixed ranges instead.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def display_total(self, obj):
         return f"{obj.total_amount:,} د.ع"
@@ -83,16 +228,288 @@ class OrderAdmin(admin.ModelAdmin):
         return f"{obj.change_given:,} د.ع"
     display_change.short_description = 'الباقي'
     
+    @admin.action(description='إلغاء الطلبات المحددة')
+    def void_selected(self, request, queryset):
+        voided = 0
+        for order_id in queryset.filter(is_voided=False).values_list('id', flat=True):
+            try:
+                void_order(order_id, reason=f'admin: {request.user}')
+                voided += 1
+            except AdjustmentError:
+                continue  # Voided concurrently
+        self.message_user(request, f'تم إلغاء {voided} طلب')
+    
     def has_add_permission(self, request):
         return False  # Orders are created through the POS only
+    
+    def has_delete_permission(self, request, obj=None):
+        return False  # Deleting would corrupt the rollups; void instead
+
+
+@admin.register(OrderAdjustment)
+class OrderAdjustmentAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'order_number', 'kind', 'display_amount', 'reason']
+    list_filter = ['kind']
+    search_fields = ['order_number']
+    
+    def display_amount(self, obj):
+        return f"{obj.amount:,} د.ع"
+    display_amount.short_description = 'المبلغ'
+    display_amount.admin_order_field = 'amount'
+    
+    # Append-only audit trail
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class OrderDateListFilter(admin.SimpleListFilter):
+    """Filter order lines by their order's date without joining Order.
+
+    The date range is resolved against the indexed Order.created_at in a
+    subquery, and the lines are then matched on their indexed order_id.
+    """
+    title = 'تاريخ الطلب'
+    parameter_name = 'order_date'
+    
+    def lookups(self, request, model_admin):
+        return [
+            ('today', 'اليوم'),
+            ('7days', 'آخر 7 أيام'),
+            ('month', 'هذا الشهر'),
+            ('year', 'هذه السنة'),
+        ]
+    
+    def queryset(self, request, queryset):
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        starts = {
+            'today': today,
+            '7days': today - timedelta(days=6),
+            'month': today.replace(day=1),
+            'year': today.replace(month=1, day=1),
+        }
+        start = starts.get(self.value())
+        if start is None:
+            return queryset
+        return queryset.filter(
+            order_id__in=Order.objects.filter(created_at__gte=start).values('id')
+        )
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ['order', 'item_name', 'quantity', 'unit_price', 'subtotal']
-    list_filter = ['order__created_at']
-    search_fields = ['item_name', 'order__order_number']
-    readonly_fields = ['order', 'menu_item', 'item_name', 'quantity', 'unit_price', 'subtotal']
+class OrderItemAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ['order', 'item_name', 'quantity', 'unit_price', 'subtotal', 'price_rule_name']
+    list_filter = [OrderDateListFilter]
+    list_select_related = ['order']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ['item_name', 'order__order_number', 'price_rule_name']
+    readonly_fields = ['order', 'menu_item', 'item_name', 'quantity', 'unit_price', 'subtotal', 'list_price',
+                       'price_rule', 'price_rule_name']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    readonly_fields = ['item_name', 'quantity', 'unit_price', 'subtotal', 'refunded_quantity', 'list_price',
+                       'price_rule_name']
+    fields = readonly_fields
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ['order_number', 'created_at', 'display_total', 'archived_at']
+    search_fields = ['order_number']
+    ordering = ['-created_at']
+    inlines = [ArchivedOrderItemInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def display_total(self, obj):
+        return f"{obj.total_amount:,} د.ع"
+    display_total.short_description = 'المجموع'
+    
+    def has_add_permission(self, request):
+        return False  # Filled by the archive_orders command only
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# ==================== Branch Replication ====================
+
+@admin.register(SyncState)
+class SyncStateAdmin(admin.ModelAdmin):
+    list_display = ['target', 'last_change_id', 'updated_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(BranchDailySales)
+class BranchDailySalesAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ['date', 'branch', 'orders_count', 'display_revenue']
+    list_filter = ['branch']
+    ordering = ['-date', 'branch']
+    
+    def display_revenue(self, obj):
+        return f"{obj.revenue:,} د.ع"
+    display_revenue.short_description = 'الإيرادات'
+    display_revenue.admin_order_field = 'revenue'
+    
+    def has_add_permission(self, request):
+        return False  # Maintained by branch sync ingest only
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BranchOrder)
+class BranchOrderAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ['order_number', 'branch', 'created_at', 'display_total', 'is_voided', 'received_at']
+    list_filter = ['branch']
+    search_fields = ['order_number']
+    ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def display_total(self, obj):
+        return f"{obj.total_amount:,} د.ع"
+    display_total.short_description = 'المجموع'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Shift)
+class ShiftAdmin(admin.ModelAdmin):
+    list_display = ['closed_at', 'opened_at', 'orders_count', 'voided_count', 'display_revenue', 'display_net_cash',
+                    'first_order_number', 'last_order_number']
+    readonly_fields = ['opened_at', 'closed_at', 'orders_count', 'voided_count', 'total_revenue', 'cash_in',
+                       'cash_out',
+                       'refunds', 'first_order_number', 'last_order_number', 'item_summary']
+    date_hierarchy = 'closed_at'
+    
+    def display_revenue(self, obj):
+        return obj.formatted_revenue
+    display_revenue.short_description = 'المبيعات'
+    display_revenue.admin_order_field = 'total_revenue'
+    
+    def display_net_cash(self, obj):
+        return f"{obj.net_cash:,} د.ع"
+    display_net_cash.short_description = 'صافي النقد'
+    
+    def has_add_permission(self, request):
+        return False  # Created by closing a shift only
+
+
+@admin.register(Ticket)
+class TicketAdmin(admin.ModelAdmin):
+    list_display = ['order_number', 'station', 'status', 'created_at', 'updated_at']
+    list_filter = ['station', 'status']
+    search_fields = ['order_number']
+    list_select_related = ['station']
+    
+    # Status changes must go through bump/complete, which advance the version
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'status_code', 'duration_ms', 'sql_count', 'sql_time_ms',
+                    'download_links']
+    list_filter = ['method', 'status_code']
+    search_fields = ['path']
+    fields = ['created_at', 'method', 'path', 'status_code', 'duration_ms', 'sql_count', 'sql_time_ms',
+              'download_links', 'display_summary', 'display_sql']
+    readonly_fields = fields
+    change_list_template = 'admin/cafe/profilecapture/change_list.html'
+    
+    def get_urls(self):
+        return [
+            path('toggle/', self.admin_site.admin_view(self.toggle_view), name='cafe_profilecapture_toggle'),
+            path('<int:capture_id>/download/<str:kind>/', self.admin_site.admin_view(self.download_view),
+                 name='cafe_profilecapture_download'),
+        ] + super().get_urls()
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            'profiling_enabled': request.get_signed_cookie(
+                COOKIE_NAME, default=None, salt=SALT, max_age=token_max_age()
+            ) is not None,
+        }
+        return super().changelist_view(request, extra_context)
+    
+    def toggle_view(self, request):
+        """Turn profiling of this browser's (non-admin) requests on or off"""
+        response = HttpResponseRedirect(reverse('admin:cafe_profilecapture_changelist'))
+        if request.method != 'POST':
+            return response
+        if request.COOKIES.get(COOKIE_NAME):
+            response.delete_cookie(COOKIE_NAME)
+            self.message_user(request, 'تم إيقاف تتبع الأداء')
+        else:
+            response.set_signed_cookie(COOKIE_NAME, '1', salt=SALT, max_age=token_max_age(), httponly=True)
+            self.message_user(request, 'تم تفعيل تتبع الأداء لطلبات هذا المتصفح لمدة ساعة', messages.WARNING)
+        return response
+    
+    def download_view(self, request, capture_id, kind):
+        capture = get_object_or_404(ProfileCapture, id=capture_id)
+        if kind == 'prof':
+            response = HttpResponse(bytes(capture.stats), content_type='application/octet-stream')
+            filename = f'capture-{capture.id}.prof'
+        elif kind == 'sql':
+            response = HttpResponse(self._sql_text(capture), content_type='text/plain; charset=utf-8')
+            filename = f'capture-{capture.id}.sql'
+        else:
+            return HttpResponse(status=404)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    def download_links(self, obj):
+        return format_html(
+            '<a href="{}">.prof</a> | <a href="{}">.sql</a>',
+            reverse('admin:cafe_profilecapture_download', args=[obj.id, 'prof']),
+            reverse('admin:cafe_profilecapture_download', args=[obj.id, 'sql']),
+        )
+    download_links.short_description = 'تنزيل'
+    
+    def display_summary(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.summary)
+    display_summary.short_description = 'ملخص الدوال (تراكمي)'
+    
+    def display_sql(self, obj):
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', self._sql_text(obj))
+    display_sql.short_description = 'الاستعلامات'
+    
+    @staticmethod
+    def _sql_text(capture):
+        return '\n\n'.join(
+            f"-- #{number} [{query['alias']}] {query['ms']} ms{' (many)' if query['many'] else ''}\n"
+            f"-- params: {query['params']}\n{query['sql']};"
+            for number, query in enumerate(capture.sql_trace, start=1)
+        )
     
     def has_add_permission(self, request):
         return False
@@ -0,0 +1,226 @@
+"""
+Admission control for write APIs.
+
+SQLite lets one connection write at a time. At rush hour every till, the
+kitchen screens and the menu editor write together. Their requests then
+pile up in server threads, waiting on the database lock until they fail
+with "database is locked", each after a different delay.
+
+Writes now pass through a ``WriteGate`` per database before the view
+runs. A gate has a fixed number of slots (``slots``). Requests that find
+them taken wait in a priority queue:
+
+* ``checkout``: new orders, the only writes a customer is waiting for
+* ``service``: kitchen bumps, voids, refunds, shift close, branch sync
+* ``menu``: menu and category edits, which can wait for a quiet moment
+
+A request that would wait behind more than its class's ``queue`` limit,
+or longer than its ``wait`` limit, is turned away at once with a 503 and
+a ``Retry-After`` estimate. The view has not run, so retrying is safe.
+Menu edits get short limits and checkouts long ones, so under load the
+menu editor fails fast while orders still get in.
+
+Queue waits, rejections and timeouts are counted per class and served by
+``api/admission/`` (see ``snapshot``). The gate is per process, which
+suits the single-process ``serve`` launcher.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .responses import JsonResponse
+
+
+# Highest priority first
+PRIORITIES = ('checkout', 'service', 'menu')
+
+DEFAULTS = {
+    'slots': 1,
+    'queue': {'checkout': 32, 'service': 16, 'menu': 4},
+    'wait': {'checkout': 10, 'service': 5, 'menu': 2},
+}
+
+# Waits kept per class for the percentiles in snapshot()
+RECENT_WAITS = 1000
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class Overloaded(Exception):
+    """Raised instead of admitting a write; ``retry_after`` is in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'write queue full, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class ClassStats:
+    """Counters for one priority class (updated under the gate's lock)."""
+
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.waiting = 0
+        self.max_wait = 0.0
+        self.recent = deque(maxlen=RECENT_WAITS)
+
+    def record_wait(self, seconds):
+        self.admitted += 1
+        self.max_wait = max(self.max_wait, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self):
+        waits = sorted(self.recent)
+
+        def percentile(fraction):
+            return round(waits[min(len(waits) - 1, int(len(waits) * fraction))] * 1000, 1) if waits else 0.0
+
+        return {
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'waiting': self.waiting,
+            'wait_ms': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(self.max_wait * 1000, 1),
+            },
+        }
+
+
+class WriteGate:
+    """Bounded, prioritised admission of writers to one database."""
+
+    def __init__(self, slots=1, queue=None, wait=None):
+        self.slots = slots
+        self.queue_limits = {**DEFAULTS['queue'], **(queue or {})}
+        self.wait_limits = {**DEFAULTS['wait'], **(wait or {})}
+        self.stats = {priority: ClassStats() for priority in PRIORITIES}
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._queue = []  # heap of (rank, sequence) tickets
+        self._sequence = itertools.count()
+        # Moving average of how long a writer holds its slot, for Retry-After
+        self._hold = 0.05
+
+    def retry_after(self, ahead):
+        return min(30, max(1, math.ceil(self._hold * (ahead + 1) / self.slots)))
+
+    @contextmanager
+    def admit(self, priority):
+        """Hold a slot for the duration of the block; raises Overloaded."""
+        rank = PRIORITIES.index(priority)
+        stats = self.stats[priority]
+        started = time.monotonic()
+
+        with self._condition:
+            if self._in_flight < self.slots and not self._queue:
+                self._in_flight += 1
+            else:
+                ahead = sum(1 for ticket_rank, _ in self._queue if ticket_rank <= rank)
+                if ahead >= self.queue_limits[priority]:
+                    stats.rejected += 1
+                    raise Overloaded(self.retry_after(ahead))
+                self._wait_turn(rank, stats, started + self.wait_limits[priority], ahead)
+            stats.record_wait(time.monotonic() - started)
+
+        acquired = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._hold = 0.9 * self._hold + 0.1 * (time.monotonic() - acquired)
+                self._condition.notify_all()
+
+    def _wait_turn(self, rank, stats, deadline, ahead):
+        ticket = (rank, next(self._sequence))
+        heapq.heappush(self._queue, ticket)
+        stats.waiting += 1
+        try:
+            while not (self._in_flight < self.slots and self._queue[0] == ticket):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    # The head of the queue may have changed
+                    self._condition.notify_all()
+                    stats.timed_out += 1
+                    raise Overloaded(self.retry_after(ahead))
+                self._condition.wait(remaining)
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            # With several slots, the next ticket may be admitted too
+            self._condition.notify_all()
+        finally:
+            stats.waiting -= 1
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                'slots': self.slots,
+                'in_flight': self._in_flight,
+                'waiting': len(self._queue),
+                'hold_ms': round(self._hold * 1000, 1),
+                'classes': {priority: stats.snapshot() for priority, stats in self.stats.items()},
+            }
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def get_gate(using=DEFAULT_DB_ALIAS):
+    """The gate of one database, built from CAFE_WRITE_ADMISSION on first use."""
+    gate = _gates.get(using)
+    if gate is None:
+        with _gates_lock:
+            gate = _gates.get(using)
+            if gate is None:
+                config = {**DEFAULTS, **getattr(settings, 'CAFE_WRITE_ADMISSION', {})}
+                gate = _gates[using] = WriteGate(config['slots'], config['queue'], config['wait'])
+    return gate
+
+
+def snapshot():
+    get_gate()  # Report the default gate even before its first write
+    return {using: gate.snapshot() for using, gate in list(_gates.items())}
+
+
+def write_view(priority, using=DEFAULT_DB_ALIAS):
+    """Decorator: admit a view's writes through the gate of ``using``.
+
+    Reads (GET/HEAD/OPTIONS) on the same view are not gated.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f'Unknown write priority: {priority}')
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in SAFE_METHODS:
+                return view(request, *args, **kwargs)
+            try:
+                with get_gate(using).admit(priority):
+                    return view(request, *args, **kwargs)
+            except Overloaded as e:
+                response = JsonResponse({
+                    'success': False,
+                    'error': 'النظام مشغول حالياً، أعد المحاولة بعد لحظات',
+                    'retry_after': e.retry_after,
+                }, status=503)
+                response['Retry-After'] = str(e.retry_after)
+                return response
+        return wrapper
+    return decorator
@@ -5,3 +5,21 @@ class CafeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cafe'
     verbose_name = 'إدارة المقهى'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from . import pricing, storage
+        from .models import BundleItem, MenuItem, PriceRule
+        from .routers import enable_wal
+
+        connection_created.connect(enable_wal, dispatch_uid='cafe_enable_wal')
+
+        # Recompile the in-memory price table when rules change
+        for model in (PriceRule, BundleItem):
+            post_save.connect(pricing.invalidate, sender=model, dispatch_uid=f'cafe_pricing_save_{model.__name__}')
+            post_delete.connect(pricing.invalidate, sender=model, dispatch_uid=f'cafe_pricing_delete_{model.__name__}')
+
+        # Reference-count menu images in the content-addressed store
+        post_save.connect(storage.track_image_change, sender=MenuItem, dispatch_uid='cafe_image_save')
+        post_delete.connect(storage.release_image, sender=MenuItem, dispatch_uid='cafe_image_delete')
@@ -0,0 +1,63 @@
+"""
+Order archive: cold storage for old orders.
+
+``archive_orders`` moves whole days of orders out of the hot ``Order`` /
+``OrderItem`` tables into ``ArchivedOrder`` / ``ArchivedOrderItem``. Every
+archived order is older than every live order, so read paths only need to
+touch the archive when the requested date range reaches back past the
+archive boundary.
+"""
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+
+ORDER_FIELDS = [
+    'id', 'order_number', 'created_at', 'total_amount', 'amount_paid',
+    'change_given', 'notes', 'is_printed', 'is_voided', 'refunded_amount',
+]
+
+ORDER_ITEM_FIELDS = [
+    'id', 'order_id', 'menu_item_id', 'item_name', 'quantity', 'unit_price', 'subtotal',
+    'refunded_quantity', 'list_price', 'price_rule_id', 'price_rule_name',
+]
+
+
+def archive_boundary():
+    """Return the ``created_at`` of the newest archived order, or None."""
+    return ArchivedOrder.objects.aggregate(boundary=Max('created_at'))['boundary']
+
+
+def range_needs_archive(date_from):
+    """True when a query starting at ``date_from`` (None = unbounded) reaches the archive."""
+    boundary = archive_boundary()
+    return boundary is not None and (date_from is None or date_from <= boundary)
+
+
+def archived_orders(search='', date_from=None, date_to=None):
+    """Archived orders filtered the same way ``api_orders`` filters live ones."""
+    orders = ArchivedOrder.objects.order_by('-created_at')
+    if search:
+        orders = orders.filter(order_number__icontains=search)
+    if date_from:
+        orders = orders.filter(created_at__gte=date_from)
+    if date_to:
+        orders = orders.filter(created_at__lte=date_to)
+    return orders
+
+
+def move_orders(order_ids):
+    """Move one chunk of orders (and their lines) into the archive atomically."""
+    with transaction.atomic():
+        orders = list(Order.objects.filter(id__in=order_ids).values(*ORDER_FIELDS))
+        items = list(OrderItem.objects.filter(order_id__in=order_ids).values(*ORDER_ITEM_FIELDS))
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in orders])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**row) for row in items])
+
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(id__in=order_ids).delete()
+
+    return len(orders), len(items)
@@ -0,0 +1,65 @@
+"""
+Concurrent query fan-out for async views.
+
+Django's ORM is synchronous, so async views run independent queries on a
+small shared thread pool and await them together. The pool is bounded
+(settings.CAFE_QUERY_WORKERS), and each worker thread has its own
+database connections. Every job is bracketed by ``close_old_connections``,
+as Django brackets a request, so a broken or expired connection in a
+worker is replaced instead of being reused forever. The caller's context
+variables, such as the reporting-database flag, are copied into every
+query. While a request is being profiled (cafe/profiling.py), pool
+queries join its SQL trace.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .profiling import current_capture
+
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'CAFE_QUERY_WORKERS', 4),
+                    thread_name_prefix='cafe-query',
+                )
+    return _executor
+
+
+def _run_job(context, func, args):
+    """One pool job, with connection housekeeping like a request's."""
+    close_old_connections()
+    try:
+        return context.run(func, *args)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args):
+    """Run one blocking callable on the query pool."""
+    capture = current_capture()
+    if capture is not None:
+        func = capture.wrap(func)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), _run_job, context, func, args)
+
+
+async def gather_queries(queries):
+    """Run a ``{name: callable}`` mapping concurrently; return ``{name: result}``."""
+    names = list(queries)
+    results = await asyncio.gather(*(run_in_pool(queries[name]) for name in names))
+    return dict(zip(names, results))
@@ -0,0 +1,211 @@
+"""
+Kitchen/bar display tickets.
+
+Checkout splits each order into one ``Ticket`` per station, routed by
+the items' ``Category.station``. Every insert and status change stamps the
+ticket with the next value of a global ``version`` counter. A station
+display long-polls ``api/kitchen/<station>/feed/?since=<version>`` and
+gets back only what changed after its cursor.
+
+Versions are assigned inside the writing statement or transaction,
+i.e. while the SQLite write lock is held. Versions therefore become
+visible in commit order, and a cursor never skips a change.
+
+Waiting stations hold no thread and no connection. They park on an
+in-process ``TicketNotifier``, which commits wake up, and re-check the
+database at most every ``POLL_INTERVAL`` seconds to catch writes from
+other processes.
+
+That only holds under ASGI (``manage.py serve`` runs uvicorn). Under WSGI
+(``runserver``, or ``serve`` without uvicorn installed) Django runs the
+async view on a request thread that stays blocked while it waits. There,
+``feed_timeout`` shortens each poll to ``WSGI_FEED_TIMEOUT`` so a few
+displays cannot hold every server thread. Displays just poll more often.
+"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Case, F, Max, Subquery, Value, When
+from django.utils import timezone
+
+from .fanout import run_in_pool
+from .models import Ticket
+
+
+# Long-poll timings (seconds)
+FEED_TIMEOUT = 25
+POLL_INTERVAL = 5
+# Under WSGI every waiting display holds a server thread
+WSGI_FEED_TIMEOUT = 5
+
+# Bump moves a ticket one step along
+NEXT_STATUS = {
+    Ticket.STATUS_NEW: Ticket.STATUS_PREPARING,
+    Ticket.STATUS_PREPARING: Ticket.STATUS_DONE,
+}
+
+
+class TicketNotifier:
+    """Wakes long-poll waiters in this process after ticket changes commit.
+
+    Thread-safe: writers run in request threads, waiters are futures on
+    whichever event loop is serving them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}
+
+    def subscribe(self):
+        """Register interest before querying, so no wake-up falls in between."""
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._waiters[future] = future.get_loop()
+        return future
+
+    def unsubscribe(self, future):
+        with self._lock:
+            self._waiters.pop(future, None)
+
+    def notify(self):
+        with self._lock:
+            waiters, self._waiters = self._waiters, {}
+        for future, loop in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass  # Loop already closed
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+notifier = TicketNotifier()
+
+
+def _next_version():
+    """Expression for max(version) + 1, evaluated inside the writing statement."""
+    return Subquery(Ticket.objects.order_by('-version').values('version')[:1]) + 1
+
+
+# ==================== Writes ====================
+
+def create_tickets(order, lines, notes=''):
+    """Queue an order's lines on their stations; call inside the checkout transaction.
+
+    ``lines`` is an iterable of ``(station_id, item_name, quantity)``; lines
+    without a station are not sent to any display.
+    """
+    per_station = defaultdict(list)
+    for station_id, item_name, quantity in lines:
+        if station_id is not None:
+            per_station[station_id].append([item_name, quantity])
+    if not per_station:
+        return []
+
+    # The checkout transaction has already written, so it holds the write
+    # lock and no other writer can take these versions.
+    current = Ticket.objects.aggregate(current=Max('version'))['current'] or 0
+    tickets = Ticket.objects.bulk_create([
+        Ticket(
+            station_id=station_id,
+            order_id=order.id,
+            order_number=order.order_number,
+            lines=station_lines,
+            notes=notes,
+            version=current + offset,
+            created_at=order.created_at,
+        )
+        for offset, (station_id, station_lines) in enumerate(sorted(per_station.items()), start=1)
+    ])
+    transaction.on_commit(notifier.notify)
+    return tickets
+
+
+def bump_ticket(ticket_id):
+    """Advance a ticket one status step with a single UPDATE; False if already done."""
+    updated = Ticket.objects.filter(id=ticket_id).exclude(status=Ticket.STATUS_DONE).update(
+        status=Case(
+            *(When(status=current, then=Value(following)) for current, following in NEXT_STATUS.items()),
+            default=F('status'),
+        ),
+        version=_next_version(),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        transaction.on_commit(notifier.notify)
+    return bool(updated)
+
+
+def complete_ticket(ticket_id):
+    """Mark a ticket done with a single UPDATE; False if already done."""
+    updated = Ticket.objects.filter(id=ticket_id).exclude(status=Ticket.STATUS_DONE).update(
+        status=Ticket.STATUS_DONE,
+        version=_next_version(),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        transaction.on_commit(notifier.notify)
+    return bool(updated)
+
+
+# ==================== Reads ====================
+
+def serialize_ticket(ticket):
+    return {
+        'id': ticket.id,
+        'order_id': ticket.order_id,
+        'order_number': ticket.order_number,
+        'lines': [{'item_name': item_name, 'quantity': quantity} for item_name, quantity in ticket.lines],
+        'notes': ticket.notes,
+        'status': ticket.status,
+        'version': ticket.version,
+        'created_at': ticket.created_at.isoformat(),
+    }
+
+
+def station_snapshot(station_id):
+    """Open tickets of a station plus the current cursor (for a fresh display)."""
+    # Read the cursor first: a change landing in between is simply resent
+    version = Ticket.objects.aggregate(current=Max('version'))['current'] or 0
+    tickets = Ticket.objects.filter(station_id=station_id).exclude(status=Ticket.STATUS_DONE)
+    return version, [serialize_ticket(ticket) for ticket in tickets.order_by('version')]
+
+
+def station_changes(station_id, since):
+    """Tickets of a station changed after ``since``, oldest first."""
+    tickets = Ticket.objects.filter(station_id=station_id, version__gt=since).order_by('version')
+    return [serialize_ticket(ticket) for ticket in tickets]
+
+
+def feed_timeout(request):
+    """Long-poll timeout for ``request``: short unless served through ASGI."""
+    return FEED_TIMEOUT if isinstance(request, ASGIRequest) else WSGI_FEED_TIMEOUT
+
+
+async def wait_for_changes(station_id, since, timeout=FEED_TIMEOUT):
+    """Long-poll: return changes after ``since`` as soon as there are any.
+
+    Returns an empty list when ``timeout`` passes with nothing new.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        wake = notifier.subscribe()
+        try:
+            tickets = await run_in_pool(station_changes, station_id, since)
+            remaining = deadline - time.monotonic()
+            if tickets or remaining <= 0:
+                return tickets
+            try:
+                await asyncio.wait_for(wake, min(remaining, POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            notifier.unsubscribe(wake)
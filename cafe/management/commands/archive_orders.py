@@ -0,0 +1,84 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cafe.archive import move_orders
+from cafe.models import Order
+from cafe.rollups import ensure_complete
+
+
+def months_ago(day, months):
+    """Return ``day`` shifted back by ``months`` calendar months (clamped to month end)."""
+    month_index = day.year * 12 + (day.month - 1) - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    for candidate in (day.day, 30, 29, 28):
+        try:
+            return day.replace(year=year, month=month, day=candidate)
+        except ValueError:
+            continue
+
+
+class Command(BaseCommand):
+    help = 'Move orders older than N months into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=12,
+            help='Archive orders older than this many months (default: 12)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Orders moved per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many orders would be archived',
+        )
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError('--months must be at least 1')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        # Archive whole local days only, so no day is ever split between
+        # the live and archive tables.
+        cutoff_day = months_ago(timezone.localdate(), options['months'])
+        cutoff = timezone.make_aware(datetime.combine(cutoff_day, time.min))
+
+        pending = Order.objects.filter(created_at__lt=cutoff)
+        total = pending.count()
+        self.stdout.write(f"Orders before {cutoff_day:%Y-%m-%d}: {total:,}")
+
+        if options['dry_run'] or not total:
+            return
+
+        # The rollups must cover every day before its orders go cold
+        first_day = timezone.localdate(pending.order_by('created_at').values_list('created_at', flat=True)[0])
+        repaired = ensure_complete(first_day, cutoff_day - timedelta(days=1))
+        if repaired:
+            self.stdout.write(f"Rebuilt hourly rollups for {len(repaired)} day(s)")
+
+        moved_orders = moved_items = 0
+        while True:
+            # Oldest first, so an interrupted run leaves the archive boundary intact
+            chunk = list(
+                pending.order_by('created_at', 'id').values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            orders_count, items_count = move_orders(chunk)
+            moved_orders += orders_count
+            moved_items += items_count
+            self.stdout.write(f"  archived {moved_orders:,}/{total:,} orders")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nArchived {moved_orders:,} orders and {moved_items:,} order items.'
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cafe.shifts import ShiftAlreadyClosed, close_shift
+
+
+class Command(BaseCommand):
+    help = 'Close the current shift and store its Z-report'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--notes',
+            default='',
+            help='Free-text note stored with the shift',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            shift = close_shift(notes=options['notes'])
+        except ShiftAlreadyClosed:
+            raise CommandError('The shift was closed concurrently; nothing to do')
+
+        self.stdout.write(
+            f"Shift {timezone.localtime(shift.opened_at):%Y-%m-%d %H:%M} -> "
+            f"{timezone.localtime(shift.closed_at):%Y-%m-%d %H:%M}"
+        )
+        if shift.orders_count:
+            self.stdout.write(f"  orders {shift.first_order_number} .. {shift.last_order_number}")
+        for line in shift.item_summary:
+            self.stdout.write(f"  {line['item_name']}: {line['quantity']} ({line['revenue']:,} د.ع)")
+        self.stdout.write(
+            f"  cash in {shift.cash_in:,} / change out {shift.cash_out:,} / "
+            f"refunds {shift.refunds:,} / net {shift.net_cash:,} د.ع"
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nClosed shift #{shift.id}: {shift.orders_count:,} orders, {shift.formatted_revenue}'
+        ))
@@ -0,0 +1,91 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cafe.models import ImageBlob, MenuItem
+from cafe.storage import collect_blobs, image_storage, stray_files
+
+
+class Command(BaseCommand):
+    help = 'Delete menu images that no item has used for a grace period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Keep unreferenced images this long before deleting them (default: 24)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Images deleted per transaction (default: 200)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.05,
+            help='Seconds to pause between batches so the tills can write',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] < 0:
+            raise CommandError('--grace-hours cannot be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        orphans = ImageBlob.objects.filter(ref_count=0, updated_at__lt=cutoff)
+        self.stdout.write(f"Unreferenced images older than {options['grace_hours']}h: {orphans.count():,}")
+
+        directory = MenuItem._meta.get_field('image').upload_to
+        if options['dry_run']:
+            strays = list(stray_files(directory, cutoff))
+            self.stdout.write(f"Untracked files: {len(strays):,}")
+            return
+
+        deleted = freed = repaired = 0
+        while True:
+            candidates = list(orphans.order_by('id').values_list('id', 'name', 'size')[:options['batch_size']])
+            if not candidates:
+                break
+
+            # Never trust a zero count over an item that still shows the image
+            in_use = set(MenuItem.objects.filter(
+                image__in=[name for _, name, _ in candidates]
+            ).values_list('image', flat=True))
+            for name in in_use:
+                ImageBlob.objects.filter(name=name).update(
+                    ref_count=MenuItem.objects.filter(image=name).count(), updated_at=timezone.now()
+                )
+            repaired += len(in_use)
+
+            batch_deleted, batch_freed = collect_blobs(
+                [candidate for candidate in candidates if candidate[1] not in in_use], cutoff
+            )
+            deleted += batch_deleted
+            freed += batch_freed
+            self.stdout.write(f"  deleted {deleted:,} images ({freed / 1024 / 1024:.1f} MB)")
+            time.sleep(options['sleep'])
+
+        storage = image_storage()
+        strays = 0
+        for name in stray_files(directory, cutoff):
+            if not MenuItem.objects.filter(image=name).exists():
+                storage.delete(name)
+                strays += 1
+
+        if repaired:
+            self.stdout.write(self.style.WARNING(f'Repaired the reference count of {repaired} image(s) still in use.'))
+        self.stdout.write(self.style.SUCCESS(
+            f'\nDeleted {deleted:,} unreferenced images ({freed / 1024 / 1024:.1f} MB) '
+            f'and {strays:,} untracked files.'
+        ))
@@ -0,0 +1,238 @@
+import random
+import time as clock
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from cafe.archive import archive_boundary
+from cafe.models import MenuItem, Order, OrderChange, OrderItem
+from cafe.rollups import rebuild
+
+
+# Relative demand per hour of the day (local time); the cafe opens at 8:00
+HOURLY_DEMAND = {
+    8: 3, 9: 5, 10: 7, 11: 6, 12: 5, 13: 5, 14: 4, 15: 4,
+    16: 5, 17: 7, 18: 9, 19: 10, 20: 10, 21: 9, 22: 7, 23: 4,
+}
+
+# Relative demand per weekday (Monday=0); Friday and Saturday are the weekend
+WEEKDAY_DEMAND = {0: 0.9, 1: 0.85, 2: 0.9, 3: 1.1, 4: 1.35, 5: 1.2, 6: 0.95}
+
+# Lines per order and quantity per line
+LINES_PER_ORDER = {1: 45, 2: 35, 3: 15, 4: 5}
+QUANTITY_PER_LINE = {1: 70, 2: 22, 3: 8}
+
+HOURLY_CUM_WEIGHTS = list(accumulate(HOURLY_DEMAND.values()))
+LINES_CUM_WEIGHTS = list(accumulate(LINES_PER_ORDER.values()))
+QUANTITY_CUM_WEIGHTS = list(accumulate(QUANTITY_PER_LINE.values()))
+
+
+class Command(BaseCommand):
+    help = 'Generate reproducible synthetic order history for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Number of days of history to generate (default: 365)',
+        )
+        parser.add_argument(
+            '--orders-per-day',
+            type=int,
+            default=150,
+            help='Average orders on an ordinary day (default: 150)',
+        )
+        parser.add_argument(
+            '--end-date',
+            default=None,
+            help='Last day to generate, YYYY-MM-DD (default: yesterday)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed; the same seed always yields the same data (default: 42)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Orders inserted per transaction (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['orders_per_day'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days, --orders-per-day and --batch-size must be positive')
+
+        if options['end_date']:
+            try:
+                end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--end-date must be in YYYY-MM-DD format')
+        else:
+            end_date = timezone.localdate() - timedelta(days=1)
+        start_date = end_date - timedelta(days=options['days'] - 1)
+
+        if not MenuItem.objects.exists():
+            call_command('load_sample_data', stdout=self.stdout)
+        menu = list(MenuItem.objects.order_by('id').values_list('id', 'name', 'price'))
+
+        rng = random.Random(options['seed'])
+        # Fixed per-item popularity, so some items are consistently best sellers
+        popularity = list(accumulate(rng.paretovariate(1.5) for _ in menu))
+
+        # Next free sequence number per order-number prefix
+        self.sequences = {}
+        skip_days = self.occupied_days(start_date, end_date)
+        if skip_days:
+            self.stdout.write(f"Skipping {len(skip_days)} day(s) that already have orders or are archived")
+
+        started = clock.monotonic()
+        orders_total = items_total = 0
+        pending = []
+
+        day = start_date
+        while day <= end_date:
+            if day not in skip_days:
+                pending.extend(self.day_orders(rng, day, options['orders_per_day'], start_date))
+                if len(pending) >= options['batch_size']:
+                    orders_count, items_count = self.flush(pending, rng, menu, popularity)
+                    orders_total += orders_count
+                    items_total += items_count
+                    pending = []
+                    self.stdout.write(f"  {day:%Y-%m-%d}: {orders_total:,} orders, {items_total:,} items")
+            day += timedelta(days=1)
+
+        if pending:
+            orders_count, items_count = self.flush(pending, rng, menu, popularity)
+            orders_total += orders_count
+            items_total += items_count
+
+        # Bulk inserts bypass checkout, so fill the hourly buckets in one pass
+        rebuild(start_date, end_date)
+
+        elapsed = clock.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'\nGenerated {orders_total:,} orders and {items_total:,} order items '
+            f'from {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d} in {elapsed:.1f}s'
+        ))
+
+    def occupied_days(self, start_date, end_date):
+        """Days that must not be generated: existing orders or already archived."""
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+        end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+        days = {
+            moment.date() for moment in
+            Order.objects.filter(created_at__gte=start, created_at__lt=end).datetimes('created_at', 'day')
+        }
+
+        # Archived orders must stay older than every live order
+        boundary = archive_boundary()
+        if boundary is not None:
+            last_archived = timezone.localdate(boundary)
+            day = start_date
+            while day <= min(last_archived, end_date):
+                days.add(day)
+                day += timedelta(days=1)
+        return days
+
+    def day_orders(self, rng, day, orders_per_day, start_date):
+        """Unsaved Order objects for one day, following the demand curves."""
+        # Slow growth over the generated period plus day-to-day noise
+        trend = 0.8 + 0.4 * min(1.0, (day - start_date).days / 365)
+        expected = orders_per_day * WEEKDAY_DEMAND[day.weekday()] * trend * rng.gauss(1.0, 0.12)
+        count = max(0, round(expected))
+
+        hours = rng.choices(list(HOURLY_DEMAND), cum_weights=HOURLY_CUM_WEIGHTS, k=count)
+        seconds = sorted(hour * 3600 + rng.randrange(3600) for hour in hours)
+        midnight = timezone.make_aware(datetime.combine(day, time.min))
+
+        orders = []
+        for offset in seconds:
+            created_at = midnight + timedelta(seconds=offset)
+            orders.append(Order(
+                order_number=self.next_number(Order.number_prefix(created_at)),
+                created_at=created_at,
+                is_printed=True,
+            ))
+        return orders
+
+    def next_number(self, prefix):
+        """Number orders like ``Order.save``: UTC-day prefix, after any existing ones.
+
+        Orders rung up after local midnight but before UTC midnight share
+        the prefix of the previous local day, which may be generated here.
+        """
+        if prefix not in self.sequences:
+            last = (
+                Order.objects.filter(order_number__startswith=f'{prefix}-')
+                .order_by('-order_number').values_list('order_number', flat=True).first()
+            )
+            try:
+                self.sequences[prefix] = int(last.split('-')[-1]) if last else 0
+            except ValueError:
+                self.sequences[prefix] = 0
+        self.sequences[prefix] += 1
+        return f'{prefix}-{self.sequences[prefix]:04d}'
+
+    def flush(self, orders, rng, menu, popularity):
+        """Fill in order lines and totals, then insert one batch."""
+        # Cumulative weights are precomputed; choices() would rebuild them per call
+        lines_choices = list(LINES_PER_ORDER)
+        quantity_choices = list(QUANTITY_PER_LINE)
+        menu_indexes = range(len(menu))
+
+        order_lines = []
+        for order in orders:
+            lines_count = rng.choices(lines_choices, cum_weights=LINES_CUM_WEIGHTS)[0]
+            picked = set(rng.choices(menu_indexes, cum_weights=popularity, k=lines_count))
+            lines = []
+            for menu_index in sorted(picked):
+                item_id, item_name, price = menu[menu_index]
+                quantity = rng.choices(quantity_choices, cum_weights=QUANTITY_CUM_WEIGHTS)[0]
+                lines.append((item_id, item_name, quantity, price))
+
+            total = sum(quantity * price for _, _, quantity, price in lines)
+            # Most customers pay with a round note; the rest pay exact
+            paid = total if rng.random() < 0.4 else -(-total // 5000) * 5000
+            order.total_amount = total
+            order.amount_paid = paid
+            order.change_given = paid - total
+            order_lines.append(lines)
+
+        with transaction.atomic():
+            Order.objects.bulk_create(orders)
+            if orders and orders[0].pk is None:
+                # Backends that cannot return ids from bulk inserts
+                ids = dict(
+                    Order.objects.filter(order_number__in=[order.order_number for order in orders])
+                    .values_list('order_number', 'id')
+                )
+                for order in orders:
+                    order.pk = ids[order.order_number]
+
+            items = [
+                OrderItem(
+                    order_id=order.pk,
+                    menu_item_id=item_id,
+                    item_name=item_name,
+                    quantity=quantity,
+                    unit_price=price,
+                    subtotal=quantity * price,
+                )
+                for order, lines in zip(orders, order_lines)
+                for item_id, item_name, quantity, price in lines
+            ]
+            OrderItem.objects.bulk_create(items, batch_size=2000)
+            # Same change log as checkout, so sync_branch ships these orders too
+            OrderChange.objects.bulk_create(
+                [OrderChange(order_id=order.pk, action=OrderChange.ACTION_CREATE) for order in orders],
+                batch_size=2000,
+            )
+
+        return len(orders), len(items)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from cafe.profiling import make_token, token_max_age
+
+
+class Command(BaseCommand):
+    help = 'Print a short-lived X-Cafe-Profile header value that profiles a request'
+
+    def handle(self, *args, **options):
+        token = make_token()
+        self.stdout.write(f"X-Cafe-Profile: {token}")
+        self.stdout.write(self.style.SUCCESS(
+            f'\nValid for {token_max_age() // 60} minutes. Example:\n'
+            f'  curl -H "X-Cafe-Profile: {token}" http://localhost:8000/api/statistics/\n'
+            f'Captures appear in the admin under "تتبعات الأداء".'
+        ))
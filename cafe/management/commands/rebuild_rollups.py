@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cafe.rollups import ensure_complete, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly sales rollups from the order tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            default=None,
+            help='First day, YYYY-MM-DD (default: 365 days ago)',
+        )
+        parser.add_argument(
+            '--date-to',
+            default=None,
+            help='Last day, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--only-stale',
+            action='store_true',
+            help='Rebuild only days whose totals disagree with the orders',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            end_day = (
+                datetime.strptime(options['date_to'], '%Y-%m-%d').date()
+                if options['date_to'] else timezone.localdate()
+            )
+            start_day = (
+                datetime.strptime(options['date_from'], '%Y-%m-%d').date()
+                if options['date_from'] else end_day - timedelta(days=364)
+            )
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        if options['only_stale']:
+            days = ensure_complete(start_day, end_day)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(days)} stale day(s)'))
+        else:
+            hours, item_hours = rebuild(start_day, end_day)
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {hours:,} hourly and {item_hours:,} item-hour buckets '
+                f'from {start_day:%Y-%m-%d} to {end_day:%Y-%m-%d}'
+            ))
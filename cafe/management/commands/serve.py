@@ -0,0 +1,180 @@
+"""
+Single-process launcher for the tills.
+
+``runserver`` on its own is slow to start. The autoreloader boots Django
+twice, system checks import Pillow to validate ``ImageField``, and every
+start imports all migration modules just to print "no unapplied
+migrations". ``serve`` does that work only when it can matter:
+
+* The migration files of all installed apps are hashed together with the
+  Django version. The result is stored as SQLite's ``PRAGMA user_version``
+  in the database file itself, so it travels with backups and restores.
+* When the stored value matches, the database is already migrated for
+  this code. Checks and ``migrate`` are skipped, and so are their imports.
+* Otherwise (first launch, an update, a restored older backup) the
+  launcher runs ``check`` and ``migrate --run-syncdb`` as before. It then
+  stores the new value, but only after both succeeded.
+
+URLs, views and middleware are imported before the port opens, so the
+first order of the day is not the one that pays for them. ``--timings``
+prints where the launch time went.
+
+The server is uvicorn running ``ASGI_APPLICATION``, so the async views
+(the async read API, the dashboard and the kitchen long-poll) wait on
+the event loop instead of holding a thread each. Without uvicorn
+installed, ``serve`` falls back to the threaded WSGI ``runserver`` and
+says so; the kitchen feed then shortens its polls (see
+``cafe.kitchen.feed_timeout``).
+"""
+
+import hashlib
+import importlib.util
+import time
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+from django.contrib.staticfiles.management.commands.runserver import Command as RunserverCommand
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.loader import MigrationLoader
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+
+def migration_fingerprint():
+    """Positive 31-bit hash of every app's migration files (fits user_version)."""
+    digest = hashlib.sha256(django.get_version().encode())
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        if module_name is None:
+            continue
+        try:
+            # find_spec locates the package without running any migration code
+            spec = importlib.util.find_spec(module_name)
+        except ModuleNotFoundError:
+            continue
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for location in spec.submodule_search_locations:
+            for path in sorted(Path(location).glob('*.py')):
+                digest.update(f'{app_config.label}/{path.name}'.encode())
+                digest.update(path.read_bytes())
+    return int(digest.hexdigest()[:7], 16) or 1
+
+
+def read_marker(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA user_version')
+        return cursor.fetchone()[0]
+
+
+def write_marker(connection, value):
+    with connection.cursor() as cursor:
+        # PRAGMA takes no parameters; value is an int we computed
+        cursor.execute(f'PRAGMA user_version = {int(value)}')
+
+
+class Command(RunserverCommand):
+    help = 'Start the cafe server quickly, running checks and migrations only when needed'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--force-checks',
+            action='store_true',
+            help='Run system checks and migrate even if the database is up to date',
+        )
+        parser.add_argument(
+            '--timings',
+            action='store_true',
+            help='Print how long each launch step took',
+        )
+
+    def handle(self, *args, **options):
+        self.timings = [('Python, settings and apps (CPU)', time.process_time())]
+
+        self.prepare_database(force=options['force_checks'], verbosity=options['verbosity'])
+        self.warm_up()
+        for connection in connections.all(initialized_only=True):
+            connection.close()
+
+        if options['timings']:
+            self.stdout.write('Launch timings:')
+            for label, seconds in self.timings:
+                shown = 'skipped' if seconds is None else f'{seconds * 1000:8.1f} ms'
+                self.stdout.write(f'  {label:<40} {shown}')
+            self.stdout.write(
+                '  (per-module breakdown: python -X importtime manage.py serve --timings)\n'
+            )
+
+        # One process; restart the server to pick up code changes
+        options['use_reloader'] = False
+        options['skip_checks'] = True
+        super().handle(*args, **options)
+
+    def timed(self, label, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.timings.append((label, time.perf_counter() - started))
+        return result
+
+    def prepare_database(self, force, verbosity):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite':
+            # No place to keep the marker: always check and migrate
+            self.timed('System checks', call_command, 'check', verbosity=verbosity)
+            self.timed('Migrations', call_command, 'migrate', run_syncdb=True, interactive=False, verbosity=verbosity)
+            return
+
+        fingerprint = self.timed('Migration fingerprint', migration_fingerprint)
+        stored = self.timed('Read marker', read_marker, connection)
+        if stored == fingerprint and not force:
+            self.timings += [('System checks', None), ('Migrations', None)]
+            return
+
+        self.timed('System checks', call_command, 'check', verbosity=verbosity)
+        self.timed('Migrations', call_command, 'migrate', run_syncdb=True, interactive=False, verbosity=verbosity)
+        write_marker(connection, fingerprint)
+        if verbosity:
+            self.stdout.write(self.style.SUCCESS('✓ Database ready; the next launch skips checks and migrations.'))
+
+    def warm_up(self):
+        """Import middleware and every view now rather than on the first request."""
+        self.timed('Import middleware', lambda: [import_string(path) for path in settings.MIDDLEWARE])
+        self.timed(f'Import {settings.ROOT_URLCONF} + views', lambda: get_resolver().url_patterns)
+
+    def check_migrations(self):
+        # Already handled by prepare_database, without importing every migration
+        pass
+
+    def get_asgi_handler(self, **options):
+        application = import_string(settings.ASGI_APPLICATION)
+        if options['use_static_handler'] and (settings.DEBUG or options['insecure_serving']):
+            return ASGIStaticFilesHandler(application)
+        return application
+
+    def inner_run(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            self.stderr.write(
+                'uvicorn is not installed: serving through WSGI runserver, where every async '
+                'request and kitchen long-poll holds a server thread (pip install uvicorn).'
+            )
+            return super().inner_run(*args, **options)
+
+        host = '0.0.0.0' if self.addr == '0' else self.addr
+        self.stdout.write(
+            f'Serving {settings.ASGI_APPLICATION} with uvicorn at '
+            f'http://{f"[{host}]" if self._raw_ipv6 else host}:{self.port}/'
+        )
+        uvicorn.run(
+            self.get_asgi_handler(**options),
+            host=host,
+            port=int(self.port),
+            lifespan='off',
+            log_level='info' if options['verbosity'] > 1 else 'warning',
+        )
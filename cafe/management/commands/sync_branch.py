@@ -0,0 +1,104 @@
+import json
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cafe.models import SyncState
+from cafe.replication import encode_batch, pending_changes, serialize_orders
+from cafe.routers import reporting
+
+
+INGEST_PATH = '/api/sync/ingest/'
+
+
+class Command(BaseCommand):
+    help = 'Ship new orders from this branch to the head office'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default=None,
+            help='Head office base URL (default: settings.HEAD_OFFICE_URL)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Change-log entries per request (default: 500)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: until caught up)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='HTTP timeout in seconds (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        base_url = (options['url'] or getattr(settings, 'HEAD_OFFICE_URL', '')).rstrip('/')
+        if not base_url:
+            raise CommandError('No head office URL: pass --url or set HEAD_OFFICE_URL')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        branch = getattr(settings, 'BRANCH_CODE', 'main')
+        token = getattr(settings, 'SYNC_TOKEN', '')
+        state, _ = SyncState.objects.get_or_create(target=base_url)
+
+        batches = sent = inserted = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            changes = pending_changes(state.last_change_id, options['batch_size'])
+            if not changes:
+                break
+
+            order_ids = list(dict.fromkeys(change.order_id for change in changes))
+            with reporting():
+                body = encode_batch(branch, serialize_orders(order_ids))
+            result = self.post(base_url + INGEST_PATH, body, token, options['timeout'])
+
+            # Advance the high-water mark only after the head office acknowledged
+            state.last_change_id = changes[-1].id
+            state.save(update_fields=['last_change_id', 'updated_at'])
+
+            batches += 1
+            sent += len(order_ids)
+            inserted += result.get('inserted', 0)
+            self.stdout.write(
+                f"  batch {batches}: {len(order_ids)} orders, {len(body):,} bytes, "
+                f"up to change #{state.last_change_id}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nSynced {sent:,} orders in {batches} batch(es); '
+            f'{inserted:,} new at head office (high-water mark #{state.last_change_id})'
+        ))
+
+    def post(self, url, body, token, timeout):
+        request = urllib.request.Request(
+            url,
+            data=body,
+            method='POST',
+            headers={
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip',
+                'X-Sync-Token': token,
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                result = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise CommandError(f'Head office rejected the batch ({e.code}): {e.read()[:200]!r}')
+        except (urllib.error.URLError, OSError) as e:
+            raise CommandError(f'Could not reach head office: {e}')
+
+        if not result.get('success'):
+            raise CommandError(f"Head office error: {result.get('error')}")
+        return result
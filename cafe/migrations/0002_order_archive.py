@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(max_length=20, unique=True, verbose_name='رقم الطلب')),
+                ('created_at', models.DateTimeField(db_index=True, verbose_name='تاريخ ووقت الطلب')),
+                ('total_amount', models.PositiveIntegerField(default=0, verbose_name='المجموع (د.ع)')),
+                ('amount_paid', models.PositiveIntegerField(default=0, verbose_name='المبلغ المدفوع (د.ع)')),
+                ('change_given', models.PositiveIntegerField(default=0, verbose_name='الباقي (د.ع)')),
+                ('notes', models.TextField(blank=True, verbose_name='ملاحظات')),
+                ('is_printed', models.BooleanField(default=False, verbose_name='تمت الطباعة')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الأرشفة')),
+            ],
+            options={
+                'verbose_name': 'طلب مؤرشف',
+                'verbose_name_plural': 'الطلبات المؤرشفة',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='تاريخ ووقت الطلب'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_name', models.CharField(max_length=200, verbose_name='اسم الصنف')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='الكمية')),
+                ('unit_price', models.PositiveIntegerField(verbose_name='سعر الوحدة (د.ع)')),
+                ('subtotal', models.PositiveIntegerField(verbose_name='المجموع الفرعي (د.ع)')),
+                ('menu_item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cafe.menuitem', verbose_name='الصنف')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='cafe.archivedorder', verbose_name='الطلب')),
+            ],
+            options={
+                'verbose_name': 'عنصر طلب مؤرشف',
+                'verbose_name_plural': 'عناصر الطلبات المؤرشفة',
+            },
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def log_existing_orders(apps, schema_editor):
+    """Seed the change log with orders created before replication existed."""
+    OrderChange = apps.get_model('cafe', 'OrderChange')
+    ArchivedOrder = apps.get_model('cafe', 'ArchivedOrder')
+    Order = apps.get_model('cafe', 'Order')
+
+    for model in (ArchivedOrder, Order):
+        ids = model.objects.order_by('id').values_list('id', flat=True)
+        batch = []
+        for order_id in ids.iterator(chunk_size=5000):
+            batch.append(OrderChange(order_id=order_id, action='create'))
+            if len(batch) >= 5000:
+                OrderChange.objects.bulk_create(batch)
+                batch = []
+        OrderChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0002_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(db_index=True, verbose_name='رقم الطلب الداخلي')),
+                ('action', models.CharField(choices=[('create', 'إنشاء')], default='create', max_length=10, verbose_name='العملية')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='وقت التغيير')),
+            ],
+            options={
+                'verbose_name': 'تغيير طلب',
+                'verbose_name_plural': 'سجل تغييرات الطلبات',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(max_length=200, unique=True, verbose_name='الوجهة')),
+                ('last_change_id', models.BigIntegerField(default=0, verbose_name='آخر تغيير مرسل')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر مزامنة')),
+            ],
+            options={
+                'verbose_name': 'حالة مزامنة',
+                'verbose_name_plural': 'حالات المزامنة',
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch', models.CharField(max_length=50, verbose_name='الفرع')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')),
+                ('revenue', models.PositiveBigIntegerField(default=0, verbose_name='الإيرادات (د.ع)')),
+            ],
+            options={
+                'verbose_name': 'مبيعات فرع يومية',
+                'verbose_name_plural': 'مبيعات الفروع اليومية',
+                'ordering': ['-date', 'branch'],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'date'), name='unique_branch_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch', models.CharField(max_length=50, verbose_name='الفرع')),
+                ('source_id', models.BigIntegerField(verbose_name='رقم الطلب في الفرع')),
+                ('order_number', models.CharField(max_length=20, verbose_name='رقم الطلب')),
+                ('created_at', models.DateTimeField(verbose_name='تاريخ ووقت الطلب')),
+                ('total_amount', models.PositiveIntegerField(default=0, verbose_name='المجموع (د.ع)')),
+                ('amount_paid', models.PositiveIntegerField(default=0, verbose_name='المبلغ المدفوع (د.ع)')),
+                ('change_given', models.PositiveIntegerField(default=0, verbose_name='الباقي (د.ع)')),
+                ('notes', models.TextField(blank=True, verbose_name='ملاحظات')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الاستلام')),
+            ],
+            options={
+                'verbose_name': 'طلب فرع',
+                'verbose_name_plural': 'طلبات الفروع',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['branch', 'created_at'], name='cafe_branch_branch_fb2cf1_idx')],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'source_id'), name='unique_branch_order')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_name', models.CharField(max_length=200, verbose_name='اسم الصنف')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='الكمية')),
+                ('unit_price', models.PositiveIntegerField(verbose_name='سعر الوحدة (د.ع)')),
+                ('subtotal', models.PositiveIntegerField(verbose_name='المجموع الفرعي (د.ع)')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='cafe.branchorder', verbose_name='الطلب')),
+            ],
+            options={
+                'verbose_name': 'عنصر طلب فرع',
+                'verbose_name_plural': 'عناصر طلبات الفروع',
+            },
+        ),
+        migrations.RunPython(log_existing_orders, migrations.RunPython.noop),
+    ]
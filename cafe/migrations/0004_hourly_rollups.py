@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:58
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+
+
+def backfill_buckets(apps, schema_editor):
+    """Build the hourly buckets for orders that predate the rollup tables."""
+    HourlySales = apps.get_model('cafe', 'HourlySales')
+    HourlyItemSales = apps.get_model('cafe', 'HourlyItemSales')
+
+    order_buckets = defaultdict(lambda: [0, 0])
+    for model_name in ('ArchivedOrder', 'Order'):
+        rows = (
+            apps.get_model('cafe', model_name).objects
+            .annotate(bucket_date=TruncDate('created_at'), bucket_hour=ExtractHour('created_at'))
+            .values('bucket_date', 'bucket_hour')
+            .annotate(orders_count=Count('id'), revenue=Sum('total_amount'))
+            .order_by()
+        )
+        for row in rows:
+            totals = order_buckets[(row['bucket_date'], row['bucket_hour'])]
+            totals[0] += row['orders_count']
+            totals[1] += row['revenue'] or 0
+
+    item_buckets = defaultdict(lambda: [0, 0])
+    for model_name in ('ArchivedOrderItem', 'OrderItem'):
+        rows = (
+            apps.get_model('cafe', model_name).objects
+            .annotate(
+                bucket_date=TruncDate('order__created_at'),
+                bucket_hour=ExtractHour('order__created_at'),
+            )
+            .values('bucket_date', 'bucket_hour', 'item_name')
+            .annotate(quantity_sum=Sum('quantity'), revenue=Sum('subtotal'))
+            .order_by()
+        )
+        for row in rows:
+            totals = item_buckets[(row['bucket_date'], row['bucket_hour'], row['item_name'])]
+            totals[0] += row['quantity_sum'] or 0
+            totals[1] += row['revenue'] or 0
+
+    HourlySales.objects.bulk_create([
+        HourlySales(date=day, hour=hour, weekday=day.weekday(), orders_count=count, revenue=revenue)
+        for (day, hour), (count, revenue) in order_buckets.items()
+    ], batch_size=2000)
+    HourlyItemSales.objects.bulk_create([
+        HourlyItemSales(
+            date=day, hour=hour, weekday=day.weekday(), item_name=item_name,
+            quantity=quantity, revenue=revenue,
+        )
+        for (day, hour, item_name), (quantity, revenue) in item_buckets.items()
+    ], batch_size=2000)
+
+    if schema_editor.connection.vendor == 'sqlite':
+        # Planner statistics, so heatmap queries pick the covering index
+        schema_editor.execute('ANALYZE "cafe_hourlysales"')
+        schema_editor.execute('ANALYZE "cafe_hourlyitemsales"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0003_branch_replication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='الساعة')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='يوم الأسبوع')),
+                ('item_name', models.CharField(max_length=200, verbose_name='اسم الصنف')),
+                ('quantity', models.IntegerField(default=0, verbose_name='الكمية')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='الإيرادات (د.ع)')),
+            ],
+            options={
+                'verbose_name': 'مبيعات صنف بالساعة',
+                'verbose_name_plural': 'مبيعات الأصناف بالساعة',
+                'ordering': ['-date', 'hour', 'item_name'],
+                'indexes': [models.Index(fields=['item_name', 'date', 'weekday', 'hour', 'quantity'], name='hourly_item_heatmap_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'hour', 'item_name'), name='unique_hourly_item_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='الساعة')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='يوم الأسبوع')),
+                ('orders_count', models.IntegerField(default=0, verbose_name='عدد الطلبات')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='الإيرادات (د.ع)')),
+            ],
+            options={
+                'verbose_name': 'مبيعات ساعة',
+                'verbose_name_plural': 'المبيعات بالساعة',
+                'ordering': ['-date', 'hour'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'hour'), name='unique_hourly_sales')],
+            },
+        ),
+        migrations.RunPython(backfill_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0004_hourly_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('opened_at', models.DateTimeField(unique=True, verbose_name='بداية الوردية')),
+                ('closed_at', models.DateTimeField(db_index=True, verbose_name='نهاية الوردية')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')),
+                ('total_revenue', models.PositiveBigIntegerField(default=0, verbose_name='إجمالي المبيعات (د.ع)')),
+                ('cash_in', models.PositiveBigIntegerField(default=0, verbose_name='النقد المستلم (د.ع)')),
+                ('cash_out', models.PositiveBigIntegerField(default=0, verbose_name='الباقي المدفوع (د.ع)')),
+                ('first_order_number', models.CharField(blank=True, max_length=20, verbose_name='أول طلب')),
+                ('last_order_number', models.CharField(blank=True, max_length=20, verbose_name='آخر طلب')),
+                ('item_summary', models.JSONField(default=list, verbose_name='ملخص الأصناف')),
+                ('notes', models.TextField(blank=True, verbose_name='ملاحظات')),
+            ],
+            options={
+                'verbose_name': 'وردية',
+                'verbose_name_plural': 'الورديات',
+                'ordering': ['-closed_at'],
+            },
+        ),
+    ]
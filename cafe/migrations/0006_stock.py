@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0005_shifts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='اسم المكون')),
+                ('unit', models.CharField(blank=True, help_text='مثل: غرام، مل، قطعة', max_length=20, verbose_name='الوحدة')),
+                ('stock_quantity', models.PositiveIntegerField(default=0, verbose_name='الكمية المتوفرة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'مكون',
+                'verbose_name_plural': 'المكونات',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='stock_quantity',
+            field=models.PositiveIntegerField(blank=True, help_text='اتركه فارغاً إذا لم يكن المخزون متتبعاً', null=True, verbose_name='الكمية المتوفرة'),
+        ),
+        migrations.CreateModel(
+            name='RecipeLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='الكمية لكل وحدة')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='recipe_lines', to='cafe.ingredient', verbose_name='المكون')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe', to='cafe.menuitem', verbose_name='الصنف')),
+            ],
+            options={
+                'verbose_name': 'مكون صنف',
+                'verbose_name_plural': 'مكونات الأصناف',
+                'constraints': [models.UniqueConstraint(fields=('menu_item', 'ingredient'), name='unique_recipe_line')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0006_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderAdjustment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(db_index=True, verbose_name='رقم الطلب الداخلي')),
+                ('order_number', models.CharField(max_length=20, verbose_name='رقم الطلب')),
+                ('kind', models.CharField(choices=[('void', 'إلغاء'), ('refund', 'استرداد جزئي')], max_length=10, verbose_name='النوع')),
+                ('amount', models.PositiveIntegerField(verbose_name='المبلغ المسترد (د.ع)')),
+                ('lines', models.JSONField(default=list, verbose_name='الأصناف المستردة')),
+                ('reason', models.TextField(blank=True, verbose_name='السبب')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='الوقت')),
+            ],
+            options={
+                'verbose_name': 'إلغاء / استرداد',
+                'verbose_name_plural': 'سجل الإلغاء والاسترداد',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='is_voided',
+            field=models.BooleanField(default=False, verbose_name='ملغى'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='refunded_amount',
+            field=models.PositiveIntegerField(default=0, verbose_name='المبلغ المسترد (د.ع)'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='refunded_quantity',
+            field=models.PositiveIntegerField(default=0, verbose_name='الكمية المستردة'),
+        ),
+        migrations.AddField(
+            model_name='branchorder',
+            name='is_voided',
+            field=models.BooleanField(default=False, verbose_name='ملغى'),
+        ),
+        migrations.AddField(
+            model_name='branchorder',
+            name='refunded_amount',
+            field=models.PositiveIntegerField(default=0, verbose_name='المبلغ المسترد (د.ع)'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='is_voided',
+            field=models.BooleanField(default=False, verbose_name='ملغى'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='refunded_amount',
+            field=models.PositiveIntegerField(default=0, verbose_name='المبلغ المسترد (د.ع)'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='refunded_quantity',
+            field=models.PositiveIntegerField(default=0, verbose_name='الكمية المستردة'),
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='refunds',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='المبالغ المستردة (د.ع)'),
+        ),
+        migrations.AlterField(
+            model_name='orderchange',
+            name='action',
+            field=models.CharField(choices=[('create', 'إنشاء'), ('void', 'إلغاء'), ('refund', 'استرداد')], default='create', max_length=10, verbose_name='العملية'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0007_void_refund'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Station',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='اسم المحطة')),
+                ('slug', models.SlugField(unique=True, verbose_name='المعرف')),
+                ('order', models.PositiveIntegerField(default=0, verbose_name='ترتيب العرض')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشطة')),
+            ],
+            options={
+                'verbose_name': 'محطة تحضير',
+                'verbose_name_plural': 'محطات التحضير',
+                'ordering': ['order', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='categories', to='cafe.station', verbose_name='محطة التحضير'),
+        ),
+        migrations.CreateModel(
+            name='Ticket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(verbose_name='رقم الطلب الداخلي')),
+                ('order_number', models.CharField(max_length=20, verbose_name='رقم الطلب')),
+                ('lines', models.JSONField(default=list, verbose_name='الأصناف')),
+                ('notes', models.TextField(blank=True, verbose_name='ملاحظات')),
+                ('status', models.CharField(choices=[('new', 'جديد'), ('preparing', 'قيد التحضير'), ('done', 'جاهز')], default='new', max_length=10, verbose_name='الحالة')),
+                ('version', models.BigIntegerField(db_index=True, verbose_name='الإصدار')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='وقت الطلب')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='cafe.station', verbose_name='المحطة')),
+            ],
+            options={
+                'verbose_name': 'تذكرة تحضير',
+                'verbose_name_plural': 'تذاكر التحضير',
+                'ordering': ['version'],
+                'indexes': [models.Index(fields=['station', 'version'], name='cafe_ticket_station_2c4bed_idx'), models.Index(fields=['station', 'status'], name='cafe_ticket_station_a5a68b_idx')],
+            },
+        ),
+    ]
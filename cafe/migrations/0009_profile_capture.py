@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0008_kitchen_display'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='الوقت')),
+                ('method', models.CharField(max_length=10, verbose_name='الطريقة')),
+                ('path', models.CharField(max_length=500, verbose_name='المسار')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='رمز الاستجابة')),
+                ('duration_ms', models.FloatField(verbose_name='المدة (ms)')),
+                ('sql_count', models.PositiveIntegerField(verbose_name='عدد الاستعلامات')),
+                ('sql_time_ms', models.FloatField(verbose_name='وقت الاستعلامات (ms)')),
+                ('stats', models.BinaryField(verbose_name='ملف cProfile')),
+                ('summary', models.TextField(verbose_name='ملخص الدوال')),
+                ('sql_trace', models.JSONField(default=list, verbose_name='الاستعلامات')),
+            ],
+            options={
+                'verbose_name': 'تتبع أداء',
+                'verbose_name_plural': 'تتبعات الأداء',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0009_profile_capture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='list_price',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='سعر القائمة (د.ع)'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='price_rule_name',
+            field=models.CharField(blank=True, max_length=100, verbose_name='اسم قاعدة التسعير'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='list_price',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='سعر القائمة (د.ع)'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='price_rule_name',
+            field=models.CharField(blank=True, max_length=100, verbose_name='اسم قاعدة التسعير'),
+        ),
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='اسم القاعدة')),
+                ('kind', models.CharField(choices=[('discount', 'خصم'), ('bundle', 'عرض مجموعة')], default='discount', max_length=10, verbose_name='النوع')),
+                ('is_active', models.BooleanField(default=True, verbose_name='مفعلة')),
+                ('percent_off', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='نسبة الخصم %')),
+                ('fixed_price', models.PositiveIntegerField(blank=True, help_text='للخصم: سعر الوحدة. للمجموعة: سعر المجموعة كاملة', null=True, verbose_name='السعر الثابت (د.ع)')),
+                ('weekdays', models.CharField(blank=True, help_text='أرقام الأيام: 0 الاثنين ... 5 السبت، 6 الأحد. فارغ = كل الأيام', max_length=7, verbose_name='أيام الأسبوع')),
+                ('start_time', models.TimeField(blank=True, null=True, verbose_name='من الساعة')),
+                ('end_time', models.TimeField(blank=True, help_text='فارغ مع "من الساعة" = طوال اليوم. يمكن أن تتجاوز منتصف الليل', null=True, verbose_name='إلى الساعة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='cafe.category', verbose_name='التصنيف')),
+                ('menu_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='cafe.menuitem', verbose_name='الصنف')),
+            ],
+            options={
+                'verbose_name': 'قاعدة تسعير',
+                'verbose_name_plural': 'قواعد التسعير',
+                'ordering': ['kind', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='price_rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cafe.pricerule', verbose_name='قاعدة التسعير'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='price_rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cafe.pricerule', verbose_name='قاعدة التسعير'),
+        ),
+        migrations.CreateModel(
+            name='BundleItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='الكمية')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cafe.menuitem', verbose_name='الصنف')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bundle_items', to='cafe.pricerule', verbose_name='العرض')),
+            ],
+            options={
+                'verbose_name': 'صنف في مجموعة',
+                'verbose_name_plural': 'أصناف المجموعات',
+                'constraints': [models.UniqueConstraint(fields=('rule', 'menu_item'), name='unique_bundle_item')],
+            },
+        ),
+    ]
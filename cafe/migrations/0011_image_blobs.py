@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:26
+
+import cafe.storage
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def adopt_existing_images(apps, schema_editor):
+    """Reference-count images uploaded before content addressing."""
+    MenuItem = apps.get_model('cafe', 'MenuItem')
+    ImageBlob = apps.get_model('cafe', 'ImageBlob')
+    storage = cafe.storage.image_storage()
+
+    rows = MenuItem.objects.exclude(image='').exclude(image=None).values('image').annotate(refs=Count('id'))
+    ImageBlob.objects.bulk_create([
+        ImageBlob(
+            name=row['image'],
+            ref_count=row['refs'],
+            size=storage.size(row['image']) if storage.exists(row['image']) else 0,
+        )
+        for row in rows.order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0010_price_rules'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menuitem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=cafe.storage.image_storage, upload_to='menu_items/', verbose_name='الصورة'),
+        ),
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='المسار')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='الحجم (بايت)')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='عدد الاستخدامات')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الرفع')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='آخر تغيير')),
+            ],
+            options={
+                'verbose_name': 'ملف صورة',
+                'verbose_name_plural': 'ملفات الصور',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='cafe_imageb_ref_cou_38b0de_idx')],
+            },
+        ),
+        migrations.RunPython(adopt_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0011_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shift',
+            name='voided_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='الطلبات الملغاة'),
+        ),
+    ]
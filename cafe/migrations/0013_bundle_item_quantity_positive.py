@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:55
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def drop_empty_components(apps, schema_editor):
+    """A component of quantity 0 asks nothing of the order; drop it before the constraint."""
+    BundleItem = apps.get_model('cafe', 'BundleItem')
+    BundleItem.objects.filter(quantity__lt=1).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafe', '0012_shift_voided_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_empty_components, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='bundleitem',
+            name='quantity',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='الكمية'),
+        ),
+        migrations.AddConstraint(
+            model_name='bundleitem',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 1)), name='bundle_item_quantity_positive'),
+        ),
+    ]
@@ -1,12 +1,41 @@
+from datetime import timezone as dt_timezone
+
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils import timezone
 
+from .storage import image_storage
+
+
+class Station(models.Model):
+    """محطات التحضير - Kitchen/bar stations that receive order tickets"""
+    name = models.CharField(max_length=100, verbose_name='اسم المحطة')
+    slug = models.SlugField(max_length=50, unique=True, verbose_name='المعرف')
+    order = models.PositiveIntegerField(default=0, verbose_name='ترتيب العرض')
+    is_active = models.BooleanField(default=True, verbose_name='نشطة')
+
+    class Meta:
+        verbose_name = 'محطة تحضير'
+        verbose_name_plural = 'محطات التحضير'
+        ordering = ['order', 'name']
+
+    def __str__(self):
+        return self.name
+
 
 class Category(models.Model):
     """تصنيفات القائمة - Menu Categories"""
     name = models.CharField(max_length=100, verbose_name='اسم التصنيف')
     order = models.PositiveIntegerField(default=0, verbose_name='ترتيب العرض')
     is_active = models.BooleanField(default=True, verbose_name='نشط')
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='categories',
+        verbose_name='محطة التحضير'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
 
     class Meta:
@@ -31,11 +60,18 @@ class MenuItem(models.Model):
     description = models.TextField(blank=True, verbose_name='الوصف')
     image = models.ImageField(
         upload_to='menu_items/', 
+        storage=image_storage,
         blank=True, 
         null=True,
         verbose_name='الصورة'
     )
     is_available = models.BooleanField(default=True, verbose_name='متوفر')
+    stock_quantity = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='الكمية المتوفرة',
+        help_text='اتركه فارغاً إذا لم يكن المخزون متتبعاً'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')
 
@@ -47,20 +83,216 @@ class MenuItem(models.Model):
     def __str__(self):
         return f"{self.name} - {self.price:,} د.ع"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Image as stored, so saves and deletes can adjust ImageBlob reference counts
+        image = instance.__dict__.get('image')
+        instance._stored_image = getattr(image, 'name', image) or ''
+        return instance
+    
     @property
     def formatted_price(self):
         return f"{self.price:,} د.ع"
 
+    @property
+    def tracks_stock(self):
+        return self.stock_quantity is not None
+
+
+class Ingredient(models.Model):
+    """المكونات - Recipe ingredients with stock levels"""
+    name = models.CharField(max_length=100, unique=True, verbose_name='اسم المكون')
+    unit = models.CharField(max_length=20, blank=True, verbose_name='الوحدة', help_text='مثل: غرام، مل، قطعة')
+    stock_quantity = models.PositiveIntegerField(default=0, verbose_name='الكمية المتوفرة')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')
+
+    class Meta:
+        verbose_name = 'مكون'
+        verbose_name_plural = 'المكونات'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeLine(models.Model):
+    """مكونات الصنف - Ingredient used per unit of a menu item"""
+    menu_item = models.ForeignKey(
+        MenuItem,
+        on_delete=models.CASCADE,
+        related_name='recipe',
+        verbose_name='الصنف'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.PROTECT,
+        related_name='recipe_lines',
+        verbose_name='المكون'
+    )
+    quantity = models.PositiveIntegerField(verbose_name='الكمية لكل وحدة')
+
+    class Meta:
+        verbose_name = 'مكون صنف'
+        verbose_name_plural = 'مكونات الأصناف'
+        constraints = [
+            models.UniqueConstraint(fields=['menu_item', 'ingredient'], name='unique_recipe_line'),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item.name} - {self.ingredient.name} × {self.quantity}"
+
+
+class ImageBlob(models.Model):
+    """ملفات الصور - Stored image files with reference counts (see cafe/storage.py)"""
+    name = models.CharField(max_length=255, unique=True, verbose_name='المسار')
+    size = models.PositiveBigIntegerField(default=0, verbose_name='الحجم (بايت)')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='عدد الاستخدامات')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الرفع')
+    # Set on every retain/release, so gc can wait out a grace period
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name='آخر تغيير')
+
+    class Meta:
+        verbose_name = 'ملف صورة'
+        verbose_name_plural = 'ملفات الصور'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class PriceRule(models.Model):
+    """قواعد التسعير - Happy hours, item/category discounts and combo bundles"""
+    KIND_DISCOUNT = 'discount'
+    KIND_BUNDLE = 'bundle'
+    KIND_CHOICES = [
+        (KIND_DISCOUNT, 'خصم'),
+        (KIND_BUNDLE, 'عرض مجموعة'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name='اسم القاعدة')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_DISCOUNT, verbose_name='النوع')
+    is_active = models.BooleanField(default=True, verbose_name='مفعلة')
+    # Discount scope: one item, one category, or (both empty) the whole menu
+    menu_item = models.ForeignKey(
+        MenuItem,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='price_rules',
+        verbose_name='الصنف'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='price_rules',
+        verbose_name='التصنيف'
+    )
+    percent_off = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='نسبة الخصم %'
+    )
+    fixed_price = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='السعر الثابت (د.ع)',
+        help_text='للخصم: سعر الوحدة. للمجموعة: سعر المجموعة كاملة'
+    )
+    weekdays = models.CharField(
+        max_length=7,
+        blank=True,
+        verbose_name='أيام الأسبوع',
+        help_text='أرقام الأيام: 0 الاثنين ... 5 السبت، 6 الأحد. فارغ = كل الأيام'
+    )
+    start_time = models.TimeField(null=True, blank=True, verbose_name='من الساعة')
+    end_time = models.TimeField(
+        null=True,
+        blank=True,
+        verbose_name='إلى الساعة',
+        help_text='فارغ مع "من الساعة" = طوال اليوم. يمكن أن تتجاوز منتصف الليل'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')
+
+    class Meta:
+        verbose_name = 'قاعدة تسعير'
+        verbose_name_plural = 'قواعد التسعير'
+        ordering = ['kind', 'name']
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        errors = {}
+        if self.kind == self.KIND_BUNDLE:
+            if self.fixed_price is None:
+                errors['fixed_price'] = 'حدد سعر المجموعة'
+            if self.percent_off is not None or self.menu_item_id or self.category_id:
+                errors['kind'] = 'عرض المجموعة يحدد سعراً ثابتاً فقط؛ أضف أصنافه في الأسفل'
+        else:
+            if (self.percent_off is None) == (self.fixed_price is None):
+                errors['percent_off'] = 'حدد نسبة الخصم أو السعر الثابت (واحداً منهما فقط)'
+            elif self.percent_off is not None and not 1 <= self.percent_off <= 100:
+                errors['percent_off'] = 'النسبة بين 1 و 100'
+            if self.menu_item_id and self.category_id:
+                errors['category'] = 'اختر صنفاً أو تصنيفاً، وليس الاثنين'
+        if (self.start_time is None) != (self.end_time is None) or (
+            self.start_time is not None and self.start_time == self.end_time
+        ):
+            errors['end_time'] = 'حدد بداية ونهاية مختلفتين، أو اتركهما فارغين'
+        if any(day not in '0123456' for day in self.weekdays) or len(set(self.weekdays)) != len(self.weekdays):
+            errors['weekdays'] = 'أرقام من 0 إلى 6 بدون تكرار'
+        if errors:
+            raise ValidationError(errors)
+
+
+class BundleItem(models.Model):
+    """أصناف المجموعة - Menu items that make up a combo bundle"""
+    rule = models.ForeignKey(
+        PriceRule,
+        on_delete=models.CASCADE,
+        related_name='bundle_items',
+        verbose_name='العرض'
+    )
+    menu_item = models.ForeignKey(
+        MenuItem,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='الصنف'
+    )
+    quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)], verbose_name='الكمية')
+
+    class Meta:
+        verbose_name = 'صنف في مجموعة'
+        verbose_name_plural = 'أصناف المجموعات'
+        constraints = [
+            models.UniqueConstraint(fields=['rule', 'menu_item'], name='unique_bundle_item'),
+            # Pricing divides by the quantity
+            models.CheckConstraint(condition=models.Q(quantity__gte=1), name='bundle_item_quantity_positive'),
+        ]
+
+    def __str__(self):
+        return f"{self.rule.name} - {self.menu_item.name} × {self.quantity}"
+
 
 class Order(models.Model):
     """الطلبات - Orders"""
     order_number = models.CharField(max_length=20, unique=True, verbose_name='رقم الطلب')
-    created_at = models.DateTimeField(default=timezone.now, verbose_name='تاريخ ووقت الطلب')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='تاريخ ووقت الطلب')
     total_amount = models.PositiveIntegerField(default=0, verbose_name='المجموع (د.ع)')
     amount_paid = models.PositiveIntegerField(default=0, verbose_name='المبلغ المدفوع (د.ع)')
     change_given = models.PositiveIntegerField(default=0, verbose_name='الباقي (د.ع)')
     notes = models.TextField(blank=True, verbose_name='ملاحظات')
     is_printed = models.BooleanField(default=False, verbose_name='تمت الطباعة')
+    is_voided = models.BooleanField(default=False, verbose_name='ملغى')
+    refunded_amount = models.PositiveIntegerField(default=0, verbose_name='المبلغ المسترد (د.ع)')
 
     class Meta:
         verbose_name = 'طلب'
@@ -70,12 +302,16 @@ class Order(models.Model):
     def __str__(self):
         return f"طلب #{self.order_number}"
     
+    @staticmethod
+    def number_prefix(moment):
+        """Order numbers start with the UTC date of the moment they are taken"""
+        return moment.astimezone(dt_timezone.utc).strftime('%Y%m%d')
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
             from django.db import IntegrityError
             
-            today = timezone.now()
-            date_prefix = today.strftime('%Y%m%d')
+            date_prefix = Order.number_prefix(timezone.now())
             
             max_attempts = 10
             for attempt in range(max_attempts):
@@ -117,6 +353,11 @@ class Order(models.Model):
     @property
     def formatted_change(self):
         return f"{self.change_given:,} د.ع"
+    
+    @property
+    def net_amount(self):
+        """Total after refunds and voids"""
+        return self.total_amount - self.refunded_amount
 
 
 class OrderItem(models.Model):
@@ -137,6 +378,18 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1, verbose_name='الكمية')
     unit_price = models.PositiveIntegerField(verbose_name='سعر الوحدة (د.ع)')
     subtotal = models.PositiveIntegerField(verbose_name='المجموع الفرعي (د.ع)')
+    refunded_quantity = models.PositiveIntegerField(default=0, verbose_name='الكمية المستردة')
+    list_price = models.PositiveIntegerField(null=True, blank=True, verbose_name='سعر القائمة (د.ع)')
+    price_rule = models.ForeignKey(
+        PriceRule,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='قاعدة التسعير'
+    )
+    # Kept for reports after the rule is renamed or deleted
+    price_rule_name = models.CharField(max_length=100, blank=True, verbose_name='اسم قاعدة التسعير')
 
     class Meta:
         verbose_name = 'عنصر طلب'
@@ -158,3 +411,355 @@ class OrderItem(models.Model):
     @property
     def formatted_subtotal(self):
         return f"{self.subtotal:,} د.ع"
+
+
+class ArchivedOrder(models.Model):
+    """الطلبات المؤرشفة - Archived Orders (moved out of Order by archive_orders)"""
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    order_number = models.CharField(max_length=20, unique=True, verbose_name='رقم الطلب')
+    created_at = models.DateTimeField(db_index=True, verbose_name='تاريخ ووقت الطلب')
+    total_amount = models.PositiveIntegerField(default=0, verbose_name='المجموع (د.ع)')
+    amount_paid = models.PositiveIntegerField(default=0, verbose_name='المبلغ المدفوع (د.ع)')
+    change_given = models.PositiveIntegerField(default=0, verbose_name='الباقي (د.ع)')
+    notes = models.TextField(blank=True, verbose_name='ملاحظات')
+    is_printed = models.BooleanField(default=False, verbose_name='تمت الطباعة')
+    is_voided = models.BooleanField(default=False, verbose_name='ملغى')
+    refunded_amount = models.PositiveIntegerField(default=0, verbose_name='المبلغ المسترد (د.ع)')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الأرشفة')
+
+    class Meta:
+        verbose_name = 'طلب مؤرشف'
+        verbose_name_plural = 'الطلبات المؤرشفة'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"طلب #{self.order_number}"
+
+    @property
+    def formatted_total(self):
+        return f"{self.total_amount:,} د.ع"
+
+
+class ArchivedOrderItem(models.Model):
+    """عناصر الطلبات المؤرشفة - Archived Order Items"""
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='الطلب'
+    )
+    menu_item = models.ForeignKey(
+        MenuItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='الصنف'
+    )
+    item_name = models.CharField(max_length=200, verbose_name='اسم الصنف')
+    quantity = models.PositiveIntegerField(default=1, verbose_name='الكمية')
+    unit_price = models.PositiveIntegerField(verbose_name='سعر الوحدة (د.ع)')
+    subtotal = models.PositiveIntegerField(verbose_name='المجموع الفرعي (د.ع)')
+    refunded_quantity = models.PositiveIntegerField(default=0, verbose_name='الكمية المستردة')
+    list_price = models.PositiveIntegerField(null=True, blank=True, verbose_name='سعر القائمة (د.ع)')
+    price_rule = models.ForeignKey(
+        PriceRule,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='قاعدة التسعير'
+    )
+    price_rule_name = models.CharField(max_length=100, blank=True, verbose_name='اسم قاعدة التسعير')
+
+    class Meta:
+        verbose_name = 'عنصر طلب مؤرشف'
+        verbose_name_plural = 'عناصر الطلبات المؤرشفة'
+
+    def __str__(self):
+        return f"{self.item_name} x{self.quantity}"
+
+
+class OrderChange(models.Model):
+    """سجل تغييرات الطلبات - Order change log shipped to head office by sync_branch"""
+    ACTION_CREATE = 'create'
+    ACTION_VOID = 'void'
+    ACTION_REFUND = 'refund'
+    ACTION_CHOICES = [
+        (ACTION_CREATE, 'إنشاء'),
+        (ACTION_VOID, 'إلغاء'),
+        (ACTION_REFUND, 'استرداد'),
+    ]
+
+    order_id = models.BigIntegerField(db_index=True, verbose_name='رقم الطلب الداخلي')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default=ACTION_CREATE, verbose_name='العملية')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='وقت التغيير')
+
+    class Meta:
+        verbose_name = 'تغيير طلب'
+        verbose_name_plural = 'سجل تغييرات الطلبات'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.get_action_display()} #{self.order_id}"
+
+
+class OrderAdjustment(models.Model):
+    """سجل الإلغاء والاسترداد - Append-only audit trail of voids and refunds"""
+    KIND_VOID = 'void'
+    KIND_REFUND = 'refund'
+    KIND_CHOICES = [
+        (KIND_VOID, 'إلغاء'),
+        (KIND_REFUND, 'استرداد جزئي'),
+    ]
+
+    order_id = models.BigIntegerField(db_index=True, verbose_name='رقم الطلب الداخلي')
+    order_number = models.CharField(max_length=20, verbose_name='رقم الطلب')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='النوع')
+    amount = models.PositiveIntegerField(verbose_name='المبلغ المسترد (د.ع)')
+    lines = models.JSONField(default=list, verbose_name='الأصناف المستردة')
+    reason = models.TextField(blank=True, verbose_name='السبب')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='الوقت')
+
+    class Meta:
+        verbose_name = 'إلغاء / استرداد'
+        verbose_name_plural = 'سجل الإلغاء والاسترداد'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.order_number} - {self.amount:,} د.ع"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('OrderAdjustment rows are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('OrderAdjustment rows are append-only')
+
+
+class SyncState(models.Model):
+    """حالة المزامنة - High-water mark of the change log per sync target"""
+    target = models.CharField(max_length=200, unique=True, verbose_name='الوجهة')
+    last_change_id = models.BigIntegerField(default=0, verbose_name='آخر تغيير مرسل')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='آخر مزامنة')
+
+    class Meta:
+        verbose_name = 'حالة مزامنة'
+        verbose_name_plural = 'حالات المزامنة'
+
+    def __str__(self):
+        return f"{self.target} @ {self.last_change_id}"
+
+
+class BranchOrder(models.Model):
+    """طلبات الفروع - Orders replicated from branches (head office only)"""
+    branch = models.CharField(max_length=50, verbose_name='الفرع')
+    source_id = models.BigIntegerField(verbose_name='رقم الطلب في الفرع')
+    order_number = models.CharField(max_length=20, verbose_name='رقم الطلب')
+    created_at = models.DateTimeField(verbose_name='تاريخ ووقت الطلب')
+    total_amount = models.PositiveIntegerField(default=0, verbose_name='المجموع (د.ع)')
+    amount_paid = models.PositiveIntegerField(default=0, verbose_name='المبلغ المدفوع (د.ع)')
+    change_given = models.PositiveIntegerField(default=0, verbose_name='الباقي (د.ع)')
+    notes = models.TextField(blank=True, verbose_name='ملاحظات')
+    is_voided = models.BooleanField(default=False, verbose_name='ملغى')
+    refunded_amount = models.PositiveIntegerField(default=0, verbose_name='المبلغ المسترد (د.ع)')
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الاستلام')
+
+    class Meta:
+        verbose_name = 'طلب فرع'
+        verbose_name_plural = 'طلبات الفروع'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'source_id'], name='unique_branch_order'),
+        ]
+        indexes = [
+            models.Index(fields=['branch', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.branch} - طلب #{self.order_number}"
+
+
+class BranchOrderItem(models.Model):
+    """عناصر طلبات الفروع - Replicated order items (head office only)"""
+    order = models.ForeignKey(
+        BranchOrder,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='الطلب'
+    )
+    item_name = models.CharField(max_length=200, verbose_name='اسم الصنف')
+    quantity = models.PositiveIntegerField(default=1, verbose_name='الكمية')
+    unit_price = models.PositiveIntegerField(verbose_name='سعر الوحدة (د.ع)')
+    subtotal = models.PositiveIntegerField(verbose_name='المجموع الفرعي (د.ع)')
+
+    class Meta:
+        verbose_name = 'عنصر طلب فرع'
+        verbose_name_plural = 'عناصر طلبات الفروع'
+
+    def __str__(self):
+        return f"{self.item_name} x{self.quantity}"
+
+
+class BranchDailySales(models.Model):
+    """مبيعات الفروع اليومية - Per-branch daily rollup, updated incrementally on ingest"""
+    branch = models.CharField(max_length=50, verbose_name='الفرع')
+    date = models.DateField(verbose_name='التاريخ')
+    orders_count = models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')
+    revenue = models.PositiveBigIntegerField(default=0, verbose_name='الإيرادات (د.ع)')
+
+    class Meta:
+        verbose_name = 'مبيعات فرع يومية'
+        verbose_name_plural = 'مبيعات الفروع اليومية'
+        ordering = ['-date', 'branch']
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'date'], name='unique_branch_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.branch} {self.date}"
+
+
+class HourlySales(models.Model):
+    """مبيعات الساعة - Hourly sales bucket (local time), updated incrementally at checkout"""
+    date = models.DateField(verbose_name='التاريخ')
+    hour = models.PositiveSmallIntegerField(verbose_name='الساعة')
+    weekday = models.PositiveSmallIntegerField(verbose_name='يوم الأسبوع')  # Monday=0
+    orders_count = models.IntegerField(default=0, verbose_name='عدد الطلبات')
+    revenue = models.BigIntegerField(default=0, verbose_name='الإيرادات (د.ع)')
+
+    class Meta:
+        verbose_name = 'مبيعات ساعة'
+        verbose_name_plural = 'المبيعات بالساعة'
+        ordering = ['-date', 'hour']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'hour'], name='unique_hourly_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}:00"
+
+
+class HourlyItemSales(models.Model):
+    """مبيعات الأصناف بالساعة - Hourly per-item bucket (local time)"""
+    date = models.DateField(verbose_name='التاريخ')
+    hour = models.PositiveSmallIntegerField(verbose_name='الساعة')
+    weekday = models.PositiveSmallIntegerField(verbose_name='يوم الأسبوع')  # Monday=0
+    item_name = models.CharField(max_length=200, verbose_name='اسم الصنف')
+    quantity = models.IntegerField(default=0, verbose_name='الكمية')
+    revenue = models.BigIntegerField(default=0, verbose_name='الإيرادات (د.ع)')
+
+    class Meta:
+        verbose_name = 'مبيعات صنف بالساعة'
+        verbose_name_plural = 'مبيعات الأصناف بالساعة'
+        ordering = ['-date', 'hour', 'item_name']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'hour', 'item_name'], name='unique_hourly_item_sales'),
+        ]
+        indexes = [
+            # Covering index for per-item heatmaps and item totals over a date range
+            models.Index(
+                fields=['item_name', 'date', 'weekday', 'hour', 'quantity'],
+                name='hourly_item_heatmap_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}:00 {self.item_name}"
+
+
+class Shift(models.Model):
+    """إغلاق الوردية - Shift close (Z-report) with a frozen summary"""
+    opened_at = models.DateTimeField(unique=True, verbose_name='بداية الوردية')
+    closed_at = models.DateTimeField(db_index=True, verbose_name='نهاية الوردية')
+    orders_count = models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')
+    voided_count = models.PositiveIntegerField(default=0, verbose_name='الطلبات الملغاة')
+    total_revenue = models.PositiveBigIntegerField(default=0, verbose_name='إجمالي المبيعات (د.ع)')
+    cash_in = models.PositiveBigIntegerField(default=0, verbose_name='النقد المستلم (د.ع)')
+    cash_out = models.PositiveBigIntegerField(default=0, verbose_name='الباقي المدفوع (د.ع)')
+    refunds = models.PositiveBigIntegerField(default=0, verbose_name='المبالغ المستردة (د.ع)')
+    first_order_number = models.CharField(max_length=20, blank=True, verbose_name='أول طلب')
+    last_order_number = models.CharField(max_length=20, blank=True, verbose_name='آخر طلب')
+    item_summary = models.JSONField(default=list, verbose_name='ملخص الأصناف')
+    notes = models.TextField(blank=True, verbose_name='ملاحظات')
+
+    class Meta:
+        verbose_name = 'وردية'
+        verbose_name_plural = 'الورديات'
+        ordering = ['-closed_at']
+
+    def __str__(self):
+        return f"وردية {timezone.localtime(self.closed_at):%Y-%m-%d %H:%M}"
+
+    @property
+    def net_cash(self):
+        """Cash that should be in the drawer from this shift's sales and refunds"""
+        return self.cash_in - self.cash_out - self.refunds
+
+    @property
+    def formatted_revenue(self):
+        return f"{self.total_revenue:,} د.ع"
+
+
+class Ticket(models.Model):
+    """تذاكر التحضير - Per-station order tickets for the kitchen display"""
+    STATUS_NEW = 'new'
+    STATUS_PREPARING = 'preparing'
+    STATUS_DONE = 'done'
+    STATUS_CHOICES = [
+        (STATUS_NEW, 'جديد'),
+        (STATUS_PREPARING, 'قيد التحضير'),
+        (STATUS_DONE, 'جاهز'),
+    ]
+
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name='tickets',
+        verbose_name='المحطة'
+    )
+    order_id = models.BigIntegerField(verbose_name='رقم الطلب الداخلي')
+    order_number = models.CharField(max_length=20, verbose_name='رقم الطلب')
+    lines = models.JSONField(default=list, verbose_name='الأصناف')
+    notes = models.TextField(blank=True, verbose_name='ملاحظات')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_NEW, verbose_name='الحالة')
+    # Global change counter: every insert or status change takes the next
+    # value, so a station can ask for "everything after version N".
+    version = models.BigIntegerField(db_index=True, verbose_name='الإصدار')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='وقت الطلب')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')
+
+    class Meta:
+        verbose_name = 'تذكرة تحضير'
+        verbose_name_plural = 'تذاكر التحضير'
+        ordering = ['version']
+        indexes = [
+            models.Index(fields=['station', 'version']),
+            models.Index(fields=['station', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.station.name} - #{self.order_number}"
+
+
+class ProfileCapture(models.Model):
+    """تتبع الأداء - cProfile stats and SQL trace of one profiled request"""
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='الوقت')
+    method = models.CharField(max_length=10, verbose_name='الطريقة')
+    path = models.CharField(max_length=500, verbose_name='المسار')
+    status_code = models.PositiveSmallIntegerField(verbose_name='رمز الاستجابة')
+    duration_ms = models.FloatField(verbose_name='المدة (ms)')
+    sql_count = models.PositiveIntegerField(verbose_name='عدد الاستعلامات')
+    sql_time_ms = models.FloatField(verbose_name='وقت الاستعلامات (ms)')
+    stats = models.BinaryField(verbose_name='ملف cProfile')
+    summary = models.TextField(verbose_name='ملخص الدوال')
+    sql_trace = models.JSONField(default=list, verbose_name='الاستعلامات')
+
+    class Meta:
+        verbose_name = 'تتبع أداء'
+        verbose_name_plural = 'تتبعات الأداء'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,267 @@
+"""
+Price rules: happy hours, item/category discounts and combo bundles.
+
+Checkout never queries rules. ``PriceRule`` rows are compiled into a
+``PriceTable``, which cuts the week into segments at every rule's start and
+end minute. Each segment holds the rules active for its whole length,
+indexed by menu item and category. Pricing an order then takes one bisect
+to find the current segment and a few dict lookups per line.
+
+The table is rebuilt only when rules change. Saving or deleting a rule
+in this process invalidates it through signals (see ``CafeConfig.ready``).
+Edits made by another process are noticed by a cheap stamp query, run at
+most every ``RECHECK_INTERVAL`` seconds.
+
+Pricing policy:
+
+* A discount applies to the menu price of its item, of every item in its
+  category, or of the whole menu. When several apply, the lowest price
+  wins; a rule that would raise the price is ignored.
+* A bundle sells its items together at a fixed price. It is applied as
+  many times as the order allows, largest saving first, and only when it
+  is cheaper than its items at their discounted prices. Bundled units
+  are split into their own lines and are not discounted further. The
+  bundle price is spread over its items in proportion to their menu
+  prices, in whole dinars. Any remainder goes to a component bought
+  once per bundle; without one, the bundle may come to a few dinars
+  less than its price.
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import BundleItem, PriceRule
+
+
+# Seconds between checks for rule edits made by other processes
+RECHECK_INTERVAL = 30
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def _week_intervals(rule):
+    """Minute-of-week ``[start, end)`` intervals in which ``rule`` is active."""
+    days = sorted({int(day) for day in rule.weekdays}) or range(7)
+    if rule.start_time is None:
+        return [(day * MINUTES_PER_DAY, (day + 1) * MINUTES_PER_DAY) for day in days]
+
+    start = rule.start_time.hour * 60 + rule.start_time.minute
+    end = rule.end_time.hour * 60 + rule.end_time.minute
+    intervals = []
+    for day in days:
+        offset = day * MINUTES_PER_DAY
+        if start < end:
+            intervals.append((offset + start, offset + end))
+        else:
+            # Past midnight: the tail belongs to the next day (Sunday wraps to Monday)
+            next_day = (offset + MINUTES_PER_DAY) % MINUTES_PER_WEEK
+            intervals.append((offset + start, offset + MINUTES_PER_DAY))
+            intervals.append((next_day, next_day + end))
+    return intervals
+
+
+class Segment:
+    """Rules active during one stretch of the week."""
+
+    def __init__(self):
+        self.by_item = defaultdict(list)
+        self.by_category = defaultdict(list)
+        self.whole_menu = []
+        self.bundles = []
+
+    def discounts(self, menu_item):
+        return self.by_item.get(menu_item.id, []) + self.by_category.get(menu_item.category_id, []) + self.whole_menu
+
+
+class PriceTable:
+    """Compiled, read-only view of the active rules; safe to share between threads."""
+
+    def __init__(self, rules, bundle_items):
+        boundaries = {0, MINUTES_PER_WEEK}
+        rule_intervals = []
+        for rule in rules:
+            intervals = _week_intervals(rule)
+            rule_intervals.append((rule, intervals))
+            for start, end in intervals:
+                boundaries.update((start, end))
+        self.boundaries = sorted(boundaries)[:-1]
+
+        self.segments = [Segment() for _ in self.boundaries]
+        for rule, intervals in rule_intervals:
+            for index, minute in enumerate(self.boundaries):
+                if not any(start <= minute < end for start, end in intervals):
+                    continue
+                segment = self.segments[index]
+                if rule.kind == PriceRule.KIND_BUNDLE:
+                    components = bundle_items.get(rule.id)
+                    if components:
+                        segment.bundles.append((rule, components))
+                elif rule.menu_item_id:
+                    segment.by_item[rule.menu_item_id].append(rule)
+                elif rule.category_id:
+                    segment.by_category[rule.category_id].append(rule)
+                else:
+                    segment.whole_menu.append(rule)
+
+    def segment_at(self, when):
+        local = timezone.localtime(when)
+        minute = local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute
+        return self.segments[bisect.bisect_right(self.boundaries, minute) - 1]
+
+    def price_order(self, lines, when=None):
+        """Price an order's lines.
+
+        ``lines`` is a list of ``(menu_item, quantity)``. Returns a list of
+        dicts with ``menu_item``, ``quantity``, ``list_price``,
+        ``unit_price`` and ``price_rule`` (None at menu price), in the
+        order of ``lines``. A line partly used by a bundle comes back as
+        two lines.
+        """
+        segment = self.segment_at(when or timezone.now())
+        remaining = [quantity for _, quantity in lines]
+        bundled = [[] for _ in lines]
+        if segment.bundles:
+            self._apply_bundles(segment, lines, remaining, bundled)
+
+        priced = []
+        for index, (menu_item, _) in enumerate(lines):
+            for quantity, unit_price, rule in bundled[index]:
+                priced.append(_line(menu_item, quantity, unit_price, rule))
+            if remaining[index]:
+                unit_price, rule = self.discounted_price(menu_item, segment)
+                priced.append(_line(menu_item, remaining[index], unit_price, rule))
+        return priced
+
+    def discounted_price(self, menu_item, segment):
+        """Lowest ``(unit_price, rule)`` for one item; ``rule`` is None at menu price."""
+        best_price, best_rule = menu_item.price, None
+        for rule in segment.discounts(menu_item):
+            if rule.fixed_price is not None:
+                price = rule.fixed_price
+            else:
+                price = menu_item.price * (100 - rule.percent_off) // 100
+            if price < best_price:
+                best_price, best_rule = price, rule
+        return best_price, best_rule
+
+    def _apply_bundles(self, segment, lines, remaining, bundled):
+        positions = defaultdict(list)
+        prices = {}
+        best_prices = {}
+        for index, (menu_item, _) in enumerate(lines):
+            positions[menu_item.id].append(index)
+            prices[menu_item.id] = menu_item.price
+            best_prices[menu_item.id] = self.discounted_price(menu_item, segment)[0]
+
+        def saving(bundle):
+            # Against the discounted prices: a bundle never costs more than its items would
+            rule, components = bundle
+            if not all(item_id in prices for item_id, _ in components):
+                return 0
+            return sum(best_prices[item_id] * quantity for item_id, quantity in components) - rule.fixed_price
+
+        for rule, components in sorted(segment.bundles, key=saving, reverse=True):
+            if saving((rule, components)) <= 0:
+                continue
+            times = min(
+                sum(remaining[index] for index in positions[item_id]) // quantity
+                for item_id, quantity in components
+            )
+            if not times:
+                continue
+
+            for item_id, quantity, unit_price in _split_bundle_price(rule.fixed_price, components, prices):
+                needed = times * quantity
+                for index in positions[item_id]:
+                    taken = min(remaining[index], needed)
+                    if taken:
+                        remaining[index] -= taken
+                        needed -= taken
+                        bundled[index].append((taken, unit_price, rule))
+
+
+def _split_bundle_price(bundle_price, components, prices):
+    """Whole-dinar unit prices for a bundle's components, proportional to menu prices."""
+    menu_total = sum(prices[item_id] * quantity for item_id, quantity in components)
+    shares = [
+        [item_id, quantity, prices[item_id] * bundle_price // menu_total]
+        for item_id, quantity in components
+    ]
+    remainder = bundle_price - sum(quantity * unit_price for _, quantity, unit_price in shares)
+    for share in shares:
+        if share[1] == 1:
+            share[2] += remainder
+            break
+    return shares
+
+
+def _line(menu_item, quantity, unit_price, rule):
+    return {
+        'menu_item': menu_item,
+        'quantity': quantity,
+        'list_price': menu_item.price,
+        'unit_price': unit_price,
+        'price_rule': rule,
+    }
+
+
+# ==================== Compiled table cache ====================
+
+_lock = threading.Lock()
+_table = None
+_stamp = None
+_checked_at = 0.0
+
+
+def _rules_stamp():
+    """Changes whenever a rule is added, edited or deleted (one aggregate query)."""
+    return tuple(PriceRule.objects.aggregate(count=Count('id'), updated=Max('updated_at')).values())
+
+
+def compile_rules():
+    """Build a ``PriceTable`` from the active rules (two queries)."""
+    rules = list(PriceRule.objects.filter(is_active=True))
+    bundle_items = defaultdict(list)
+    for rule_id, menu_item_id, quantity in BundleItem.objects.filter(
+        rule__is_active=True, rule__kind=PriceRule.KIND_BUNDLE
+    ).values_list('rule_id', 'menu_item_id', 'quantity'):
+        bundle_items[rule_id].append((menu_item_id, quantity))
+    return PriceTable(rules, bundle_items)
+
+
+def get_price_table():
+    """The compiled table, rebuilt only if the rules changed since it was built."""
+    global _table, _stamp, _checked_at
+
+    table = _table
+    if table is not None and time.monotonic() - _checked_at < RECHECK_INTERVAL:
+        return table
+
+    with _lock:
+        if _table is not None and time.monotonic() - _checked_at < RECHECK_INTERVAL:
+            return _table
+        stamp = _rules_stamp()
+        if _table is None or stamp != _stamp:
+            _table, _stamp = compile_rules(), stamp
+        _checked_at = time.monotonic()
+        return _table
+
+
+def _drop_table():
+    global _table
+
+    with _lock:
+        _table = None
+
+
+def invalidate(**kwargs):
+    """Signal receiver: drop the compiled table once a rule change commits."""
+    # Rebuilding before the commit would compile the old rules again
+    transaction.on_commit(_drop_table)
@@ -0,0 +1,333 @@
+"""
+Receipt rendering for reprints and end-of-day audits.
+
+Thermal printers have no Arabic glyphs, so every receipt is drawn with
+Pillow as a 1-bit image. When ``arabic_reshaper`` and ``python-bidi``
+are installed, Arabic text is shaped and reordered for display first.
+The images then become one of:
+
+* an ESC/POS byte stream (raster images plus a cut after each receipt),
+  which can be sent to the printer as-is (shift Z-reports too), or
+* A4 sheets with receipts tiled in two columns, served as a multi-page
+  PDF or one PNG page at a time.
+
+Rendering is CPU-bound, so batches are split into chunks and rendered on
+a process pool of ``workers`` processes. For that reason this module has
+no Django imports and works on plain data (see ``_receipt_data`` in
+views). Pillow and the Arabic helpers are imported on first use, not when
+the server starts.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from threading import Lock
+
+
+# 80 mm paper at 203 dpi; use 384 for 58 mm printers
+RECEIPT_WIDTH = 576
+MARGIN = 16
+
+# Row heights in dots; the layout is fixed so heights are known before drawing
+TITLE_HEIGHT = 56
+ROW_HEIGHT = 34
+RULE_HEIGHT = 14
+
+# A4 at 150 dpi, two receipt columns per sheet
+SHEET_SIZE = (1240, 1754)
+SHEET_MARGIN = 30
+
+# ESC/POS: rows per raster command, small enough for any printer buffer
+RASTER_BAND = 256
+
+FONT_CANDIDATES = [
+    'C:/Windows/Fonts/tahoma.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/noto/NotoSansArabic-Regular.ttf',
+]
+
+
+# ==================== Text ====================
+
+@lru_cache(maxsize=None)
+def _font(path, size):
+    from PIL import ImageFont
+
+    for candidate in ([path] if path else []) + FONT_CANDIDATES:
+        if candidate and os.path.exists(candidate):
+            return ImageFont.truetype(candidate, size)
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=1)
+def _shaper():
+    try:
+        import arabic_reshaper
+        from bidi.algorithm import get_display
+    except ImportError:  # Optional: text is drawn unshaped
+        return None
+    return lambda text: get_display(arabic_reshaper.reshape(text))
+
+
+@lru_cache(maxsize=4096)
+def shape(text):
+    """Arabic text in visual order, ready to draw left to right."""
+    shaper = _shaper()
+    return shaper(text) if shaper else text
+
+
+@lru_cache(maxsize=4096)
+def _fit(text, font, width):
+    """Shape ``text`` and cut it down to ``width`` dots."""
+    shaped = shape(text)
+    if font.getlength(shaped) <= width:
+        return shaped
+    while text and font.getlength(shape(text + '…')) > width:
+        text = text[:-1]
+    return shape(text + '…')
+
+
+@lru_cache(maxsize=4096)
+def _text_mask(text, font):
+    """``text`` drawn once as an 'L' mask; receipts repeat most of their strings."""
+    from PIL import Image, ImageDraw
+
+    _, _, right, bottom = font.getbbox(text)
+    mask = Image.new('L', (max(right, 1), max(bottom, 1)), 0)
+    ImageDraw.Draw(mask).text((0, 0), text, font=font, fill=255)
+    return mask, round(font.getlength(text))
+
+
+# ==================== Receipts ====================
+
+def layout(receipt):
+    """Rows of a receipt as ``(kind, right_text, left_text)``."""
+    if receipt.get('kind') == 'shift':
+        return shift_layout(receipt)
+    rows = [('title', receipt['header'], ''), ('center', 'نسخة - إعادة طباعة', '')]
+    if receipt['voided']:
+        rows.append(('title', '*** ملغى ***', ''))
+    rows += [
+        ('row', f"طلب #{receipt['number']}", receipt['created']),
+        ('rule', '', ''),
+    ]
+    rows += [('row', f'{quantity}× {name}', f'{subtotal:,}') for name, quantity, subtotal in receipt['lines']]
+    rows += [
+        ('rule', '', ''),
+        ('bold', 'المجموع', f"{receipt['total']:,} د.ع"),
+        ('row', 'المدفوع', f"{receipt['paid']:,} د.ع"),
+        ('row', 'الباقي', f"{receipt['change']:,} د.ع"),
+    ]
+    if receipt['refunded']:
+        rows.append(('row', 'المسترد', f"{receipt['refunded']:,} د.ع"))
+    rows.append(('center', 'شكراً لزيارتكم', ''))
+    return rows
+
+
+def shift_layout(report):
+    """Rows of a Z-report; drawn and cut like a receipt."""
+    rows = [
+        ('title', report['header'], ''),
+        ('center', 'تقرير إغلاق الوردية', ''),
+        ('row', f"وردية #{report['number']}", ''),
+        ('row', 'من', report['opened']),
+        ('row', 'إلى', report['closed']),
+    ]
+    if report['first_order']:
+        rows.append(('row', 'الطلبات', f"{report['first_order']} - {report['last_order']}"))
+    rows.append(('rule', '', ''))
+    rows += [('row', f'{quantity}× {name}', f'{revenue:,}') for name, quantity, revenue in report['lines']]
+    rows += [
+        ('rule', '', ''),
+        ('row', 'عدد الطلبات', f"{report['orders_count']:,}"),
+        ('row', 'الطلبات الملغاة', f"{report['voided_count']:,}"),
+        ('bold', 'إجمالي المبيعات', f"{report['total_revenue']:,} د.ع"),
+        ('row', 'النقد المستلم', f"{report['cash_in']:,} د.ع"),
+        ('row', 'الباقي المدفوع', f"{report['cash_out']:,} د.ع"),
+        ('row', 'المبالغ المستردة', f"{report['refunds']:,} د.ع"),
+        ('bold', 'صافي النقد', f"{report['net_cash']:,} د.ع"),
+    ]
+    return rows
+
+
+def row_heights(receipt):
+    heights = {'title': TITLE_HEIGHT, 'rule': RULE_HEIGHT}
+    return [heights.get(kind, ROW_HEIGHT) for kind, _, _ in layout(receipt)]
+
+
+def receipt_height(receipt):
+    return MARGIN * 2 + sum(row_heights(receipt))
+
+
+def render_receipt(receipt, font_path=None):
+    """Draw one receipt as a 1-bit ink image: 1 is black, as printers expect."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('L', (RECEIPT_WIDTH, receipt_height(receipt)), 0)
+    draw = ImageDraw.Draw(image)
+    regular, bold, title = _font(font_path, 24), _font(font_path, 26), _font(font_path, 36)
+    right = RECEIPT_WIDTH - MARGIN
+
+    def put(text, font, x, y, align):
+        mask, width = _text_mask(text, font)
+        x = {'left': x, 'right': x - width, 'center': x - width // 2}[align]
+        image.paste(255, (x, y), mask)
+
+    y = MARGIN
+    for kind, right_text, left_text in layout(receipt):
+        if kind == 'rule':
+            draw.line((MARGIN, y + RULE_HEIGHT // 2, right, y + RULE_HEIGHT // 2), fill=255, width=2)
+            y += RULE_HEIGHT
+            continue
+        if kind in ('title', 'center'):
+            font = title if kind == 'title' else regular
+            put(_fit(right_text, font, right - MARGIN), font, RECEIPT_WIDTH // 2, y, 'center')
+            y += TITLE_HEIGHT if kind == 'title' else ROW_HEIGHT
+            continue
+
+        font = bold if kind == 'bold' else regular
+        left_width = 0
+        if left_text:
+            left_text = shape(left_text)
+            left_width = _text_mask(left_text, font)[1]
+            put(left_text, font, MARGIN, y, 'left')
+        put(_fit(right_text, font, right - MARGIN - left_width - 12), font, right, y, 'right')
+        y += ROW_HEIGHT
+
+    return image.convert('1', dither=Image.Dither.NONE)
+
+
+def escpos_bytes(image):
+    """ESC/POS commands that print an ink image and cut the paper."""
+    width_bytes = (image.width + 7) // 8
+    out = [b'\x1b@']  # ESC @: reset
+    for top in range(0, image.height, RASTER_BAND):
+        band = image.crop((0, top, image.width, min(top + RASTER_BAND, image.height)))
+        # GS v 0: raster bit image, normal density
+        out.append(b'\x1dv0\x00' + width_bytes.to_bytes(2, 'little') + band.height.to_bytes(2, 'little'))
+        out.append(band.tobytes())
+    out.append(b'\x1bd\x03\x1dV\x01')  # Feed 3 lines, partial cut
+    return b''.join(out)
+
+
+# ==================== Batches ====================
+
+def render_escpos_chunk(receipts, font_path=None):
+    """Worker entry point: one ESC/POS byte string for a chunk of receipts."""
+    return b''.join(escpos_bytes(render_receipt(receipt, font_path)) for receipt in receipts)
+
+
+def _cut(receipt, top, limit):
+    """The last row boundary of ``receipt`` below ``top`` and within ``limit`` dots, or None."""
+    bottom, boundary = MARGIN, None
+    for height in row_heights(receipt):
+        bottom += height
+        if bottom > top + limit:
+            break
+        if bottom > top:
+            boundary = bottom
+    return boundary
+
+
+def paginate(receipts):
+    """Split receipts into A4 sheets of ``(receipt, top, bottom)`` pieces.
+
+    A receipt that fits in a column is kept whole. A taller one fills the
+    space left in the current column and continues at the top of the
+    next column or sheet, cut between rows.
+    """
+    column_height = SHEET_SIZE[1] - SHEET_MARGIN * 2
+    sheets, columns, used = [], [[]], 0
+    for receipt in receipts:
+        height, top = receipt_height(receipt), 0
+        while top < height:
+            space = column_height - used
+            if height - top <= space:
+                bottom = height
+            elif height - top > column_height:
+                # A fresh column always takes a piece, even cut mid-row
+                bottom = _cut(receipt, top, space) or (None if columns[-1] else top + space)
+            else:
+                bottom = None
+            if bottom is None:
+                if len(columns) == 2:
+                    sheets.append(columns)
+                    columns = []
+                columns.append([])
+                used = 0
+                continue
+            columns[-1].append((receipt, top, bottom))
+            used += bottom - top + SHEET_MARGIN
+            top = bottom
+    if columns[-1]:
+        sheets.append(columns)
+    return sheets
+
+
+def render_sheet(columns, font_path=None):
+    """Worker entry point: one sheet as ``(size, packed 1-bit pixels)``."""
+    from PIL import Image, ImageChops
+
+    sheet = Image.new('1', SHEET_SIZE, 0)
+    images = {}  # A receipt cut in two may have both pieces on this sheet
+    for index, pieces in enumerate(columns):
+        x = SHEET_MARGIN + index * (RECEIPT_WIDTH + SHEET_MARGIN)
+        y = SHEET_MARGIN
+        for receipt, top, bottom in pieces:
+            image = images.get(id(receipt))
+            if image is None:
+                image = images[id(receipt)] = render_receipt(receipt, font_path)
+            if (top, bottom) != (0, image.height):
+                image = image.crop((0, top, image.width, bottom))
+            sheet.paste(image, (x, y))
+            y += image.height + SHEET_MARGIN
+    # Ink to paper: black text on white
+    sheet = ImageChops.invert(sheet)
+    return sheet.size, sheet.tobytes()
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _map(func, chunks, workers, font_path):
+    """``map`` over chunks, on the process pool when more than one worker is allowed."""
+    global _pool
+    if workers <= 1 or len(chunks) <= 1:
+        return (func(chunk, font_path) for chunk in chunks)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool.map(func, chunks, [font_path] * len(chunks))
+
+
+def stream_escpos(receipts, workers=1, font_path=None, chunk_size=25):
+    """Yield the ESC/POS stream chunk by chunk, in order."""
+    chunks = [receipts[start:start + chunk_size] for start in range(0, len(receipts), chunk_size)]
+    yield from _map(render_escpos_chunk, chunks, workers, font_path)
+
+
+def render_pages(sheets, workers=1, font_path=None):
+    from PIL import Image
+
+    return [Image.frombytes('1', size, data) for size, data in _map(render_sheet, sheets, workers, font_path)]
+
+
+def render_pdf(receipts, workers=1, font_path=None):
+    pages = render_pages(paginate(receipts), workers, font_path)
+    buffer = io.BytesIO()
+    pages[0].save(buffer, 'PDF', resolution=150, save_all=True, append_images=pages[1:])
+    return buffer.getvalue(), len(pages)
+
+
+def render_png_page(receipts, page, font_path=None):
+    """One sheet as PNG (1-based ``page``) plus the number of sheets."""
+    sheets = paginate(receipts)
+    if not 1 <= page <= len(sheets):
+        raise ValueError(f'page {page} out of 1..{len(sheets)}')
+    image, = render_pages(sheets[page - 1:page], font_path=font_path)
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue(), len(sheets)
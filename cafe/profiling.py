@@ -0,0 +1,234 @@
+"""
+Opt-in per-request profiling.
+
+``ProfilingMiddleware`` profiles a single request when it carries either:
+
+* an ``X-Cafe-Profile`` header holding a token from
+  ``python manage.py profile_token``, or
+* the signed cookie set by the "profile my requests" toggle on the
+  profile captures admin page. Admin pages themselves are never profiled.
+
+For that request it records cProfile stats and every SQL statement on
+every database alias, including queries the async views run on the
+``fanout`` pool. Captures are kept as ``ProfileCapture`` rows, a ring
+buffer of the last ``settings.CAFE_PROFILE_BUFFER`` requests, and the
+admin downloads them as ``.prof`` files (snakeviz, flameprof, gprof2dot).
+
+When neither the header nor the cookie is present, the middleware does
+two dictionary lookups per request and nothing else.
+
+Under ASGI both the event loop thread and the request's sync worker
+thread are traced. Other requests served concurrently on those threads
+can show up in the stats.
+
+cProfile, pstats and marshal are imported on the first capture, not when
+the server starts.
+"""
+
+import io
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.urls import reverse
+
+
+HEADER = 'HTTP_X_CAFE_PROFILE'
+COOKIE_NAME = 'cafe_profile'
+SALT = 'cafe.profiling'
+
+_active = ContextVar('cafe_profile_capture', default=None)
+
+logger = logging.getLogger(__name__)
+
+
+def token_max_age():
+    return getattr(settings, 'CAFE_PROFILE_MAX_AGE', 3600)
+
+
+def make_token():
+    """Header value that enables profiling until it expires."""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def profiling_requested(request):
+    token = request.META.get(HEADER)
+    if token is not None:
+        try:
+            signing.TimestampSigner(salt=SALT).unsign(token, max_age=token_max_age())
+            return True
+        except signing.BadSignature:
+            return False
+
+    if COOKIE_NAME in request.COOKIES:
+        if request.path.startswith(reverse('admin:index')):
+            return False
+        return request.get_signed_cookie(COOKIE_NAME, default=None, salt=SALT, max_age=token_max_age()) is not None
+
+    return False
+
+
+class RequestCapture:
+    """cProfile + SQL trace for one request, across the threads it uses."""
+
+    def __init__(self):
+        self.profilers = []
+        self.queries = []
+        self.duration = None
+
+    def attach(self):
+        """Start profiling and SQL tracing on the current thread."""
+        recorders = [(connections[alias], self._recorder(alias)) for alias in connections]
+        for connection, recorder in recorders:
+            connection.execute_wrappers.append(recorder)
+
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            self.profilers.append(profiler)
+        except ValueError:
+            # Python 3.12+ allows one active profiler, and it already sees every thread
+            profiler = None
+        return profiler, recorders
+
+    def detach(self, handle):
+        profiler, recorders = handle
+        if profiler is not None:
+            profiler.disable()
+        for connection, recorder in recorders:
+            connection.execute_wrappers.remove(recorder)
+
+    def _recorder(self, alias):
+        def record(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                # list.append is atomic, so several threads can record at once
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'many': many,
+                    'ms': round((time.perf_counter() - start) * 1000, 3),
+                })
+        return record
+
+    def wrap(self, func):
+        """Make ``func`` traced when it runs on a pool thread."""
+        def traced(*args):
+            handle = self.attach()
+            try:
+                return func(*args)
+            finally:
+                self.detach(handle)
+        return traced
+
+    def stats(self):
+        """Merged pstats of every thread, or None if nothing was profiled."""
+        if not self.profilers:
+            return None
+
+        import pstats
+
+        stats = pstats.Stats(self.profilers[0], stream=io.StringIO())
+        for profiler in self.profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+    def save(self, request, response):
+        """Store the capture; profiling must never break the request itself."""
+        try:
+            return self._save(request, response)
+        except Exception:
+            logger.exception('Could not store profile of %s', request.path)
+
+    def _save(self, request, response):
+        import marshal
+
+        from .models import ProfileCapture
+
+        stats = self.stats()
+        summary = io.StringIO()
+        if stats is not None:
+            stats.stream = summary
+            stats.sort_stats('cumulative').print_stats(40)
+
+        capture = ProfileCapture.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status_code=response.status_code,
+            duration_ms=round(self.duration * 1000, 3),
+            sql_count=len(self.queries),
+            sql_time_ms=round(sum(query['ms'] for query in self.queries), 3),
+            # Same format as pstats.Stats.dump_stats()
+            stats=marshal.dumps(stats.stats if stats is not None else {}),
+            summary=summary.getvalue(),
+            sql_trace=self.queries,
+        )
+
+        # Ring buffer: keep only the newest captures
+        keep = getattr(settings, 'CAFE_PROFILE_BUFFER', 50)
+        ProfileCapture.objects.filter(id__lte=capture.id - keep).delete()
+        return capture
+
+
+def current_capture():
+    """The capture of the request being profiled in this context, if any."""
+    return _active.get()
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profiling_requested(request):
+            return self.get_response(request)
+
+        capture = RequestCapture()
+        token = _active.set(capture)
+        started = time.perf_counter()
+        handle = capture.attach()
+        try:
+            response = self.get_response(request)
+        finally:
+            capture.detach(handle)
+            capture.duration = time.perf_counter() - started
+            _active.reset(token)
+        capture.save(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not profiling_requested(request):
+            return await self.get_response(request)
+
+        capture = RequestCapture()
+        token = _active.set(capture)
+        started = time.perf_counter()
+        # Sync views run on the request's thread-sensitive worker thread,
+        # async views on the event loop: trace both.
+        loop_handle = capture.attach()
+        sync_handle = await sync_to_async(capture.attach, thread_sensitive=True)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.detach, thread_sensitive=True)(sync_handle)
+            capture.detach(loop_handle)
+            capture.duration = time.perf_counter() - started
+            _active.reset(token)
+        await sync_to_async(capture.save, thread_sensitive=True)(request, response)
+        return response
@@ -0,0 +1,152 @@
+"""
+Branch -> head office order replication.
+
+Branches append to ``OrderChange`` in the same transaction that creates an
+order. ``sync_branch`` ships the log past its high-water mark in batches,
+and the head office ingests each batch with ``ingest_orders``. Ingest is
+idempotent: orders are keyed by (branch, source_id), so a resent batch
+inserts nothing and leaves the rollups untouched. Voids and refunds are
+logged too; they resend the order, and ingest applies only the difference
+from the state it already holds.
+"""
+
+import gzip
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    ArchivedOrder, BranchDailySales, BranchOrder, BranchOrderItem, Order, OrderChange,
+)
+
+
+def pending_changes(after_id, limit):
+    """The next ``limit`` change-log entries after the high-water mark."""
+    return list(OrderChange.objects.filter(id__gt=after_id).order_by('id')[:limit])
+
+
+def serialize_orders(order_ids):
+    """Serialize live or archived orders with their lines in two queries each."""
+    orders = list(Order.objects.filter(id__in=order_ids).prefetch_related('items'))
+    missing = set(order_ids) - {order.id for order in orders}
+    if missing:
+        orders += list(ArchivedOrder.objects.filter(id__in=missing).prefetch_related('items'))
+
+    return [{
+        'source_id': order.id,
+        'order_number': order.order_number,
+        'created_at': order.created_at.isoformat(),
+        'total_amount': order.total_amount,
+        'amount_paid': order.amount_paid,
+        'change_given': order.change_given,
+        'notes': order.notes,
+        'is_voided': order.is_voided,
+        'refunded_amount': order.refunded_amount,
+        'items': [[item.item_name, item.quantity, item.unit_price, item.subtotal]
+                  for item in order.items.all()],
+    } for order in sorted(orders, key=lambda order: order.id)]
+
+
+def encode_batch(branch, orders):
+    """Compress a batch payload for the wire."""
+    payload = json.dumps({'branch': branch, 'orders': orders}, ensure_ascii=False)
+    return gzip.compress(payload.encode('utf-8'))
+
+
+def decode_batch(body, content_encoding=''):
+    if content_encoding == 'gzip':
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def ingest_orders(branch, orders):
+    """Insert a batch of branch orders and bump the daily rollups.
+
+    Returns the number of newly inserted orders. Already-known orders only
+    pick up voids and refunds; their rollup deltas are the difference from
+    the stored state, so retries are harmless.
+    """
+    with transaction.atomic():
+        known = {
+            branch_order.source_id: branch_order
+            for branch_order in BranchOrder.objects.filter(
+                branch=branch, source_id__in=[order['source_id'] for order in orders]
+            ).only('id', 'source_id', 'created_at', 'is_voided', 'refunded_amount')
+        }
+        fresh = [order for order in orders if order['source_id'] not in known]
+
+        # Incremental rollup: only the touched orders' days change
+        per_day = defaultdict(lambda: [0, 0])
+
+        for order in orders:
+            branch_order = known.get(order['source_id'])
+            if branch_order is None:
+                continue
+            is_voided = order.get('is_voided', False)
+            refunded_amount = order.get('refunded_amount', 0)
+            if (is_voided, refunded_amount) == (branch_order.is_voided, branch_order.refunded_amount):
+                continue
+            BranchOrder.objects.filter(id=branch_order.id).update(
+                is_voided=is_voided, refunded_amount=refunded_amount
+            )
+            totals = per_day[timezone.localdate(branch_order.created_at)]
+            totals[0] -= int(is_voided) - int(branch_order.is_voided)
+            totals[1] -= refunded_amount - branch_order.refunded_amount
+
+        branch_orders = BranchOrder.objects.bulk_create([
+            BranchOrder(
+                branch=branch,
+                source_id=order['source_id'],
+                order_number=order['order_number'],
+                created_at=parse_datetime(order['created_at']),
+                total_amount=order['total_amount'],
+                amount_paid=order['amount_paid'],
+                change_given=order['change_given'],
+                notes=order.get('notes', ''),
+                is_voided=order.get('is_voided', False),
+                refunded_amount=order.get('refunded_amount', 0),
+            ) for order in fresh
+        ])
+        if branch_orders and branch_orders[0].pk is None:
+            # Backends that cannot return ids from bulk inserts
+            ids = dict(
+                BranchOrder.objects.filter(branch=branch, source_id__in=[o.source_id for o in branch_orders])
+                .values_list('source_id', 'id')
+            )
+            for branch_order in branch_orders:
+                branch_order.pk = ids[branch_order.source_id]
+
+        BranchOrderItem.objects.bulk_create([
+            BranchOrderItem(
+                order_id=branch_order.pk,
+                item_name=item_name,
+                quantity=quantity,
+                unit_price=unit_price,
+                subtotal=subtotal,
+            )
+            for branch_order, order in zip(branch_orders, fresh)
+            for item_name, quantity, unit_price, subtotal in order['items']
+        ], batch_size=2000)
+
+        for branch_order in branch_orders:
+            totals = per_day[timezone.localdate(branch_order.created_at)]
+            totals[0] += 0 if branch_order.is_voided else 1
+            totals[1] += branch_order.total_amount - branch_order.refunded_amount
+
+        for day, (orders_count, revenue) in per_day.items():
+            if not orders_count and not revenue:
+                continue
+            updated = BranchDailySales.objects.filter(branch=branch, date=day).update(
+                orders_count=F('orders_count') + orders_count,
+                revenue=F('revenue') + revenue,
+            )
+            if not updated:
+                BranchDailySales.objects.create(
+                    branch=branch, date=day, orders_count=orders_count, revenue=revenue
+                )
+
+    return len(branch_orders)
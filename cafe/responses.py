@@ -0,0 +1,112 @@
+"""
+Compact JSON responses.
+
+``JsonResponse`` here is a drop-in for Django's. It writes UTF-8 instead of
+``\\uXXXX`` escapes, which matters for Arabic text, and it drops the
+padding after separators. Views that return lists of rows can also honour
+``?shape=columns``. With it, each column name is sent once and every row
+is a plain array (see ``columnar``).
+
+``CompressionMiddleware`` compresses large JSON responses with Brotli
+when the client accepts it and the optional ``brotli`` package is
+installed. Everything else, including HTML pages, goes to Django's
+``GZipMiddleware``: pages carry the CSRF token, and gzip's random
+filename padding is Django's mitigation against BREACH. ``brotli`` is
+imported by the first response that could use it, not at startup.
+"""
+
+import functools
+
+from django import http
+from django.core.serializers.json import DjangoJSONEncoder
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+
+class JsonResponse(http.JsonResponse):
+    """JsonResponse with UTF-8 output and no whitespace"""
+
+    def __init__(self, data, encoder=DjangoJSONEncoder, safe=True, json_dumps_params=None, **kwargs):
+        json_dumps_params = {'ensure_ascii': False, 'separators': (',', ':'), **(json_dumps_params or {})}
+        super().__init__(data, encoder=encoder, safe=safe, json_dumps_params=json_dumps_params, **kwargs)
+
+
+def wants_columns(request):
+    return request.GET.get('shape') == 'columns'
+
+
+def columnar(rows, nested=()):
+    """Pack ``[{...}, ...]`` as ``{'columns': [...], 'rows': [[...], ...]}``.
+
+    Keys listed in ``nested`` hold lists of dicts, such as order lines.
+    They are packed the same way, and their column names are listed once
+    under ``'<key>_columns'``.
+    """
+    if not rows:
+        return {'columns': [], 'rows': []}
+
+    columns = list(rows[0])
+    packed = {'columns': columns}
+    nested_columns = {}
+    for key in nested:
+        sample = next((row[key][0] for row in rows if row[key]), {})
+        nested_columns[key] = list(sample)
+        packed[f'{key}_columns'] = nested_columns[key]
+
+    packed['rows'] = [
+        [
+            [[child[name] for name in nested_columns[column]] for child in row[column]]
+            if column in nested_columns else row[column]
+            for column in columns
+        ]
+        for row in rows
+    ]
+    return packed
+
+
+_br_re = _lazy_re_compile(r'\bbr\b')
+
+
+@functools.cache
+def brotli_module():
+    """The optional brotli module, or None when it is not installed."""
+    try:
+        import brotli
+    except ImportError:  # Optional dependency; gzip is used instead
+        return None
+    return brotli
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that prefers Brotli for JSON when available and accepted"""
+
+    # Brotli quality 5 compresses API JSON better than gzip -6 at a similar speed
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        brotli = brotli_module()
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            # Brotli has no BREACH padding: keep it off pages with secrets
+            or not response.get('Content-Type', '').startswith('application/json')
+            or len(response.content) < 200
+            or not _br_re.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # Same ETag handling as GZipMiddleware: a weak ETag stays valid
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
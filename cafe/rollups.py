@@ -0,0 +1,327 @@
+"""
+Hourly sales rollups.
+
+``HourlySales`` and ``HourlyItemSales`` hold one row per local hour (and
+item). Checkout bumps them inside its own transaction (``record_order``),
+so analytics such as the hour x weekday heatmap read a few thousand small
+rows instead of aggregating the whole order history. ``rebuild`` and
+``ensure_complete`` recompute buckets from the order tables (live and
+archived) when data arrives some other way, e.g. bulk imports.
+
+Buckets hold net figures: voids and refunds subtract from the bucket of
+the original order (see ``adjustments``), and the ``net_*`` expressions
+below compute the same figures from the order tables.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, HourlyItemSales, HourlySales, Order, OrderItem,
+)
+
+
+# Python weekday order (Monday=0)
+WEEKDAY_NAMES = ['الإثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد']
+
+
+def bucket_of(moment):
+    """(local date, hour, weekday) of an aware datetime"""
+    local = timezone.localtime(moment)
+    return local.date(), local.hour, local.weekday()
+
+
+def _day_bounds(start_day, end_day):
+    start = timezone.make_aware(datetime.combine(start_day, time.min))
+    end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+    return start, end
+
+
+# ==================== Net sales expressions ====================
+
+def net_orders_count():
+    """Orders that were not voided (use on Order / ArchivedOrder)"""
+    return Count('id', filter=Q(is_voided=False))
+
+
+def net_revenue():
+    """Order revenue after refunds (use on Order / ArchivedOrder)"""
+    return Sum(F('total_amount') - F('refunded_amount'))
+
+
+def net_item_quantity():
+    """Quantity sold after refunds (use on OrderItem / ArchivedOrderItem)"""
+    return Sum(F('quantity') - F('refunded_quantity'))
+
+
+def net_item_revenue():
+    """Line revenue after refunds (use on OrderItem / ArchivedOrderItem)"""
+    return Sum(F('subtotal') - F('refunded_quantity') * F('unit_price'))
+
+
+# ==================== Incremental updates ====================
+
+def record_order(order, lines):
+    """Add a new order to its hour's buckets.
+
+    ``lines`` is an iterable of ``(item_name, quantity, subtotal)``. Call it
+    inside the transaction that creates the order.
+    """
+    item_deltas = defaultdict(lambda: [0, 0])
+    for item_name, quantity, subtotal in lines:
+        item_deltas[item_name][0] += quantity
+        item_deltas[item_name][1] += subtotal
+    apply_delta(order.created_at, 1, order.total_amount, item_deltas)
+
+
+def apply_delta(moment, orders_delta, revenue_delta, item_deltas):
+    """Add (possibly negative) deltas to the buckets of ``moment``.
+
+    ``item_deltas`` maps item name to ``(quantity_delta, revenue_delta)``.
+    """
+    day, hour, weekday = bucket_of(moment)
+    if orders_delta or revenue_delta:
+        _bump(
+            HourlySales,
+            {'date': day, 'hour': hour},
+            {'weekday': weekday},
+            orders_count=orders_delta,
+            revenue=revenue_delta,
+        )
+    for item_name, (quantity_delta, item_revenue_delta) in item_deltas.items():
+        _bump(
+            HourlyItemSales,
+            {'date': day, 'hour': hour, 'item_name': item_name},
+            {'weekday': weekday},
+            quantity=quantity_delta,
+            revenue=item_revenue_delta,
+        )
+
+
+def _bump(model, key, extra, **deltas):
+    """UPDATE ... SET f = f + delta, creating the bucket on first use."""
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**key).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **extra, **deltas)
+    except IntegrityError:
+        # Another writer created the bucket in the meantime
+        model.objects.filter(**key).update(**increments)
+
+
+# ==================== Rebuilding ====================
+
+def rebuild(start_day, end_day):
+    """Recompute all buckets for local days ``start_day``..``end_day`` from orders."""
+    with transaction.atomic():
+        # Delete first: on SQLite this takes the write lock, so no checkout
+        # can bump these buckets between the reads below and the inserts.
+        HourlySales.objects.filter(date__gte=start_day, date__lte=end_day).delete()
+        HourlyItemSales.objects.filter(date__gte=start_day, date__lte=end_day).delete()
+        order_buckets, item_buckets = _aggregate_buckets(start_day, end_day)
+        HourlySales.objects.bulk_create([
+            HourlySales(
+                date=day, hour=hour, weekday=day.weekday(),
+                orders_count=orders_count, revenue=revenue,
+            )
+            for (day, hour), (orders_count, revenue) in order_buckets.items()
+        ], batch_size=2000)
+        HourlyItemSales.objects.bulk_create([
+            HourlyItemSales(
+                date=day, hour=hour, weekday=day.weekday(), item_name=item_name,
+                quantity=quantity, revenue=revenue,
+            )
+            for (day, hour, item_name), (quantity, revenue) in item_buckets.items()
+        ], batch_size=2000)
+
+    refresh_planner_stats()
+    return len(order_buckets), len(item_buckets)
+
+
+def refresh_planner_stats():
+    """Refresh SQLite's planner statistics for the rollup tables.
+
+    Without them SQLite picks the (date, ...) unique index for heatmap item
+    queries and walks every item's rows in the range, instead of using the
+    item-first covering index.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for model in (HourlySales, HourlyItemSales):
+            cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+
+
+def _aggregate_buckets(start_day, end_day):
+    """Bucket totals computed straight from the live and archived order tables."""
+    start, end = _day_bounds(start_day, end_day)
+
+    order_buckets = defaultdict(lambda: [0, 0])
+    for model in (ArchivedOrder, Order):
+        rows = (
+            model.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(bucket_date=TruncDate('created_at'), bucket_hour=ExtractHour('created_at'))
+            .values('bucket_date', 'bucket_hour')
+            .annotate(orders_count=net_orders_count(), revenue=net_revenue())
+            .order_by()
+        )
+        for row in rows:
+            totals = order_buckets[(row['bucket_date'], row['bucket_hour'])]
+            totals[0] += row['orders_count']
+            totals[1] += row['revenue'] or 0
+
+    item_buckets = defaultdict(lambda: [0, 0])
+    for model in (ArchivedOrderItem, OrderItem):
+        rows = (
+            model.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+            .annotate(
+                bucket_date=TruncDate('order__created_at'),
+                bucket_hour=ExtractHour('order__created_at'),
+            )
+            .values('bucket_date', 'bucket_hour', 'item_name')
+            .annotate(quantity_sum=net_item_quantity(), revenue=net_item_revenue())
+            .order_by()
+        )
+        for row in rows:
+            totals = item_buckets[(row['bucket_date'], row['bucket_hour'], row['item_name'])]
+            totals[0] += row['quantity_sum'] or 0
+            totals[1] += row['revenue'] or 0
+
+    return order_buckets, item_buckets
+
+
+def stale_days(start_day, end_day):
+    """Local days whose bucket totals disagree with the order tables.
+
+    Compares orders and revenue per day against ``HourlySales`` and the
+    quantity sold per day against ``HourlyItemSales``.
+    """
+    start, end = _day_bounds(start_day, end_day)
+
+    actual = defaultdict(lambda: [0, 0, 0])
+    for model in (ArchivedOrder, Order):
+        rows = (
+            model.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(bucket_date=TruncDate('created_at'))
+            .values('bucket_date')
+            .annotate(orders_count=net_orders_count(), revenue=net_revenue())
+            .order_by()
+        )
+        for row in rows:
+            actual[row['bucket_date']][0] += row['orders_count']
+            actual[row['bucket_date']][1] += row['revenue'] or 0
+    for model in (ArchivedOrderItem, OrderItem):
+        rows = (
+            model.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+            .annotate(bucket_date=TruncDate('order__created_at'))
+            .values('bucket_date')
+            .annotate(quantity_sum=net_item_quantity())
+            .order_by()
+        )
+        for row in rows:
+            actual[row['bucket_date']][2] += row['quantity_sum'] or 0
+
+    recorded = defaultdict(lambda: [0, 0, 0])
+    for row in (
+        HourlySales.objects.filter(date__gte=start_day, date__lte=end_day)
+        .values('date')
+        .annotate(orders_count=Sum('orders_count'), revenue=Sum('revenue'))
+        .order_by()
+    ):
+        recorded[row['date']][0] = row['orders_count']
+        recorded[row['date']][1] = row['revenue']
+    for row in (
+        HourlyItemSales.objects.filter(date__gte=start_day, date__lte=end_day)
+        .values('date')
+        .annotate(quantity_sum=Sum('quantity'))
+        .order_by()
+    ):
+        recorded[row['date']][2] = row['quantity_sum']
+
+    return sorted(
+        day for day in set(actual) | set(recorded)
+        if actual.get(day, [0, 0, 0]) != recorded.get(day, [0, 0, 0])
+    )
+
+
+def ensure_complete(start_day, end_day):
+    """Rebuild only the days whose buckets are missing or out of date."""
+    days = stale_days(start_day, end_day)
+    for day in days:
+        rebuild(day, day)
+    return days
+
+
+# ==================== Heatmap ====================
+
+def heatmap_queries(start_day, end_day):
+    """Independent heatmap queries, keyed by name (see ``heatmap_payload``)."""
+    range_filter = {'date__gte': start_day, 'date__lte': end_day}
+
+    cells = (
+        HourlySales.objects.filter(**range_filter)
+        .values('weekday', 'hour')
+        .annotate(orders_count=Sum('orders_count'), revenue=Sum('revenue'))
+        .order_by()
+    )
+    item_totals = (
+        HourlyItemSales.objects.filter(**range_filter)
+        .values('item_name')
+        .annotate(quantity_sum=Sum('quantity'))
+        .order_by()
+    )
+    return {
+        'cells': lambda: list(cells),
+        'item_totals': lambda: {row['item_name']: row['quantity_sum'] for row in item_totals},
+    }
+
+
+def heatmap_payload(start_day, end_day, results, items=None, top=5):
+    """Hour x weekday matrices (rows: weekday Monday..Sunday, columns: hour 0..23).
+
+    Per-item matrices cover ``items`` when given, otherwise the ``top``
+    best-selling items of the range. They are read with one extra query
+    restricted to those items, which the item-first covering index on
+    ``HourlyItemSales`` answers without touching the other items' rows.
+    """
+    orders = [[0] * 24 for _ in range(7)]
+    revenue = [[0] * 24 for _ in range(7)]
+    for row in results['cells']:
+        orders[row['weekday']][row['hour']] = row['orders_count']
+        revenue[row['weekday']][row['hour']] = row['revenue']
+
+    item_totals = results['item_totals']
+    if items:
+        names = [name for name in items if name in item_totals]
+    else:
+        names = sorted(item_totals, key=item_totals.get, reverse=True)[:top]
+
+    item_matrices = {name: [[0] * 24 for _ in range(7)] for name in names}
+    if names:
+        rows = (
+            HourlyItemSales.objects.filter(item_name__in=names, date__gte=start_day, date__lte=end_day)
+            .values('item_name', 'weekday', 'hour')
+            .annotate(quantity_sum=Sum('quantity'))
+            .order_by()
+        )
+        for row in rows:
+            item_matrices[row['item_name']][row['weekday']][row['hour']] = row['quantity_sum']
+
+    return {
+        'date_from': start_day.isoformat(),
+        'date_to': end_day.isoformat(),
+        'weekdays': WEEKDAY_NAMES,
+        'orders': orders,
+        'revenue': revenue,
+        'items': [
+            {'item_name': name, 'total_quantity': item_totals[name], 'quantity': item_matrices[name]}
+            for name in names
+        ],
+    }
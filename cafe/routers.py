@@ -0,0 +1,98 @@
+"""
+Read/write routing for reporting queries.
+
+Heavy read-only work (statistics, order searches, admin changelists) runs
+on the ``reporting`` alias, a separate read-only connection to the same
+SQLite file. The default database runs in WAL mode, so these readers
+never block the tills' writes and the writes never block the readers.
+Each read sees everything committed when it started.
+
+Code opts in with the ``reporting_view`` decorator or the ``reporting()``
+context manager; everything else keeps using ``default``. Views that must
+read their own just-written data can pass ``?fresh=1`` to skip the
+reporting connection.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+REPORTING_DB_ALIAS = 'reporting'
+
+_use_reporting = ContextVar('cafe_use_reporting', default=False)
+
+
+def reporting_enabled():
+    return REPORTING_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def reporting():
+    """Route reads inside the block to the reporting database."""
+    token = _use_reporting.set(reporting_enabled())
+    try:
+        yield
+    finally:
+        _use_reporting.reset(token)
+
+
+def wants_fresh(request):
+    return request.GET.get('fresh', '').lower() in ('1', 'true')
+
+
+def reporting_view(view):
+    """Decorator: serve a read-only view from the reporting database."""
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if wants_fresh(request):
+                return await view(request, *args, **kwargs)
+            with reporting():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if wants_fresh(request):
+            return view(request, *args, **kwargs)
+        with reporting():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReportingRouter:
+    """Send reads to ``reporting`` when requested; all writes go to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        if _use_reporting.get():
+            return REPORTING_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same database file
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPORTING_DB_ALIAS:
+            return False
+        return None
+
+
+def enable_wal(sender, connection, **kwargs):
+    """``connection_created`` handler: put the SQLite database in WAL mode.
+
+    WAL lets the read-only reporting connection read while a till writes.
+    The mode is stored in the database file, so this is a no-op after the
+    first connection.
+    """
+    if connection.vendor == 'sqlite' and connection.alias != REPORTING_DB_ALIAS:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
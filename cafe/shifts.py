@@ -0,0 +1,128 @@
+"""
+Shift close (Z-report).
+
+Closing a shift aggregates the orders since the previous close once and
+freezes the result in a ``Shift`` row. Reports and reprints read that row
+and never re-aggregate the order tables. The aggregate and the insert run
+in one transaction that holds the database write lock from its start, so
+checkouts and archive_orders wait for the close instead of interleaving.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderAdjustment, OrderItem, Shift
+
+
+class ShiftAlreadyClosed(Exception):
+    """Another close for the same period won the race."""
+
+
+def close_shift(notes=''):
+    """Close the current shift and return its frozen ``Shift`` snapshot."""
+    try:
+        with transaction.atomic():
+            _take_write_lock()
+            # Taken under the lock: every order committed before this instant
+            # is in the totals, and no checkout or archive_orders run can
+            # commit into the window until the Shift row is saved.
+            closed_at = timezone.now()
+            previous = Shift.objects.order_by('-closed_at').first()
+            return Shift.objects.create(notes=notes, **_summarize(previous, closed_at))
+    except IntegrityError:
+        raise ShiftAlreadyClosed()
+
+
+def _take_write_lock():
+    """Take the database write lock before the first read of the transaction.
+
+    On SQLite any write statement takes it, even one that matches no rows,
+    and it is held until commit. A deferred transaction that read first
+    could not upgrade once another connection had committed.
+    """
+    Shift.objects.filter(id__isnull=True).update(notes='')
+
+
+def _summarize(previous, closed_at):
+    """Shift fields for the orders after ``previous`` up to ``closed_at``."""
+    # The order tables are scanned twice (live and archived) but only over
+    # the shift's window, which the created_at indexes narrow down.
+    totals = defaultdict(int)
+    items = defaultdict(lambda: [0, 0])
+    boundaries = []
+    for order_model, item_model in ((ArchivedOrder, ArchivedOrderItem), (Order, OrderItem)):
+        orders = order_model.objects.filter(created_at__lte=closed_at)
+        lines = item_model.objects.filter(order__created_at__lte=closed_at)
+        if previous is not None:
+            orders = orders.filter(created_at__gt=previous.closed_at)
+            lines = lines.filter(order__created_at__gt=previous.closed_at)
+
+        # Voided orders leave the count, as in the daily rollups, but are reported apart
+        summary = orders.aggregate(
+            orders_count=Count('id', filter=Q(is_voided=False)),
+            voided_count=Count('id', filter=Q(is_voided=True)),
+            total_revenue=Sum('total_amount'),
+            cash_in=Sum('amount_paid'),
+            cash_out=Sum('change_given'),
+        )
+        for field, value in summary.items():
+            totals[field] += value or 0
+
+        for row in lines.values('item_name').annotate(quantity=Sum('quantity'), revenue=Sum('subtotal')).order_by():
+            items[row['item_name']][0] += row['quantity']
+            items[row['item_name']][1] += row['revenue']
+
+        ordered = orders.order_by('created_at', 'id').values_list('created_at', 'order_number')
+        first, last = ordered.first(), ordered.last()
+        if first is not None:
+            boundaries += [first, last]
+
+    # Refunds are paid out of this shift's drawer, whenever the order was placed
+    adjustments = OrderAdjustment.objects.filter(created_at__lte=closed_at)
+    if previous is not None:
+        adjustments = adjustments.filter(created_at__gt=previous.closed_at)
+    totals['refunds'] = adjustments.aggregate(total=Sum('amount'))['total'] or 0
+
+    boundaries.sort()
+    if previous is not None:
+        opened_at = previous.closed_at
+    elif boundaries:
+        opened_at = boundaries[0][0]
+    else:
+        opened_at = closed_at
+
+    return {
+        'opened_at': opened_at,
+        'closed_at': closed_at,
+        'first_order_number': boundaries[0][1] if boundaries else '',
+        'last_order_number': boundaries[-1][1] if boundaries else '',
+        'item_summary': [
+            {'item_name': name, 'quantity': quantity, 'revenue': revenue}
+            for name, (quantity, revenue) in sorted(items.items(), key=lambda item: item[1][0], reverse=True)
+        ],
+        **totals,
+    }
+
+
+def serialize_shift(shift, with_items=True):
+    data = {
+        'id': shift.id,
+        'opened_at': shift.opened_at.isoformat(),
+        'closed_at': shift.closed_at.isoformat(),
+        'orders_count': shift.orders_count,
+        'voided_count': shift.voided_count,
+        'total_revenue': shift.total_revenue,
+        'cash_in': shift.cash_in,
+        'cash_out': shift.cash_out,
+        'refunds': shift.refunds,
+        'net_cash': shift.net_cash,
+        'first_order_number': shift.first_order_number,
+        'last_order_number': shift.last_order_number,
+        'notes': shift.notes,
+    }
+    if with_items:
+        data['items'] = shift.item_summary
+    return data
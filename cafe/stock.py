@@ -0,0 +1,92 @@
+"""
+Stock tracking for menu items and recipe ingredients.
+
+Stock is optional: a menu item with ``stock_quantity = NULL`` is not
+tracked, and an item without recipe lines consumes no ingredients.
+Checkout calls ``consume_stock`` inside its transaction. Every decrement
+is one conditional ``UPDATE ... SET stock = stock - n WHERE stock >= n``,
+so concurrent tills never oversell and never read-modify-write a level.
+All reads (which items are tracked, recipes) happen before the
+transaction, so the write lock is only held for the UPDATEs themselves.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Case, F, Value, When
+
+from .models import Ingredient, MenuItem, RecipeLine
+
+
+class OutOfStock(Exception):
+    """Raised when a checkout needs more than is in stock."""
+
+    def __init__(self, names):
+        self.names = names
+        super().__init__(', '.join(names))
+
+
+def parse_stock(value):
+    """Form/JSON stock value: empty means untracked, otherwise a count >= 0."""
+    if value is None or value == '':
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError('stock cannot be negative')
+    return value
+
+
+def plan_stock(menu_items, quantities):
+    """Precompute what a checkout consumes, outside the transaction.
+
+    ``menu_items`` maps id to ``MenuItem`` and ``quantities`` maps id to
+    the ordered quantity. Returns ``(item_needs, ingredient_needs)``, both
+    ``{id: quantity}`` and sorted by id so concurrent checkouts touch rows
+    in the same order.
+    """
+    item_needs = {
+        item_id: quantity for item_id, quantity in sorted(quantities.items())
+        if menu_items[item_id].tracks_stock
+    }
+
+    ingredient_needs = defaultdict(int)
+    recipe = RecipeLine.objects.filter(menu_item_id__in=quantities).values_list(
+        'menu_item_id', 'ingredient_id', 'quantity'
+    )
+    for menu_item_id, ingredient_id, per_unit in recipe:
+        ingredient_needs[ingredient_id] += per_unit * quantities[menu_item_id]
+
+    return item_needs, dict(sorted(ingredient_needs.items()))
+
+
+def consume_stock(menu_items, item_needs, ingredient_needs):
+    """Decrement stock for a checkout; call inside its transaction.
+
+    Raises ``OutOfStock`` (rolling the caller's transaction back) when any
+    level is short. Items reaching zero are marked unavailable in the same
+    UPDATE; items whose ingredient ran out are marked right after.
+    """
+    short = []
+    for item_id, quantity in item_needs.items():
+        updated = MenuItem.objects.filter(id=item_id, stock_quantity__gte=quantity).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            # Evaluated against the old row, i.e. "this sale empties it"
+            is_available=Case(When(stock_quantity=quantity, then=Value(False)), default=F('is_available')),
+        )
+        if not updated and not MenuItem.objects.filter(id=item_id, stock_quantity__isnull=True).exists():
+            short.append(menu_items[item_id].name)
+
+    for ingredient_id, quantity in ingredient_needs.items():
+        updated = Ingredient.objects.filter(id=ingredient_id, stock_quantity__gte=quantity).update(
+            stock_quantity=F('stock_quantity') - quantity,
+        )
+        if not updated:
+            short.append(Ingredient.objects.get(id=ingredient_id).name)
+
+    if short:
+        raise OutOfStock(short)
+
+    if ingredient_needs:
+        exhausted = Ingredient.objects.filter(id__in=ingredient_needs, stock_quantity=0)
+        MenuItem.objects.filter(recipe__ingredient__in=exhausted, is_available=True).update(
+            is_available=False
+        )
@@ -0,0 +1,180 @@
+"""
+Content-addressed storage for menu item images.
+
+Uploads are hashed with SHA-256 while they stream to a temporary file, then
+stored as ``<upload_to>/<2 hex>/<digest><ext>``. Uploading the same photo
+again, or using one photo for several items, reuses the stored file
+instead of writing a copy.
+
+Each stored file has an ``ImageBlob`` row with a reference count. The
+count is adjusted when a menu item's image is set, replaced or cleared,
+and when the item is deleted. Replaced images are therefore not deleted on
+the spot. ``python manage.py gc_images`` sweeps blobs that nobody has
+referenced for a grace period, in batches.
+
+Publishing a blob (upload) writes its row before touching the file, inside
+one transaction. Collecting it (gc) deletes the row, commits, and then
+removes the file in a second transaction that first takes the write lock
+and skips any row an upload has recreated in between. The lock orders the
+two, so an upload of a photo that is being collected either revives the
+row and keeps the file, or waits and writes the file again afterwards.
+"""
+
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after the SHA-256 of their content."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, so there is nothing to avoid
+        return name
+
+    def _save(self, name, content):
+        from .models import ImageBlob
+
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        if len(extension) > 10:
+            extension = ''
+
+        temp_dir = self.path('.incoming')
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp_file:
+            # One pass: hash and spool together
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+
+        hexdigest = digest.hexdigest()
+        name = posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+        path = self.path(name)
+        try:
+            with transaction.atomic():
+                # Write the row first: this waits for a sweep holding the lock,
+                # and touching it keeps the next sweep away from it
+                if not ImageBlob.objects.filter(name=name).update(updated_at=timezone.now()):
+                    ImageBlob.objects.get_or_create(name=name, defaults={'size': size})
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temp_file.name, path)
+                    # Temporary files are private (0600); published blobs are not
+                    os.chmod(path, self.file_permissions_mode or 0o644)
+        finally:
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+        return name
+
+
+def image_storage():
+    """Storage of ``MenuItem.image``; migrations refer to this callable, not an instance."""
+    return ContentAddressedStorage()
+
+
+# ==================== Reference counting ====================
+
+def retain(name):
+    from .models import ImageBlob
+
+    if name and not ImageBlob.objects.filter(name=name).update(
+        ref_count=F('ref_count') + 1, updated_at=timezone.now()
+    ):
+        # A file stored before this tracking existed
+        ImageBlob.objects.get_or_create(name=name, defaults={'ref_count': 1})
+
+
+def release(name):
+    from .models import ImageBlob
+
+    if name:
+        ImageBlob.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, updated_at=timezone.now()
+        )
+
+
+def track_image_change(sender, instance, raw=False, **kwargs):
+    """post_save receiver: move one reference from the old image to the new one."""
+    if raw:
+        return
+    stored = getattr(instance, '_stored_image', '')
+    current = instance.image.name or ''
+    if current != stored:
+        retain(current)
+        release(stored)
+        instance._stored_image = current
+
+
+def release_image(sender, instance, **kwargs):
+    """post_delete receiver: a deleted item drops its reference."""
+    release(getattr(instance, '_stored_image', ''))
+
+
+# ==================== Garbage collection ====================
+
+def collect_blobs(candidates, cutoff):
+    """Delete one batch of unreferenced blobs, then their files.
+
+    ``candidates`` is a list of ``(id, name, size)`` read before the call.
+    Each row is deleted only if it is still unreferenced and untouched
+    since ``cutoff``. The files go once those deletes have committed, so
+    a rollback never leaves a row without its file. Returns
+    ``(blobs_deleted, bytes_freed)``.
+    """
+    from .models import ImageBlob
+
+    collected = []
+    freed = 0
+    with transaction.atomic():
+        for blob_id, name, size in candidates:
+            if ImageBlob.objects.filter(id=blob_id, ref_count=0, updated_at__lt=cutoff).delete()[0]:
+                collected.append(name)
+                freed += size
+        if collected:
+            transaction.on_commit(lambda: _delete_files(collected))
+    return len(collected), freed
+
+
+def _delete_files(names):
+    """Remove collected files, except those an upload has published again since."""
+    from .models import ImageBlob
+
+    storage = image_storage()
+    with transaction.atomic():
+        # Writing takes the lock an upload takes before it places its file:
+        # no upload of these names can slip in until the files are gone
+        ImageBlob.objects.filter(name__in=names).update(updated_at=timezone.now())
+        revived = set(ImageBlob.objects.filter(name__in=names).values_list('name', flat=True))
+        for name in names:
+            if name not in revived:
+                storage.delete(name)
+
+
+def stray_files(directory, cutoff):
+    """Files under ``directory`` with no ImageBlob row, last modified before ``cutoff``.
+
+    Covers replaced images from before reference counting and files left
+    behind by uploads whose transaction rolled back. Yields storage names.
+    """
+    from .models import ImageBlob
+
+    storage = image_storage()
+    known = set(ImageBlob.objects.values_list('name', flat=True))
+    cutoff_ts = cutoff.timestamp()
+    for root in (storage.path(directory), storage.path('.incoming')):
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if name not in known and os.path.getmtime(path) < cutoff_ts:
+                    yield name
@@ -0,0 +1,119 @@
+import json
+
+from django.test import TestCase
+from django.utils import timezone
+
+from cafe.models import Category, HourlyItemSales, HourlySales, MenuItem, Order, OrderAdjustment, OrderItem
+from cafe.rollups import rebuild, stale_days
+
+
+class AdjustmentTests(TestCase):
+    """Voids and refunds net out of the order, its lines and the rollups"""
+
+    def setUp(self):
+        category = Category.objects.create(name='مشروبات')
+        self.tea = MenuItem.objects.create(category=category, name='شاي', price=1000)
+        self.coffee = MenuItem.objects.create(category=category, name='قهوة', price=2500)
+        self.order_id = self.checkout(tea=3, coffee=2)
+        # A second order keeps the buckets alive after the first is voided
+        self.checkout(tea=1, coffee=0)
+        self.tea_line = OrderItem.objects.get(order_id=self.order_id, item_name='شاي')
+        self.coffee_line = OrderItem.objects.get(order_id=self.order_id, item_name='قهوة')
+
+    def post(self, url, payload):
+        return self.client.post(url, json.dumps(payload), content_type='application/json')
+
+    def checkout(self, tea, coffee):
+        lines = [{'id': self.tea.id, 'quantity': tea}]
+        if coffee:
+            lines.append({'id': self.coffee.id, 'quantity': coffee})
+        data = self.post('/api/order/create/', {'items': lines, 'amount_paid': 20000}).json()
+        self.assertTrue(data['success'], data)
+        return data['order']['id']
+
+    def void(self):
+        return self.post(f'/api/orders/{self.order_id}/void/', {'reason': 'خطأ'})
+
+    def refund(self, *lines):
+        return self.post(f'/api/orders/{self.order_id}/refund/', {
+            'items': [{'id': line.id, 'quantity': quantity} for line, quantity in lines],
+        })
+
+    def buckets(self):
+        return (
+            sorted(HourlySales.objects.values_list('date', 'hour', 'orders_count', 'revenue')),
+            sorted(HourlyItemSales.objects.values_list('date', 'hour', 'item_name', 'quantity', 'revenue')),
+        )
+
+    def sold(self, item_name):
+        return sum(HourlyItemSales.objects.filter(item_name=item_name).values_list('quantity', flat=True))
+
+    def assertRollupsMatchOrders(self):
+        today = timezone.localdate()
+        self.assertEqual(stale_days(today, today), [])
+        incremental = self.buckets()
+        rebuild(today, today)
+        self.assertEqual(self.buckets(), incremental)
+
+    def test_void_removes_the_order_from_the_rollups(self):
+        self.assertRollupsMatchOrders()
+        response = self.void()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['adjustment']['amount'], 3 * 1000 + 2 * 2500)
+
+        self.assertEqual(sum(HourlySales.objects.values_list('orders_count', flat=True)), 1)
+        self.assertEqual(sum(HourlySales.objects.values_list('revenue', flat=True)), 1000)
+        self.assertEqual(self.sold('شاي'), 1)
+        self.assertEqual(self.sold('قهوة'), 0)
+        self.assertRollupsMatchOrders()
+
+    def test_void_after_partial_refund_reverses_the_rest(self):
+        response = self.refund((self.tea_line, 1), (self.coffee_line, 2))
+        self.assertEqual(response.json()['adjustment']['amount'], 1000 + 2 * 2500)
+        self.assertRollupsMatchOrders()
+
+        response = self.void()
+        self.assertEqual(response.status_code, 200)
+        adjustment = response.json()['adjustment']
+        self.assertEqual(adjustment['amount'], 2 * 1000)
+
+        order = Order.objects.get(id=self.order_id)
+        self.assertTrue(order.is_voided)
+        self.assertEqual(order.refunded_amount, order.total_amount)
+        self.assertEqual(
+            list(OrderAdjustment.objects.filter(order_id=self.order_id).order_by('id').values_list('kind', 'amount')),
+            [(OrderAdjustment.KIND_REFUND, 6000), (OrderAdjustment.KIND_VOID, 2000)],
+        )
+        self.assertEqual(self.sold('شاي'), 1)
+        self.assertRollupsMatchOrders()
+
+    def test_refund_beyond_the_unrefunded_quantity_is_rejected(self):
+        self.assertEqual(self.refund((self.tea_line, 2)).status_code, 200)
+        before = self.buckets()
+
+        response = self.refund((self.tea_line, 2))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(self.refund((self.tea_line, 1), (self.coffee_line, 3)).status_code, 400)
+
+        # Nothing from the rejected refunds was kept
+        self.tea_line.refresh_from_db()
+        self.coffee_line.refresh_from_db()
+        self.assertEqual((self.tea_line.refunded_quantity, self.coffee_line.refunded_quantity), (2, 0))
+        self.assertEqual(Order.objects.get(id=self.order_id).refunded_amount, 2000)
+        self.assertEqual(OrderAdjustment.objects.count(), 1)
+        self.assertEqual(self.buckets(), before)
+        self.assertRollupsMatchOrders()
+
+    def test_second_void_is_an_error(self):
+        self.assertEqual(self.void().status_code, 200)
+        before = self.buckets()
+
+        response = self.void()
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(self.refund((self.tea_line, 1)).status_code, 409)
+
+        self.assertEqual(OrderAdjustment.objects.count(), 1)
+        self.assertEqual(self.buckets(), before)
+        self.assertRollupsMatchOrders()
@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from cafe import admission
+from cafe.admission import Overloaded, WriteGate, write_view
+
+
+class WriteGateTests(SimpleTestCase):
+    """Writers are admitted by priority, and turned away when the queue is full or slow"""
+
+    def setUp(self):
+        self.gate = WriteGate(slots=1, queue={'menu': 1}, wait={'menu': 0.2})
+        self.admitted = []
+        self.release = threading.Event()
+        self.threads = []
+        self.addCleanup(self.finish)
+
+    def finish(self):
+        self.release.set()
+        for thread in self.threads:
+            thread.join(5)
+
+    def wait_until(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, 'timed out')
+            time.sleep(0.005)
+
+    def writer(self, priority, hold=False):
+        """Start a thread that waits for the gate as ``priority``."""
+        def run():
+            try:
+                with self.gate.admit(priority):
+                    self.admitted.append(priority)
+                    if hold:
+                        self.release.wait(5)
+            except Overloaded:
+                self.admitted.append(f'{priority} overloaded')
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.threads.append(thread)
+        return thread
+
+    def hold_the_slot(self):
+        self.writer('service', hold=True)
+        self.wait_until(lambda: self.admitted == ['service'])
+
+    def test_higher_priority_is_admitted_first(self):
+        self.hold_the_slot()
+        self.writer('menu')
+        self.wait_until(lambda: len(self.gate._queue) == 1)
+        self.writer('service')
+        self.wait_until(lambda: len(self.gate._queue) == 2)
+        self.writer('checkout')
+        self.wait_until(lambda: len(self.gate._queue) == 3)
+
+        self.release.set()
+        self.wait_until(lambda: len(self.admitted) == 4)
+        self.assertEqual(self.admitted, ['service', 'checkout', 'service', 'menu'])
+        self.assertEqual(self.gate.snapshot()['in_flight'], 0)
+
+    def test_full_queue_is_rejected_at_once(self):
+        self.hold_the_slot()
+        self.writer('menu')
+        self.wait_until(lambda: len(self.gate._queue) == 1)
+
+        started = time.monotonic()
+        with self.assertRaises(Overloaded) as raised, self.gate.admit('menu'):
+            pass
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual(self.gate.stats['menu'].rejected, 1)
+        # Higher classes do not count the menu edits ahead of them
+        self.writer('checkout')
+        self.wait_until(lambda: len(self.gate._queue) == 2)
+
+    def test_timed_out_waiter_leaves_the_queue(self):
+        self.hold_the_slot()
+        self.writer('menu')
+        self.wait_until(lambda: len(self.gate._queue) == 1)
+        self.writer('service')
+        self.wait_until(lambda: len(self.gate._queue) == 2)
+
+        self.wait_until(lambda: 'menu overloaded' in self.admitted)
+        self.assertEqual(len(self.gate._queue), 1)
+        self.assertEqual(self.gate.stats['menu'].timed_out, 1)
+        self.assertEqual(self.gate.stats['menu'].waiting, 0)
+
+        # The writer still queued is admitted as usual
+        self.release.set()
+        self.wait_until(lambda: len(self.admitted) == 3)
+        self.assertEqual(self.admitted, ['service', 'menu overloaded', 'service'])
+        self.assertEqual(self.gate._queue, [])
+
+
+class WriteViewTests(SimpleTestCase):
+    """write_view gates unsafe methods only and answers 503 when overloaded"""
+
+    def setUp(self):
+        self.gate = WriteGate(slots=1, queue={'menu': 0})
+        patcher = mock.patch.dict(admission._gates, {'gate-test': self.gate})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.calls = []
+
+        @write_view('menu', using='gate-test')
+        def view(request):
+            self.calls.append(request.method)
+            return HttpResponse('ok')
+
+        self.view = view
+
+    def test_full_gate_answers_503_with_retry_after(self):
+        with self.gate.admit('checkout'):
+            response = self.view(self.factory.post('/'))
+        self.assertEqual(response.status_code, 503)
+        retry_after = int(response['Retry-After'])
+        self.assertGreaterEqual(retry_after, 1)
+        self.assertLessEqual(retry_after, 30)
+        self.assertEqual(json.loads(response.content)['retry_after'], retry_after)
+        self.assertEqual(self.calls, [])
+
+        self.assertEqual(self.view(self.factory.post('/')).status_code, 200)
+        self.assertEqual(self.calls, ['POST'])
+
+    def test_safe_methods_skip_the_gate(self):
+        with self.gate.admit('checkout'):
+            for method in ('get', 'head', 'options'):
+                self.assertEqual(self.view(getattr(self.factory, method)('/')).status_code, 200)
+            for method in ('post', 'put', 'patch', 'delete'):
+                self.assertEqual(self.view(getattr(self.factory, method)('/')).status_code, 503)
+        self.assertEqual(self.calls, ['GET', 'HEAD', 'OPTIONS'])
+        self.assertEqual(self.gate.stats['menu'].admitted, 0)
@@ -0,0 +1,81 @@
+import io
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from cafe.management.commands import archive_orders
+from cafe.models import ArchivedOrder, Order, OrderItem
+from cafe.routers import REPORTING_DB_ALIAS
+
+
+class ArchiveFallbackTests(TransactionTestCase):
+    """Reads give the same answers before and after orders are archived"""
+
+    databases = {'default', REPORTING_DB_ALIAS}
+
+    def setUp(self):
+        today = timezone.localdate()
+        for days_ago in range(20):
+            for hour in (9, 13, 18):
+                created = timezone.make_aware(datetime.combine(today - timedelta(days=days_ago), time(hour)))
+                if created > timezone.now():
+                    created = timezone.now() - timedelta(minutes=hour)
+                order = Order.objects.create(
+                    order_number=f'{days_ago:02d}{hour:02d}',
+                    created_at=created,
+                    total_amount=1500 * hour,
+                    amount_paid=1500 * hour,
+                )
+                OrderItem.objects.create(
+                    order=order, item_name='شاي' if hour < 12 else 'قهوة',
+                    quantity=hour, unit_price=1500, subtotal=1500 * hour,
+                )
+
+    def archive(self):
+        # Archive everything older than ten days instead of N months
+        with mock.patch.object(archive_orders, 'months_ago', lambda day, months: day - timedelta(days=10)):
+            call_command('archive_orders', stdout=io.StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 27)
+        self.assertEqual(Order.objects.count(), 33)
+
+    def all_pages(self, per_page, **params):
+        ids, page = [], 1
+        while True:
+            data = self.client.get('/api/orders/', {'page': page, 'per_page': per_page, **params}).json()
+            ids += [order['id'] for order in data['orders']]
+            if page >= data['pagination']['total_pages']:
+                return ids, data['pagination']['total_count']
+            page += 1
+
+    def test_pagination_spans_live_and_archived_orders(self):
+        expected = list(Order.objects.order_by('-created_at').values_list('id', flat=True))
+        self.archive()
+        for per_page in (7, 30, 100):
+            ids, total = self.all_pages(per_page)
+            self.assertEqual(total, 60)
+            self.assertEqual(ids, expected, per_page)
+
+        # A date range that ends inside the archive
+        date_to = (timezone.localdate() - timedelta(days=15)).isoformat()
+        ids, total = self.all_pages(4, date_to=date_to)
+        self.assertEqual(len(ids), total)
+        self.assertEqual(len(set(ids)), total)
+        self.assertTrue(set(ids) <= set(ArchivedOrder.objects.values_list('id', flat=True)))
+
+    def test_detail_resolves_archived_orders(self):
+        oldest = Order.objects.order_by('created_at').first()
+        before = self.client.get(f'/api/orders/{oldest.id}/').json()
+        self.archive()
+        self.assertFalse(Order.objects.filter(id=oldest.id).exists())
+        self.assertEqual(self.client.get(f'/api/orders/{oldest.id}/').json(), before)
+        self.assertEqual(self.client.get('/api/orders/999999/').status_code, 404)
+
+    def test_statistics_are_unchanged_by_archiving(self):
+        before = self.client.get('/api/statistics/', {'period': 'month'}).json()
+        self.assertEqual(before['total_orders'], 60)
+        self.archive()
+        after = self.client.get('/api/statistics/', {'period': 'month'}).json()
+        self.assertEqual(after, before)
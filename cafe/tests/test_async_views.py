@@ -0,0 +1,83 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from cafe import fanout
+from cafe.models import Category, MenuItem, Order
+from cafe.rollups import rebuild
+from cafe.routers import REPORTING_DB_ALIAS
+from cafe.views import _period_start
+
+
+class AsyncTwinTests(TransactionTestCase):
+    """The async read API returns exactly what its sync twins return"""
+
+    databases = {'default', REPORTING_DB_ALIAS}
+
+    def setUp(self):
+        category = Category.objects.create(name='مشروبات')
+        tea = MenuItem.objects.create(category=category, name='شاي', price=1000)
+        coffee = MenuItem.objects.create(category=category, name='قهوة', price=2500)
+        for number in range(12):
+            response = self.client.post('/api/order/create/', json.dumps({
+                'items': [{'id': tea.id, 'quantity': number % 3 + 1}, {'id': coffee.id, 'quantity': 1}],
+                'amount_paid': 20000,
+            }), content_type='application/json')
+            self.assertTrue(response.json()['success'])
+        # Spread them over the past week
+        for days_ago, order in enumerate(Order.objects.order_by('id')):
+            Order.objects.filter(id=order.id).update(created_at=order.created_at - timedelta(days=days_ago % 6))
+        today = timezone.localdate()
+        rebuild(today - timedelta(days=7), today)
+        self.order_id = Order.objects.order_by('id').first().id
+
+    async def assertSamePayload(self, sync_url, async_url):
+        expected = await self.async_client.get(sync_url)
+        actual = await self.async_client.get(async_url)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.json(), expected.json())
+        return actual.json()
+
+    async def test_statistics(self):
+        for period in ('today', 'week', 'month'):
+            data = await self.assertSamePayload(
+                f'/api/statistics/?period={period}', f'/api/async/statistics/?period={period}'
+            )
+            self.assertTrue(data['success'])
+
+    async def test_orders(self):
+        for query in ('page=1&per_page=5', 'page=3&per_page=5', 'per_page=4&shape=columns', 'search=zzz'):
+            data = await self.assertSamePayload(f'/api/orders/?{query}', f'/api/async/orders/?{query}')
+            self.assertTrue(data['success'])
+
+    async def test_order_detail(self):
+        data = await self.assertSamePayload(
+            f'/api/orders/{self.order_id}/', f'/api/async/orders/{self.order_id}/'
+        )
+        self.assertEqual(data['order']['id'], self.order_id)
+        await self.assertSamePayload('/api/orders/999999/', '/api/async/orders/999999/')
+
+    async def test_dashboard_sections_match_their_endpoints(self):
+        today = timezone.localdate()
+        dashboard = (await self.async_client.get(
+            '/api/dashboard/?sections=statistics,orders,heatmap&period=week&per_page=5'
+        )).json()
+        statistics = (await self.async_client.get('/api/statistics/?period=week')).json()
+        orders = (await self.async_client.get('/api/orders/?per_page=5')).json()
+        week_start = timezone.localdate(_period_start('week'))
+        heatmap = (await self.async_client.get(
+            f'/api/statistics/heatmap/?date_from={week_start}&date_to={today}&top=5'
+        )).json()
+
+        for section, sync_payload in (('statistics', statistics), ('orders', orders), ('heatmap', heatmap)):
+            sync_payload.pop('success')
+            self.assertEqual(dashboard[section], sync_payload, section)
+
+    async def test_pool_jobs_recycle_connections(self):
+        with mock.patch.object(fanout, 'close_old_connections') as close_old_connections:
+            self.assertEqual(await fanout.run_in_pool(lambda: 42), 42)
+        # Before and after the job, like request_started/request_finished
+        self.assertEqual(close_old_connections.call_count, 2)
@@ -0,0 +1,168 @@
+import gzip
+import io
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TransactionTestCase
+from django.utils import timezone
+
+from cafe.management.commands.backup_db import Command
+from cafe.models import Order
+
+
+class OnlineBackupTests(SimpleTestCase):
+    """backup_db copies a WAL database while another thread keeps writing"""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.source = self.directory / 'db.sqlite3'
+
+        connection = sqlite3.connect(self.source)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE orders (id INTEGER PRIMARY KEY, note TEXT)')
+        with connection:
+            connection.executemany('INSERT INTO orders (note) VALUES (?)', [('x' * 200,)] * 20000)
+        connection.close()
+
+    def write_until(self, stop, written):
+        connection = sqlite3.connect(self.source, timeout=5)
+        try:
+            while not stop.is_set():
+                with connection:
+                    connection.execute('INSERT INTO orders (note) VALUES (?)', ('y' * 200,))
+                written.append(1)
+        finally:
+            connection.close()
+
+    def test_backup_completes_during_writes(self):
+        stop = threading.Event()
+        written = []
+        writer = threading.Thread(target=self.write_until, args=(stop, written))
+        writer.start()
+        try:
+            while not written:
+                time.sleep(0.001)
+            target = self.directory / 'snapshot.sqlite3'
+            started = time.monotonic()
+            # A stepwise copy would restart on every commit of the writer
+            Command().copy_online(self.source, target, pages=1, sleep=0)
+            elapsed = time.monotonic() - started
+        finally:
+            stop.set()
+            writer.join()
+
+        self.assertLess(elapsed, 10)
+        self.assertGreater(len(written), 0)
+        snapshot = sqlite3.connect(target)
+        try:
+            self.assertEqual(snapshot.execute('PRAGMA integrity_check').fetchone()[0], 'ok')
+            copied = snapshot.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+        finally:
+            snapshot.close()
+        self.assertGreaterEqual(copied, 20000)
+        self.assertLessEqual(copied, 20000 + len(written))
+
+
+class BackupCommandTests(TransactionTestCase):
+    """The full command on a migrated file database: copy, gzip and rotation"""
+
+    alias = 'backup_source'
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.source = self.directory / 'db.sqlite3'
+        self.dest = self.directory / 'backups'
+
+        Order.objects.bulk_create(
+            Order(order_number=f'SEED{number:06d}', total_amount=1000, amount_paid=1000)
+            for number in range(5000)
+        )
+        # The test database is in memory; the command needs a file
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [str(self.source)])
+        with sqlite3.connect(self.source) as source:
+            source.execute('PRAGMA journal_mode=WAL')
+
+        connections.settings[self.alias] = {**connection.settings_dict, 'NAME': str(self.source)}
+        self.addCleanup(connections.settings.pop, self.alias)
+        self.addCleanup(self.drop_alias)
+
+        # Older snapshots, named as the command names them
+        self.dest.mkdir()
+        for day in range(1, 5):
+            (self.dest / f'db-2020010{day}-000000.sqlite3.gz').write_bytes(b'old')
+        (self.dest / 'notes.txt').write_text('not a snapshot')
+
+    def drop_alias(self):
+        if self.alias in connections:
+            connections[self.alias].close()
+            del connections[self.alias]
+
+    def take_orders(self, stop, written):
+        """A till committing orders straight to the database file."""
+        till = sqlite3.connect(self.source, timeout=5)
+        try:
+            while not stop.is_set():
+                with till:
+                    till.execute(
+                        'INSERT INTO cafe_order (order_number, created_at, total_amount, amount_paid, '
+                        'change_given, notes, is_printed, is_voided, refunded_amount) '
+                        "VALUES (?, ?, 1500, 2000, 500, '', 0, 0, 0)",
+                        (f'LIVE{len(written):06d}', timezone.now().isoformat()),
+                    )
+                written.append(1)
+        finally:
+            till.close()
+
+    def test_backup_during_checkouts_is_complete_and_rotated(self):
+        stop, written = threading.Event(), []
+        till = threading.Thread(target=self.take_orders, args=(stop, written))
+        till.start()
+        try:
+            while len(written) < 10:
+                time.sleep(0.001)
+            call_command('backup_db', database=self.alias, dest=str(self.dest), keep=3, stdout=io.StringIO())
+        finally:
+            stop.set()
+            till.join()
+
+        snapshots = sorted(path.name for path in self.dest.iterdir() if path.name.startswith('db-'))
+        # The new snapshot and the two newest old ones; other files are left alone
+        self.assertEqual(snapshots[:2], ['db-20200103-000000.sqlite3.gz', 'db-20200104-000000.sqlite3.gz'])
+        self.assertEqual(len(snapshots), 3)
+        self.assertTrue((self.dest / 'notes.txt').exists())
+        self.assertFalse(any(path.name.endswith('.partial') for path in self.dest.iterdir()))
+
+        restored = self.directory / 'restored.sqlite3'
+        with gzip.open(self.dest / snapshots[-1], 'rb') as archive, open(restored, 'wb') as out:
+            shutil.copyfileobj(archive, out)
+        snapshot = sqlite3.connect(restored)
+        try:
+            self.assertEqual(snapshot.execute('PRAGMA integrity_check').fetchone()[0], 'ok')
+            count = 'SELECT COUNT(*) FROM cafe_order WHERE order_number LIKE ?'
+            seeded = snapshot.execute(count, ('SEED%',)).fetchone()[0]
+            live = snapshot.execute(count, ('LIVE%',)).fetchone()[0]
+        finally:
+            snapshot.close()
+        self.assertEqual(seeded, 5000)
+        self.assertGreaterEqual(live, 10)
+        self.assertLessEqual(live, len(written))
+
+    def test_plain_snapshot_with_no_compress(self):
+        call_command(
+            'backup_db', database=self.alias, dest=str(self.dest), keep=0, no_compress=True, stdout=io.StringIO()
+        )
+        plain = [path for path in self.dest.iterdir() if path.name.endswith('.sqlite3')]
+        self.assertEqual(len(plain), 1)
+        # keep=0 disables rotation
+        self.assertEqual(len(list(self.dest.glob('db-2020*'))), 4)
+        with sqlite3.connect(plain[0]) as snapshot:
+            self.assertEqual(snapshot.execute('SELECT COUNT(*) FROM cafe_order').fetchone()[0], 5000)
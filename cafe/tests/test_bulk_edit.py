@@ -0,0 +1,77 @@
+import json
+
+from django.test import TestCase
+
+from cafe.models import Category, MenuItem
+
+
+class BulkPatchCoercionTests(TestCase):
+    """Bulk patches accept only JSON booleans and non-empty names"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='مشروبات', is_active=False)
+        cls.item = MenuItem.objects.create(category=cls.category, name='شاي', price=1000, is_available=False)
+
+    def put(self, url, updates):
+        response = self.client.put(url, json.dumps({'updates': updates}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_string_booleans_are_rejected(self):
+        data = self.put('/api/items/bulk/', [{'id': self.item.id, 'fields': {'is_available': 'false'}}])
+        self.assertEqual(data['updated'], 0)
+        self.assertFalse(data['results'][0]['success'])
+        self.item.refresh_from_db()
+        self.assertFalse(self.item.is_available)
+
+    def test_null_and_blank_names_are_rejected(self):
+        data = self.put('/api/categories/bulk/', [
+            {'id': self.category.id, 'fields': {'name': None}},
+            {'id': self.category.id, 'fields': {'name': '  '}},
+        ])
+        self.assertEqual([row['success'] for row in data['results']], [False, False])
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.name, 'مشروبات')
+
+    def test_valid_values_still_apply(self):
+        data = self.put('/api/items/bulk/', [
+            {'id': self.item.id, 'fields': {'is_available': True, 'name': ' شاي عراقي '}},
+        ])
+        self.assertEqual(data['updated'], 1)
+        self.item.refresh_from_db()
+        self.assertTrue(self.item.is_available)
+        self.assertEqual(self.item.name, 'شاي عراقي')
+
+    def test_malformed_rows_do_not_abort_the_batch(self):
+        data = self.put('/api/items/bulk/', [
+            'not a patch',
+            {'id': 'abc', 'fields': {'name': 'x'}},
+            {'id': [self.item.id], 'fields': {'category_id': self.category.id}},
+            {'id': self.item.id, 'fields': ['is_available']},
+            {'id': self.item.id, 'fields': {'category_id': [1]}},
+            {'id': self.item.id, 'fields': {'price': 2500}},
+        ])
+        self.assertEqual([row['success'] for row in data['results']], [False] * 5 + [True])
+        self.assertEqual(data['updated'], 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.price, 2500)
+
+    def test_integers_are_not_coerced(self):
+        data = self.put('/api/items/bulk/', [
+            {'id': self.item.id, 'fields': {'price': 12.7}},
+            {'id': self.item.id, 'fields': {'price': True}},
+            {'id': self.item.id, 'fields': {'price': '1500'}},
+            {'id': self.item.id, 'fields': {'stock_quantity': 3.5}},
+        ])
+        self.assertEqual(data['updated'], 0)
+        data = self.put('/api/categories/bulk/', [{'id': self.category.id, 'fields': {'order': 1.5}}])
+        self.assertFalse(data['results'][0]['success'])
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.price, self.item.stock_quantity), (1000, None))
+
+    def test_updates_must_be_a_list(self):
+        response = self.client.put(
+            '/api/categories/bulk/', json.dumps({'updates': {'id': 1}}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,58 @@
+import gzip
+import unittest
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from cafe import responses
+from cafe.responses import CompressionMiddleware, JsonResponse
+
+
+brotli = responses.brotli_module()
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Accept-Encoding negotiation and the 200-byte threshold"""
+
+    rows = {'items': [{'name': 'شاي عراقي', 'price': 1500}] * 20}
+
+    def process(self, response, accept_encoding='gzip, deflate, br'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_json_gets_brotli_when_accepted(self):
+        original = JsonResponse(self.rows).content
+        response = self.process(JsonResponse(self.rows))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(brotli.decompress(response.content), original)
+
+    def test_json_gets_gzip_without_br(self):
+        original = JsonResponse(self.rows).content
+        response = self.process(JsonResponse(self.rows), 'gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), original)
+
+    def test_json_gets_gzip_without_the_brotli_package(self):
+        with mock.patch.object(responses, 'brotli_module', return_value=None):
+            response = self.process(JsonResponse(self.rows))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_html_is_left_to_gzip(self):
+        page = '<html><body>' + '<p>قائمة الطعام</p>' * 50 + '</body></html>'
+        response = self.process(HttpResponse(page))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content).decode(), page)
+
+    def test_nothing_is_compressed_without_accept_encoding(self):
+        response = self.process(JsonResponse(self.rows), '')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_small_responses_are_sent_as_is(self):
+        for size, encoded in ((199, False), (200, True)):
+            body = '{"x":"%s"}' % ('a' * (size - 8))
+            response = self.process(HttpResponse(body, content_type='application/json'))
+            self.assertEqual(len(body), size)
+            self.assertEqual(response.has_header('Content-Encoding'), encoded, size)
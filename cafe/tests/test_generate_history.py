@@ -0,0 +1,93 @@
+import io
+from datetime import date, datetime, time, timedelta
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from cafe.models import Category, HourlySales, MenuItem, Order, OrderChange, OrderItem
+from cafe.rollups import stale_days
+
+
+START, END = date(2026, 3, 1), date(2026, 3, 7)
+
+
+class GenerateHistoryTests(TestCase):
+    """Synthetic history is reproducible and never clashes with real orders"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='مشروبات')
+        for number, price in enumerate((1000, 1500, 2000, 3500, 5000)):
+            MenuItem.objects.create(category=category, name=f'صنف {number}', price=price)
+
+    def generate(self, seed=42, end=END):
+        out = io.StringIO()
+        call_command(
+            'generate_history', days=(end - START).days + 1, end_date=end.isoformat(),
+            orders_per_day=20, seed=seed, batch_size=50, stdout=out,
+        )
+        return out.getvalue()
+
+    def snapshot(self):
+        orders = Order.objects.order_by('created_at', 'order_number')
+        return [
+            (order.order_number, order.created_at, order.total_amount, order.amount_paid,
+             [(item.item_name, item.quantity, item.subtotal) for item in order.items.order_by('item_name')])
+            for order in orders.prefetch_related('items')
+        ]
+
+    def local(self, day, hour):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def test_same_seed_gives_the_same_data(self):
+        self.generate(seed=7)
+        first = self.snapshot()
+        self.assertGreater(len(first), 7 * 10)
+
+        OrderItem.objects.all().delete()
+        Order.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+        OrderItem.objects.all().delete()
+        Order.objects.all().delete()
+        self.generate(seed=8)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_days_with_orders_are_skipped(self):
+        busy_day = START + timedelta(days=2)
+        real = Order.objects.create(created_at=self.local(busy_day, 10), total_amount=1000, amount_paid=1000)
+
+        output = self.generate()
+        self.assertIn('Skipping 1 day(s)', output)
+        on_busy_day = Order.objects.filter(
+            created_at__gte=self.local(busy_day, 0), created_at__lt=self.local(busy_day + timedelta(days=1), 0)
+        )
+        self.assertEqual(list(on_busy_day), [real])
+        self.assertTrue(Order.objects.exclude(id=real.id).exists())
+
+    def test_rollups_and_change_log_cover_the_generated_range(self):
+        self.generate()
+        self.assertEqual(stale_days(START, END), [])
+        buckets = HourlySales.objects.filter(date__gte=START, date__lte=END)
+        self.assertEqual(buckets.aggregate(total=Sum('orders_count'))['total'], Order.objects.count())
+        self.assertEqual(OrderChange.objects.count(), Order.objects.count())
+
+    def test_numbers_continue_after_real_orders_sharing_the_utc_day(self):
+        # Rung up at 01:00 local on the day after the range: still the UTC
+        # date of the range's last day
+        created = self.local(END + timedelta(days=1), 1)
+        prefix = Order.number_prefix(created)
+        self.assertEqual(prefix, END.strftime('%Y%m%d'))
+        Order.objects.create(order_number=f'{prefix}-0001', created_at=created, total_amount=1000, amount_paid=1000)
+
+        self.generate()
+        numbers = sorted(
+            Order.objects.filter(order_number__startswith=f'{prefix}-').values_list('order_number', flat=True)
+        )
+        self.assertEqual(numbers[:2], [f'{prefix}-0001', f'{prefix}-0002'])
+        self.assertEqual(len(numbers), len(set(numbers)))
+        for order in Order.objects.exclude(order_number=f'{prefix}-0001'):
+            self.assertEqual(order.order_number.split('-')[0], Order.number_prefix(order.created_at))
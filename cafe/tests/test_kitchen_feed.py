@@ -0,0 +1,35 @@
+import time
+from unittest import mock
+
+from django.test import AsyncRequestFactory, RequestFactory, TransactionTestCase
+
+from cafe import kitchen
+from cafe.models import Station
+
+
+class FeedTimeoutTests(TransactionTestCase):
+    """The kitchen long-poll only waits long where it holds no thread"""
+
+    def setUp(self):
+        self.station = Station.objects.create(name='المطبخ', slug='kitchen')
+        self.url = f'/api/kitchen/{self.station.slug}/feed/?since=1'
+
+    def test_timeout_depends_on_the_handler(self):
+        self.assertEqual(kitchen.feed_timeout(AsyncRequestFactory().get(self.url)), kitchen.FEED_TIMEOUT)
+        self.assertEqual(kitchen.feed_timeout(RequestFactory().get(self.url)), kitchen.WSGI_FEED_TIMEOUT)
+
+    @mock.patch.object(kitchen, 'FEED_TIMEOUT', 60)
+    @mock.patch.object(kitchen, 'WSGI_FEED_TIMEOUT', 0.3)
+    def test_wsgi_poll_returns_after_the_short_timeout(self):
+        started = time.monotonic()
+        data = self.client.get(self.url).json()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual((data['success'], data['tickets'], data['version']), (True, [], 1))
+
+    @mock.patch.object(kitchen, 'FEED_TIMEOUT', 0.3)
+    @mock.patch.object(kitchen, 'WSGI_FEED_TIMEOUT', 60)
+    async def test_asgi_poll_uses_the_full_timeout(self):
+        started = time.monotonic()
+        response = await self.async_client.get(self.url)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(response.json()['tickets'], [])
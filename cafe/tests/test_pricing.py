@@ -0,0 +1,24 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from cafe.models import BundleItem, Category, MenuItem, PriceRule
+
+
+class BundleQuantityTests(TestCase):
+    """A bundle component needs at least one unit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='فطور')
+        cls.tea = MenuItem.objects.create(category=category, name='شاي', price=1000)
+        cls.cake = MenuItem.objects.create(category=category, name='كيك', price=3000)
+        cls.rule = PriceRule.objects.create(name='شاي وكيك', kind=PriceRule.KIND_BUNDLE, fixed_price=1500)
+        BundleItem.objects.create(rule=cls.rule, menu_item=cls.tea, quantity=2)
+
+    def test_zero_quantity_is_rejected(self):
+        component = BundleItem(rule=self.rule, menu_item=self.cake, quantity=0)
+        with self.assertRaises(ValidationError):
+            component.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            component.save()
@@ -0,0 +1,62 @@
+from django.test import SimpleTestCase
+
+from cafe import printer
+
+
+def receipt(number, lines):
+    return {
+        'header': 'مقهى البيت', 'number': f'{number:04d}', 'created': '2026-10-19 09:30',
+        'lines': [(f'صنف {index}', 1, 1000) for index in range(lines)],
+        'total': lines * 1000, 'paid': lines * 1000, 'change': 0, 'refunded': 0, 'voided': False,
+    }
+
+
+class PaginateTests(SimpleTestCase):
+    """Receipts taller than a sheet column continue in the next one"""
+
+    column_height = printer.SHEET_SIZE[1] - printer.SHEET_MARGIN * 2
+
+    def pieces(self, sheets):
+        return [piece for columns in sheets for column in columns for piece in column]
+
+    def test_short_receipts_stay_whole(self):
+        receipts = [receipt(number, 3) for number in range(30)]
+        pieces = self.pieces(printer.paginate(receipts))
+        self.assertEqual(pieces, [(r, 0, printer.receipt_height(r)) for r in receipts])
+
+    def test_tall_receipt_is_cut_between_rows(self):
+        tall = receipt(1, 120)
+        sheets = printer.paginate([receipt(0, 3), tall, receipt(2, 3)])
+        pieces = [piece for piece in self.pieces(sheets) if piece[0] is tall]
+
+        self.assertGreater(len(pieces), 2)
+        # It starts under the short receipt instead of leaving that column empty
+        self.assertEqual(sheets[0][0][1], pieces[0])
+        self.assertEqual(pieces[0][1], 0)
+        self.assertEqual(pieces[-1][2], printer.receipt_height(tall))
+        boundaries = {printer.MARGIN + sum(printer.row_heights(tall)[:rows]) for rows in range(121)}
+        for (_, top, bottom), (_, next_top, _) in zip(pieces, pieces[1:]):
+            self.assertEqual(bottom, next_top)
+            self.assertIn(bottom, boundaries)
+        for columns in sheets:
+            for column in columns:
+                used = sum(bottom - top for _, top, bottom in column) + printer.SHEET_MARGIN * (len(column) - 1)
+                self.assertLessEqual(used, self.column_height)
+
+    def test_tall_receipt_pieces_are_drawn_in_order(self):
+        from PIL import ImageChops
+
+        tall = receipt(1, 120)
+        sheets = printer.paginate([tall])
+        pages = printer.render_pages(sheets)
+        self.assertEqual(len(pages), len(sheets))
+
+        full = printer.render_receipt(tall)
+        for page, columns in zip(pages, sheets):
+            for index, column in enumerate(columns):
+                (_, top, bottom), = column
+                x = printer.SHEET_MARGIN + index * (printer.RECEIPT_WIDTH + printer.SHEET_MARGIN)
+                y = printer.SHEET_MARGIN
+                drawn = page.crop((x, y, x + printer.RECEIPT_WIDTH, y + bottom - top))
+                expected = ImageChops.invert(full.crop((0, top, full.width, bottom)))
+                self.assertIsNone(ImageChops.difference(drawn, expected).getbbox())
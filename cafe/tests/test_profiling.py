@@ -0,0 +1,131 @@
+import os
+import pstats
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from cafe import profiling
+from cafe.models import Category, MenuItem, ProfileCapture
+from cafe.profiling import COOKIE_NAME, SALT, make_token
+from cafe.routers import REPORTING_DB_ALIAS
+
+
+class ProfilingMiddlewareTests(TransactionTestCase):
+    """Only requests with a valid token or toggle cookie are profiled"""
+
+    databases = {'default', REPORTING_DB_ALIAS}
+
+    def setUp(self):
+        category = Category.objects.create(name='مشروبات')
+        MenuItem.objects.create(category=category, name='شاي', price=1000)
+
+    def get(self, url='/api/menu/', **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def login_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secret'))
+
+    def test_requests_without_token_or_cookie_are_not_profiled(self):
+        with mock.patch.object(profiling, 'RequestCapture') as capture:
+            self.get()
+            self.get('/api/async/orders/')
+        capture.assert_not_called()
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_token_header_profiles_the_request(self):
+        self.get(HTTP_X_CAFE_PROFILE=make_token())
+
+        capture = ProfileCapture.objects.get()
+        self.assertEqual((capture.method, capture.path, capture.status_code), ('GET', '/api/menu/', 200))
+        self.assertGreater(capture.sql_count, 0)
+        self.assertEqual(capture.sql_count, len(capture.sql_trace))
+        self.assertIn('cafe_menuitem', ' '.join(query['sql'] for query in capture.sql_trace))
+        self.assertIn('api_menu', capture.summary)
+
+    def test_forged_and_expired_tokens_are_ignored(self):
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 7200):
+            expired = make_token()
+        forged = [
+            expired,
+            'profile',
+            make_token()[:-1] + 'x',
+            signing.TimestampSigner(salt='another.salt').sign('profile'),
+            signing.TimestampSigner(salt=SALT, key='not-the-secret-key').sign('profile'),
+        ]
+        for token in forged:
+            self.get(HTTP_X_CAFE_PROFILE=token)
+        self.assertFalse(ProfileCapture.objects.exists())
+
+        # Within the configured age the same token is accepted
+        with override_settings(CAFE_PROFILE_MAX_AGE=3 * 3600):
+            self.get(HTTP_X_CAFE_PROFILE=expired)
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+
+    def test_toggle_cookie_profiles_this_browser_except_admin(self):
+        self.login_admin()
+        toggle = reverse('admin:cafe_profilecapture_toggle')
+        self.client.post(toggle)
+        self.assertIn(COOKIE_NAME, self.client.cookies)
+
+        self.get()
+        self.assertEqual(self.client.get(reverse('admin:index')).status_code, 200)
+        self.assertEqual(list(ProfileCapture.objects.values_list('path', flat=True)), ['/api/menu/'])
+
+        # Toggled off again
+        self.client.post(toggle)
+        self.get()
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+
+    def test_forged_and_expired_cookies_are_ignored(self):
+        self.client.cookies[COOKIE_NAME] = '1'
+        self.get()
+        self.client.cookies[COOKIE_NAME] = signing.get_cookie_signer(salt=COOKIE_NAME + 'other').sign('1')
+        self.get()
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 7200):
+            self.client.cookies[COOKIE_NAME] = signing.get_cookie_signer(salt=COOKIE_NAME + SALT).sign('1')
+        self.get()
+        self.assertFalse(ProfileCapture.objects.exists())
+
+        # The same cookie signed now is accepted
+        self.client.cookies[COOKIE_NAME] = signing.get_cookie_signer(salt=COOKIE_NAME + SALT).sign('1')
+        self.get()
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+
+    def test_async_view_capture_includes_pool_queries(self):
+        self.get('/api/async/orders/', HTTP_X_CAFE_PROFILE=make_token())
+        capture = ProfileCapture.objects.get()
+        self.assertEqual(capture.path, '/api/async/orders/')
+        self.assertIn(REPORTING_DB_ALIAS, {query['alias'] for query in capture.sql_trace})
+
+    def test_prof_download_loads_in_pstats(self):
+        self.get(HTTP_X_CAFE_PROFILE=make_token())
+        capture = ProfileCapture.objects.get()
+        self.login_admin()
+
+        response = self.client.get(reverse('admin:cafe_profilecapture_download', args=[capture.id, 'prof']))
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="capture-{capture.id}.prof"')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'capture.prof')
+            with open(path, 'wb') as handle:
+                handle.write(response.content)
+            stats = pstats.Stats(path)
+        self.assertTrue(any(name == 'api_menu' for _, _, name in stats.stats))
+
+        response = self.client.get(reverse('admin:cafe_profilecapture_download', args=[capture.id, 'sql']))
+        self.assertIn('cafe_menuitem', response.content.decode())
+
+    @override_settings(CAFE_PROFILE_BUFFER=3)
+    def test_ring_buffer_keeps_the_newest_captures(self):
+        for number in range(5):
+            self.get(f'/api/menu/?n={number}', HTTP_X_CAFE_PROFILE=make_token())
+        self.assertEqual(
+            list(ProfileCapture.objects.values_list('path', flat=True)),
+            ['/api/menu/?n=4', '/api/menu/?n=3', '/api/menu/?n=2'],
+        )
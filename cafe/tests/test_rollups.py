@@ -0,0 +1,89 @@
+import json
+from datetime import timedelta
+
+from django.db.models import F
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from cafe.models import Category, HourlyItemSales, HourlySales, MenuItem, Order
+from cafe.rollups import WEEKDAY_NAMES, bucket_of, ensure_complete, stale_days
+from cafe.routers import REPORTING_DB_ALIAS
+
+
+class RollupTests(TransactionTestCase):
+    """Hourly buckets follow checkout, and drift is detected and repaired"""
+
+    databases = {'default', REPORTING_DB_ALIAS}
+
+    def setUp(self):
+        category = Category.objects.create(name='مشروبات')
+        self.tea = MenuItem.objects.create(category=category, name='شاي', price=1000)
+        self.coffee = MenuItem.objects.create(category=category, name='قهوة', price=2500)
+        self.juice = MenuItem.objects.create(category=category, name='عصير', price=3000)
+        for tea, coffee in ((3, 1), (2, 0), (1, 2)):
+            lines = [{'id': self.tea.id, 'quantity': tea}]
+            if coffee:
+                lines.append({'id': self.coffee.id, 'quantity': coffee})
+            response = self.client.post('/api/order/create/', json.dumps({
+                'items': lines, 'amount_paid': 20000,
+            }), content_type='application/json')
+            self.assertTrue(response.json()['success'])
+        self.today = timezone.localdate()
+
+    def test_stale_days_compares_order_and_item_buckets(self):
+        self.assertEqual(stale_days(self.today, self.today), [])
+
+        # Item buckets drift while the order buckets stay right
+        HourlyItemSales.objects.filter(item_name='شاي').update(quantity=F('quantity') - 1)
+        self.assertEqual(stale_days(self.today, self.today), [self.today])
+        self.assertEqual(ensure_complete(self.today, self.today), [self.today])
+        self.assertEqual(stale_days(self.today, self.today), [])
+
+        HourlySales.objects.update(revenue=F('revenue') + 1)
+        self.assertEqual(stale_days(self.today, self.today), [self.today])
+        ensure_complete(self.today, self.today)
+        self.assertEqual(stale_days(self.today, self.today), [])
+
+        # Buckets for a day without orders are stale too
+        HourlyItemSales.objects.create(
+            date=self.today - timedelta(days=3), hour=10, weekday=0, item_name='شاي', quantity=1, revenue=1000,
+        )
+        self.assertEqual(stale_days(self.today - timedelta(days=7), self.today), [self.today - timedelta(days=3)])
+
+    def test_heatmap_payload_shape(self):
+        _, hour, weekday = bucket_of(Order.objects.first().created_at)
+        response = self.client.get('/api/statistics/heatmap/', {'date_from': self.today - timedelta(days=6)})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(data['date_from'], (self.today - timedelta(days=6)).isoformat())
+        self.assertEqual(data['date_to'], self.today.isoformat())
+        self.assertEqual(data['weekdays'], WEEKDAY_NAMES)
+        for matrix in [data['orders'], data['revenue']] + [item['quantity'] for item in data['items']]:
+            self.assertEqual(len(matrix), 7)
+            self.assertTrue(all(len(row) == 24 for row in matrix))
+        self.assertEqual(data['orders'][weekday][hour], 3)
+        self.assertEqual(sum(map(sum, data['orders'])), 3)
+        self.assertEqual(sum(map(sum, data['revenue'])), sum(Order.objects.values_list('total_amount', flat=True)))
+
+        # Best sellers first; items that never sold are left out
+        self.assertEqual(
+            [(item['item_name'], item['total_quantity']) for item in data['items']],
+            [('شاي', 6), ('قهوة', 3)],
+        )
+        self.assertEqual(data['items'][0]['quantity'][weekday][hour], 6)
+
+        data = self.client.get('/api/statistics/heatmap/', {'top': 1}).json()
+        self.assertEqual([item['item_name'] for item in data['items']], ['شاي'])
+        data = self.client.get('/api/statistics/heatmap/', {'items': 'قهوة,عصير'}).json()
+        self.assertEqual([item['item_name'] for item in data['items']], ['قهوة'])
+
+        # A range without sales is all zeros
+        data = self.client.get('/api/statistics/heatmap/', {'date_to': '2020-01-31'}).json()
+        self.assertEqual(sum(map(sum, data['orders'])), 0)
+        self.assertEqual(data['items'], [])
+
+        response = self.client.get('/api/statistics/heatmap/', {'date_from': '31-01-2020'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
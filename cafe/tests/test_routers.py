@@ -0,0 +1,81 @@
+from asgiref.sync import async_to_sync
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from cafe.models import Order
+from cafe.routers import REPORTING_DB_ALIAS, ReportingRouter, reporting, reporting_view
+
+
+class ReportingRouterTests(SimpleTestCase):
+    """Only code that opts in reads from the reporting alias"""
+
+    router = ReportingRouter()
+
+    def test_reads_follow_the_reporting_block(self):
+        self.assertIsNone(self.router.db_for_read(Order))
+        self.assertEqual(Order.objects.all().db, DEFAULT_DB_ALIAS)
+        with reporting():
+            self.assertEqual(self.router.db_for_read(Order), REPORTING_DB_ALIAS)
+            self.assertEqual(Order.objects.all().db, REPORTING_DB_ALIAS)
+        self.assertEqual(Order.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_writes_always_go_to_default(self):
+        with reporting():
+            self.assertEqual(self.router.db_for_write(Order), DEFAULT_DB_ALIAS)
+            self.assertEqual(Order.objects.select_for_update().db, DEFAULT_DB_ALIAS)
+
+    def test_read_only_alias_is_never_migrated(self):
+        self.assertIs(self.router.allow_migrate(REPORTING_DB_ALIAS, 'cafe', 'order'), False)
+        self.assertIs(self.router.allow_migrate(REPORTING_DB_ALIAS, 'auth'), False)
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'cafe', 'order'))
+
+    def test_reporting_view_and_fresh(self):
+        def view(request):
+            return HttpResponse(Order.objects.all().db)
+
+        async def async_view(request):
+            return HttpResponse(Order.objects.all().db)
+
+        factory = RequestFactory()
+        wrapped = reporting_view(view)
+        self.assertEqual(wrapped(factory.get('/')).content.decode(), REPORTING_DB_ALIAS)
+        self.assertEqual(wrapped(factory.get('/?fresh=1')).content.decode(), DEFAULT_DB_ALIAS)
+        self.assertEqual(wrapped(factory.get('/?fresh=true')).content.decode(), DEFAULT_DB_ALIAS)
+
+        wrapped = reporting_view(async_view)
+        self.assertEqual(async_to_sync(wrapped)(factory.get('/')).content.decode(), REPORTING_DB_ALIAS)
+        self.assertEqual(async_to_sync(wrapped)(factory.get('/?fresh=1')).content.decode(), DEFAULT_DB_ALIAS)
+        # Outside the view the context is back to default
+        self.assertEqual(Order.objects.all().db, DEFAULT_DB_ALIAS)
+
+
+class ReportingViewQueryTests(TransactionTestCase):
+    """Report endpoints query the reporting connection unless ?fresh=1"""
+
+    databases = {'default', REPORTING_DB_ALIAS}
+
+    def capture(self, url):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as default, \
+                CaptureQueriesContext(connections[REPORTING_DB_ALIAS]) as report:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(default.captured_queries), len(report.captured_queries)
+
+    def test_report_reads_use_the_reporting_alias(self):
+        default, report = self.capture('/api/orders/')
+        self.assertEqual(default, 0)
+        self.assertGreater(report, 0)
+
+    def test_fresh_reads_use_default(self):
+        default, report = self.capture('/api/orders/?fresh=1')
+        self.assertGreater(default, 0)
+        self.assertEqual(report, 0)
+
+    def test_writes_in_a_report_block_use_default(self):
+        with reporting():
+            with CaptureQueriesContext(connections[REPORTING_DB_ALIAS]) as report:
+                order = Order.objects.create(order_number='R-1', total_amount=1000, amount_paid=1000)
+        self.assertEqual(report.captured_queries, [])
+        self.assertEqual(order._state.db, DEFAULT_DB_ALIAS)
@@ -0,0 +1,121 @@
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+import cafe
+from cafe.management.commands import serve
+
+
+class ServeLaunchTests(TransactionTestCase):
+    """The migration marker lets later launches skip checks and migrate"""
+
+    def setUp(self):
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        serve.write_marker(self.connection, 0)
+        self.addCleanup(serve.write_marker, self.connection, 0)
+
+    def launch(self):
+        """Run the launcher's database step; return the commands it ran."""
+        command = serve.Command()
+        command.timings = []
+        with mock.patch.object(serve, 'call_command') as call_command:
+            command.prepare_database(force=False, verbosity=0)
+        return [call.args[0] for call in call_command.call_args_list]
+
+    def test_first_launch_migrates_and_writes_the_marker(self):
+        self.assertEqual(self.launch(), ['check', 'migrate'])
+        self.assertEqual(serve.read_marker(self.connection), serve.migration_fingerprint())
+
+    def test_second_launch_skips_checks_and_migrations(self):
+        self.launch()
+        self.assertEqual(self.launch(), [])
+
+    def test_failed_migrate_leaves_no_marker(self):
+        command = serve.Command()
+        command.timings = []
+        with mock.patch.object(serve, 'call_command', side_effect=[None, RuntimeError('locked')]):
+            with self.assertRaises(RuntimeError):
+                command.prepare_database(force=False, verbosity=0)
+        self.assertEqual(serve.read_marker(self.connection), 0)
+
+    def test_new_migration_forces_migrate(self):
+        self.launch()
+
+        # The same migrations as an importable copy, plus one new file
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        shutil.copytree(
+            Path(cafe.__file__).parent / 'migrations', root / 'cafe_migrations_copy',
+            ignore=shutil.ignore_patterns('__pycache__'),
+        )
+        sys.path.insert(0, str(root))
+        self.addCleanup(sys.path.remove, str(root))
+
+        with override_settings(MIGRATION_MODULES={'cafe': 'cafe_migrations_copy'}):
+            self.assertEqual(self.launch(), [])
+            (root / 'cafe_migrations_copy' / '9999_new.py').write_text('# a new migration\n')
+            self.assertEqual(self.launch(), ['check', 'migrate'])
+            self.assertEqual(serve.read_marker(self.connection), serve.migration_fingerprint())
+
+
+# Seconds from interpreter start to a database-ready, warmed-up process
+# when nothing needs migrating (about 0.3 s on a developer laptop)
+STARTUP_BUDGET = 1.0
+
+LAUNCH_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = 'home_inn_cafe.settings'
+import django
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = sys.argv[1]
+django.setup()
+from cafe.management.commands import serve
+command = serve.Command()
+command.timings = []
+command.prepare_database(force=False, verbosity=0)
+command.warm_up()
+print(json.dumps({
+    'seconds': time.perf_counter() - started,
+    'steps': [label for label, seconds in command.timings if seconds is not None],
+    'pillow': 'PIL' in sys.modules,
+}))
+"""
+
+
+class ServeStartupBudgetTests(SimpleTestCase):
+    """A launch with nothing to migrate fits the startup budget"""
+
+    def launch(self, database):
+        """prepare_database + warm_up in a fresh interpreter, as ``serve`` runs them."""
+        result = subprocess.run(
+            [sys.executable, '-c', LAUNCH_SCRIPT, str(database)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def test_up_to_date_launch_is_within_budget(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        database = directory / 'db.sqlite3'
+
+        first = self.launch(database)
+        self.assertIn('Migrations', first['steps'])
+
+        launches = [self.launch(database) for _ in range(3)]
+        for launch in launches:
+            self.assertNotIn('System checks', launch['steps'])
+            self.assertNotIn('Migrations', launch['steps'])
+            # Pillow is only needed by the ImageField check and the printer
+            self.assertFalse(launch['pillow'])
+        # Best of three, so a busy machine does not fail the run
+        fastest = min(launch['seconds'] for launch in launches)
+        self.assertLess(fastest, STARTUP_BUDGET, f'{fastest * 1000:.0f} ms')
@@ -0,0 +1,94 @@
+import json
+import threading
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from cafe import printer
+from cafe.models import Category, MenuItem, Order, Shift
+from cafe.shifts import close_shift
+from cafe.views import _shift_report_data
+
+
+class ShiftCloseTests(TestCase):
+    """The Z-report counts sales and voided orders on separate lines"""
+
+    def setUp(self):
+        category = Category.objects.create(name='مشروبات')
+        self.item = MenuItem.objects.create(category=category, name='شاي', price=1500)
+
+    def post(self, url, payload):
+        response = self.client.post(url, json.dumps(payload), content_type='application/json')
+        data = response.json()
+        self.assertTrue(data['success'], data)
+        return data
+
+    def test_voided_orders_are_counted_apart(self):
+        orders = [
+            self.post('/api/order/create/', {'items': [{'id': self.item.id, 'quantity': 2}], 'amount_paid': 5000})
+            for _ in range(3)
+        ]
+        self.post(f"/api/orders/{orders[0]['order']['id']}/void/", {'reason': 'خطأ'})
+
+        shift = self.post('/api/shifts/close/', {})['shift']
+        self.assertEqual(shift['orders_count'], 2)
+        self.assertEqual(shift['voided_count'], 1)
+        # Revenue still includes the voided order; its refund is on its own line
+        self.assertEqual(shift['total_revenue'], 3 * 3000)
+        self.assertEqual(shift['refunds'], 3000)
+
+    def test_print_returns_the_z_report_as_escpos(self):
+        self.post('/api/order/create/', {'items': [{'id': self.item.id, 'quantity': 2}], 'amount_paid': 5000})
+        shift = self.post('/api/shifts/close/', {})['shift']
+
+        response = self.client.post(f"/api/shifts/{shift['id']}/print/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertTrue(response.content.startswith(b'\x1b@'))
+        self.assertTrue(response.content.endswith(b'\x1dV\x01'))
+
+        report = _shift_report_data(Shift.objects.get(id=shift['id']))
+        rows = printer.layout(report)
+        self.assertIn(('row', '2× شاي', '3,000'), rows)
+        self.assertIn(('bold', 'صافي النقد', f"{shift['net_cash']:,} د.ع"), rows)
+        self.assertEqual(response.content, printer.escpos_bytes(printer.render_receipt(report)))
+
+        self.assertEqual(self.client.post('/api/shifts/999/print/').status_code, 404)
+
+
+class ShiftCloseLockTests(TransactionTestCase):
+    """No order can commit between the close's timestamp and its insert"""
+
+    def test_checkout_waits_for_the_close(self):
+        real_now = timezone.now
+        errors = []
+
+        def checkout():
+            try:
+                Order.objects.create(total_amount=1000, amount_paid=1000)
+            except OperationalError as error:
+                errors.append(error)
+
+        def now():
+            # A till rings up an order just as the close reads the clock
+            thread = threading.Thread(target=checkout)
+            thread.start()
+            thread.join()
+            return real_now()
+
+        checkout()
+        with mock.patch('cafe.shifts.timezone') as shifts_timezone:
+            shifts_timezone.now.side_effect = now
+            shift = close_shift()
+
+        # The close held the write lock, so the second order could not commit
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(shift.orders_count, 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+        # Retried afterwards it belongs to the next shift
+        checkout()
+        self.assertEqual(close_shift().orders_count, 1)
+        self.assertEqual(Shift.objects.count(), 2)
@@ -0,0 +1,141 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from cafe.models import Category, ImageBlob, MenuItem
+from cafe.storage import collect_blobs, image_storage
+
+
+class ImageStorageTests(TransactionTestCase):
+    """Identical uploads share a file, and unused files are swept after a grace period"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.storage = image_storage()
+        self.category = Category.objects.create(name='مشروبات')
+
+    def item(self, name, photo=None):
+        item = MenuItem(category=self.category, name=name, price=1000)
+        if photo is not None:
+            item.image = SimpleUploadedFile('photo.PNG', photo)
+        item.save()
+        return item
+
+    def ref_counts(self):
+        return dict(ImageBlob.objects.values_list('name', 'ref_count'))
+
+    def gc(self, *args):
+        out = io.StringIO()
+        call_command('gc_images', *args, sleep=0, stdout=out)
+        return out.getvalue()
+
+    def age(self, name, hours):
+        ImageBlob.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(hours=hours))
+
+    def test_identical_uploads_share_one_file(self):
+        tea = self.item('شاي', b'same photo')
+        coffee = self.item('قهوة', b'same photo')
+        juice = self.item('عصير', b'another photo')
+
+        self.assertEqual(tea.image.name, coffee.image.name)
+        self.assertNotEqual(tea.image.name, juice.image.name)
+        self.assertTrue(tea.image.name.startswith('menu_items/'))
+        self.assertTrue(tea.image.name.endswith('.png'))
+        self.assertEqual(self.ref_counts(), {tea.image.name: 2, juice.image.name: 1})
+        _, files = self.storage.listdir(tea.image.name.rsplit('/', 1)[0])
+        self.assertEqual(len(files), 1)
+        with self.storage.open(tea.image.name) as stored:
+            self.assertEqual(stored.read(), b'same photo')
+
+    def test_ref_count_follows_replace_and_delete(self):
+        tea = self.item('شاي', b'old photo')
+        coffee = self.item('قهوة', b'old photo')
+        old = tea.image.name
+
+        tea.image = SimpleUploadedFile('new.png', b'new photo')
+        tea.save()
+        new = tea.image.name
+        self.assertEqual(self.ref_counts(), {old: 1, new: 1})
+
+        coffee.delete()
+        self.assertEqual(self.ref_counts(), {old: 0, new: 1})
+        # Saving without touching the image changes nothing
+        MenuItem.objects.get(id=tea.id).save()
+        self.assertEqual(self.ref_counts(), {old: 0, new: 1})
+
+        tea = MenuItem.objects.get(id=tea.id)
+        tea.image = None
+        tea.save()
+        self.assertEqual(self.ref_counts(), {old: 0, new: 0})
+        # Replaced images stay on disk until gc_images
+        self.assertTrue(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(new))
+
+    def test_gc_waits_out_the_grace_period(self):
+        item = self.item('شاي', b'old photo')
+        old = item.image.name
+        item.image = SimpleUploadedFile('new.png', b'new photo')
+        item.save()
+
+        self.assertIn('Deleted 0 unreferenced images', self.gc('--grace-hours=24'))
+        self.assertTrue(self.storage.exists(old))
+
+        self.age(old, 25)
+        self.assertIn('Deleted 1 unreferenced images', self.gc('--grace-hours=24'))
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(item.image.name))
+        self.assertEqual(self.ref_counts(), {item.image.name: 1})
+
+    def test_dry_run_deletes_nothing(self):
+        item = self.item('شاي', b'old photo')
+        old = item.image.name
+        item.image = None
+        item.save()
+        self.age(old, 48)
+
+        output = self.gc('--dry-run')
+        self.assertIn('Unreferenced images older than 24h: 1', output)
+        self.assertTrue(self.storage.exists(old))
+        self.assertEqual(self.ref_counts(), {old: 0})
+
+    def test_rolled_back_collection_keeps_the_files(self):
+        item = self.item('شاي', b'photo')
+        name = item.image.name
+        item.delete()
+        blob = ImageBlob.objects.get(name=name)
+        candidates = [(blob.id, blob.name, blob.size)]
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertEqual(collect_blobs(candidates, timezone.now()), (1, len(b'photo')))
+            raise RuntimeError('a later step failed')
+        self.assertTrue(ImageBlob.objects.filter(name=name).exists())
+        self.assertTrue(self.storage.exists(name))
+
+        self.assertEqual(collect_blobs(candidates, timezone.now()), (1, len(b'photo')))
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_upload_before_the_file_is_removed_keeps_it(self):
+        item = self.item('شاي', b'photo')
+        name = item.image.name
+        item.delete()
+        blob = ImageBlob.objects.get(name=name)
+
+        with transaction.atomic():
+            collect_blobs([(blob.id, blob.name, blob.size)], timezone.now())
+            # Uploaded again before the collection's files are removed
+            self.assertEqual(self.item('قهوة', b'photo').image.name, name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.ref_counts(), {name: 1})
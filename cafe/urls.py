@@ -8,20 +8,51 @@ urlpatterns = [
     path('menu/', views.menu_management_view, name='menu_management'),
     path('statistics/', views.statistics_view, name='statistics'),
     path('orders/', views.orders_view, name='orders'),
+    path('kitchen/', views.kitchen_view, name='kitchen'),
     
     # API endpoints
     path('api/menu/', views.api_menu, name='api_menu'),
     path('api/order/create/', views.api_create_order, name='api_create_order'),
+    path('api/order/quote/', views.api_quote_order, name='api_quote_order'),
     path('api/order/<int:order_id>/print/', views.api_print_receipt, name='api_print_receipt'),
+    path('api/orders/receipts/', views.api_print_receipts, name='api_print_receipts'),
     path('api/orders/', views.api_orders, name='api_orders'),
     path('api/orders/<int:order_id>/', views.api_order_detail, name='api_order_detail'),
+    path('api/orders/<int:order_id>/void/', views.api_void_order, name='api_void_order'),
+    path('api/orders/<int:order_id>/refund/', views.api_refund_order, name='api_refund_order'),
     path('api/statistics/', views.api_statistics, name='api_statistics'),
+    path('api/statistics/heatmap/', views.api_heatmap, name='api_heatmap'),
+    
+    # Shift close / Z-report API
+    path('api/shifts/', views.api_shifts, name='api_shifts'),
+    path('api/shifts/close/', views.api_close_shift, name='api_close_shift'),
+    path('api/shifts/<int:shift_id>/', views.api_shift_detail, name='api_shift_detail'),
+    path('api/shifts/<int:shift_id>/print/', views.api_print_shift, name='api_print_shift'),
+    
+    # Kitchen display API
+    path('api/kitchen/<slug:station_slug>/feed/', views.api_kitchen_feed, name='api_kitchen_feed'),
+    path('api/kitchen/tickets/<int:ticket_id>/bump/', views.api_ticket_bump, name='api_ticket_bump'),
+    path('api/kitchen/tickets/<int:ticket_id>/complete/', views.api_ticket_complete, name='api_ticket_complete'),
+    
+    # Async read API (concurrent queries; best served through ASGI)
+    path('api/async/statistics/', views.api_statistics_async, name='api_statistics_async'),
+    path('api/async/orders/', views.api_orders_async, name='api_orders_async'),
+    path('api/async/orders/<int:order_id>/', views.api_order_detail_async, name='api_order_detail_async'),
+    path('api/dashboard/', views.api_dashboard, name='api_dashboard'),
+    
+    # Branch replication API (head office)
+    path('api/sync/ingest/', views.api_sync_ingest, name='api_sync_ingest'),
+    
+    # Write admission metrics
+    path('api/admission/', views.api_admission, name='api_admission'),
     
     # Category Management API
     path('api/categories/', views.api_categories, name='api_categories'),
     path('api/categories/<int:category_id>/', views.api_category_detail, name='api_category_detail'),
+    path('api/categories/bulk/', views.api_categories_bulk, name='api_categories_bulk'),
     
     # Menu Items Management API
     path('api/items/', views.api_items, name='api_items'),
     path('api/items/<int:item_id>/', views.api_item_detail, name='api_item_detail'),
+    path('api/items/bulk/', views.api_items_bulk, name='api_items_bulk'),
 ]
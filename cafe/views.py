@@ -1,17 +1,37 @@
 import json
 from datetime import datetime, timedelta
 from django.shortcuts import render
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import Sum, Count
+from django.db import transaction
+from django.db.models import Count
 from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 
-from .models import Category, MenuItem, Order, OrderItem
-# Printing disabled - uncomment below to enable
-# from .printer import print_receipt
+from .adjustments import AdjustmentError, refund_items, void_order
+from .admission import snapshot as admission_snapshot, write_view
+from .archive import archived_orders, range_needs_archive
+from .fanout import gather_queries, run_in_pool
+from .kitchen import (
+    bump_ticket, complete_ticket, create_tickets, feed_timeout, station_snapshot, wait_for_changes,
+)
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, Category, MenuItem, Order, OrderChange, OrderItem, Shift, Station,
+)
+from .pricing import get_price_table
+from .printer import escpos_bytes, render_pdf, render_png_page, render_receipt, stream_escpos
+from .replication import decode_batch, ingest_orders
+from .responses import JsonResponse, columnar, wants_columns
+from .rollups import (
+    heatmap_payload, heatmap_queries, net_item_quantity, net_item_revenue, net_orders_count, net_revenue,
+    record_order,
+)
+from .routers import reporting_view
+from .shifts import ShiftAlreadyClosed, close_shift, serialize_shift
+from .stock import OutOfStock, consume_stock, parse_stock, plan_stock
+# Sending receipts to the printer is disabled; cafe/printer.py only renders them
 
 
 def cashier_view(request):
@@ -48,6 +68,18 @@ def orders_view(request):
     return render(request, 'cafe/orders.html', context)
 
 
+def kitchen_view(request):
+    """شاشة المطبخ - Kitchen/bar ticket display"""
+    stations = list(Station.objects.filter(is_active=True))
+    slug = request.GET.get('station')
+    context = {
+        'cafe_name': getattr(settings, 'CAFE_NAME', 'هوم إن كافيه'),
+        'stations': stations,
+        'station': next((station for station in stations if station.slug == slug), stations[0] if stations else None),
+    }
+    return render(request, 'cafe/kitchen.html', context)
+
+
 @require_http_methods(["GET"])
 def api_menu(request):
     """API: Get all menu items grouped by category"""
@@ -67,14 +99,18 @@ def api_menu(request):
                 'price': item.price,
                 'description': item.description,
                 'image': item.image.url if item.image else None,
+                'stock_quantity': item.stock_quantity,
             })
         data.append(cat_data)
     
+    if wants_columns(request):
+        return JsonResponse({'categories': columnar(data, nested=('items',))})
     return JsonResponse({'categories': data})
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@write_view('checkout')
 def api_create_order(request):
     """API: Create a new order"""
     try:
@@ -85,40 +121,66 @@ def api_create_order(request):
         if not items:
             return JsonResponse({'success': False, 'error': 'لا توجد أصناف في الطلب'}, status=400)
         
-        # Calculate total
-        total_amount = 0
-        order_items_data = []
+        # Load every ordered item (and its category, for ticket routing) in one query
+        menu_items = MenuItem.objects.select_related('category').in_bulk(
+            [item_data['id'] for item_data in items]
+        )
+        
+        lines = []
+        quantities = {}
         
         for item_data in items:
-            menu_item = MenuItem.objects.get(id=item_data['id'])
-            quantity = item_data.get('quantity', 1)
-            subtotal = menu_item.price * quantity
-            total_amount += subtotal
-            
-            order_items_data.append({
-                'menu_item': menu_item,
-                'item_name': menu_item.name,
-                'quantity': quantity,
-                'unit_price': menu_item.price,
-                'subtotal': subtotal,
-            })
+            menu_item = menu_items.get(item_data['id'])
+            if menu_item is None:
+                raise MenuItem.DoesNotExist()
+            quantity = int(item_data.get('quantity', 1))
+            if quantity < 1:
+                return JsonResponse({'success': False, 'error': 'كمية غير صالحة'}, status=400)
+            quantities[menu_item.id] = quantities.get(menu_item.id, 0) + quantity
+            lines.append((menu_item, quantity))
+        
+        # Happy hours, discounts and bundles from the compiled price table
+        order_items_data = _priced_lines(lines)
+        total_amount = sum(line['subtotal'] for line in order_items_data)
+        
+        # Work out stock consumption before taking the write lock
+        item_needs, ingredient_needs = plan_stock(menu_items, quantities)
         
         # Calculate change
         change_given = max(0, amount_paid - total_amount)
         
-        # Create order
-        order = Order.objects.create(
-            total_amount=total_amount,
-            amount_paid=amount_paid,
-            change_given=change_given,
-        )
-        
-        # Create order items
-        for item_data in order_items_data:
-            OrderItem.objects.create(
-                order=order,
-                **item_data
+        with transaction.atomic():
+            # Conditional decrements; raises OutOfStock and rolls back if short
+            consume_stock(menu_items, item_needs, ingredient_needs)
+            
+            # Create order
+            order = Order.objects.create(
+                total_amount=total_amount,
+                amount_paid=amount_paid,
+                change_given=change_given,
             )
+            
+            # Create order items
+            for item_data in order_items_data:
+                OrderItem.objects.create(
+                    order=order,
+                    **item_data
+                )
+            
+            # Record the change for head office replication
+            OrderChange.objects.create(order_id=order.id, action=OrderChange.ACTION_CREATE)
+            
+            # Keep the hourly analytics buckets current
+            record_order(order, [
+                (line['item_name'], line['quantity'], line['subtotal'])
+                for line in order_items_data
+            ])
+            
+            # Send the lines to their kitchen/bar stations, as rung up (before bundle splits)
+            create_tickets(order, [
+                (menu_item.category.station_id, menu_item.name, quantity)
+                for menu_item, quantity in lines
+            ], notes=order.notes)
         
         return JsonResponse({
             'success': True,
@@ -134,6 +196,78 @@ def api_create_order(request):
         
     except MenuItem.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'صنف غير موجود'}, status=400)
+    except OutOfStock as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'الكمية غير متوفرة: {e}',
+            'out_of_stock': e.names,
+        }, status=409)
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _priced_lines(lines):
+    """OrderItem field values for ``(menu_item, quantity)`` lines at current prices"""
+    order_lines = []
+    for line in get_price_table().price_order(lines):
+        rule = line['price_rule']
+        order_lines.append({
+            'menu_item': line['menu_item'],
+            'item_name': line['menu_item'].name,
+            'quantity': line['quantity'],
+            'unit_price': line['unit_price'],
+            'subtotal': line['unit_price'] * line['quantity'],
+            'list_price': line['list_price'],
+            'price_rule': rule,
+            'price_rule_name': rule.name if rule else '',
+        })
+    return order_lines
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_quote_order(request):
+    """API: Price a cart with the rules in effect now, without creating an order"""
+    try:
+        data = json.loads(request.body)
+        items = data.get('items', [])
+        
+        menu_items = MenuItem.objects.in_bulk([item_data['id'] for item_data in items])
+        lines = []
+        for item_data in items:
+            menu_item = menu_items.get(item_data['id'])
+            if menu_item is None:
+                raise MenuItem.DoesNotExist()
+            quantity = int(item_data.get('quantity', 1))
+            if quantity < 1:
+                return JsonResponse({'success': False, 'error': 'كمية غير صالحة'}, status=400)
+            lines.append((menu_item, quantity))
+        
+        priced = _priced_lines(lines)
+        total_amount = sum(line['subtotal'] for line in priced)
+        list_total = sum(line['list_price'] * line['quantity'] for line in priced)
+        
+        return JsonResponse({
+            'success': True,
+            'lines': [{
+                'id': line['menu_item'].id,
+                'item_name': line['item_name'],
+                'quantity': line['quantity'],
+                'list_price': line['list_price'],
+                'unit_price': line['unit_price'],
+                'subtotal': line['subtotal'],
+                'price_rule': line['price_rule_name'] or None,
+            } for line in priced],
+            'total_amount': total_amount,
+            'discount': list_total - total_amount,
+        })
+        
+    except MenuItem.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'صنف غير موجود'}, status=400)
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -149,181 +283,928 @@ def api_print_receipt(request, order_id):
     }, status=501)
 
 
+# Receipts per batch reprint; a busy month stays under this
+MAX_BATCH_RECEIPTS = 5000
+
+
 @require_http_methods(["GET"])
+@reporting_view
+def api_print_receipts(request):
+    """API: Reprint many receipts as one ESC/POS stream, a PDF or one PNG page
+
+    Orders come from ``ids=1,2,3`` or the orders page filters
+    (``date_from``, ``date_to``, ``search``), oldest first. Rendering
+    happens in cafe/printer.py, on CAFE_RECEIPT_WORKERS processes.
+    """
+    try:
+        output = request.GET.get('format', 'pdf')
+        if output not in ('escpos', 'pdf', 'png'):
+            return JsonResponse({'success': False, 'error': 'صيغة غير مدعومة'}, status=400)
+        
+        orders = _receipt_orders(request)
+        if orders is None:
+            return JsonResponse({'success': False, 'error': 'حدد الطلبات أو نطاق التاريخ'}, status=400)
+        if len(orders) > MAX_BATCH_RECEIPTS:
+            return JsonResponse({
+                'success': False,
+                'error': f'عدد الإيصالات أكبر من {MAX_BATCH_RECEIPTS} - اختر نطاقاً أصغر',
+            }, status=400)
+        if not orders:
+            return JsonResponse({'success': False, 'error': 'لا توجد طلبات'}, status=404)
+        
+        # Loaded in full before any rendering: the stream below runs after the view returns
+        receipts = [_receipt_data(order) for order in orders]
+        workers = getattr(settings, 'CAFE_RECEIPT_WORKERS', 2)
+        font = getattr(settings, 'CAFE_RECEIPT_FONT', '')
+        filename = f'receipts-{timezone.localdate().isoformat()}'
+        
+        if output == 'escpos':
+            response = StreamingHttpResponse(
+                stream_escpos(receipts, workers, font), content_type='application/octet-stream'
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}.bin"'
+        elif output == 'pdf':
+            content, pages = render_pdf(receipts, workers, font)
+            response = HttpResponse(content, content_type='application/pdf')
+            response['Content-Disposition'] = f'inline; filename="{filename}.pdf"'
+            response['X-Total-Pages'] = pages
+        else:
+            content, pages = render_png_page(receipts, int(request.GET.get('page', 1)), font)
+            response = HttpResponse(content, content_type='image/png')
+            response['X-Total-Pages'] = pages
+        
+        response['X-Receipt-Count'] = len(receipts)
+        return response
+        
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _receipt_orders(request):
+    """Orders for a batch reprint with their lines, in two queries per table.
+
+    Returns None when neither ``ids`` nor a date range is given, and at
+    most MAX_BATCH_RECEIPTS + 1 orders so the caller can refuse the rest.
+    """
+    ids = request.GET.get('ids', '').strip()
+    if ids:
+        order_ids = [int(order_id) for order_id in ids.split(',') if order_id.strip()][:MAX_BATCH_RECEIPTS + 1]
+        found = {order.id: order for order in Order.objects.filter(id__in=order_ids).prefetch_related('items')}
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        if missing:
+            found.update(
+                (order.id, order)
+                for order in ArchivedOrder.objects.filter(id__in=missing).prefetch_related('items')
+            )
+        return [found[order_id] for order_id in dict.fromkeys(order_ids) if order_id in found]
+    
+    if not (request.GET.get('date_from') or request.GET.get('date_to')):
+        return None
+    
+    _, _, orders, archived = _orders_querysets(request)
+    limit = MAX_BATCH_RECEIPTS + 1
+    # Archived orders are all older than live ones
+    selected = list(archived.order_by('created_at', 'id')[:limit]) if archived is not None else []
+    if len(selected) < limit:
+        selected += list(orders.order_by('created_at', 'id')[:limit - len(selected)])
+    return selected
+
+
+def _receipt_data(order):
+    """Plain data for cafe/printer.py, picklable for its worker processes"""
+    return {
+        'header': settings.CAFE_NAME,
+        'number': order.order_number,
+        'created': timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M'),
+        'lines': [(item.item_name, item.quantity, item.subtotal) for item in order.items.all()],
+        'total': order.total_amount,
+        'paid': order.amount_paid,
+        'change': order.change_given,
+        'refunded': order.refunded_amount,
+        'voided': order.is_voided,
+    }
+
+
+@require_http_methods(["GET"])
+@reporting_view
 def api_statistics(request):
     """API: Get sales statistics"""
     try:
-        # Get date range from query params
         period = request.GET.get('period', 'today')
+        queries = _statistics_queries(_period_start(period))
+        results = {name: query() for name, query in queries.items()}
+        return JsonResponse({'success': True, **_statistics_payload(period, results)})
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _period_start(period):
+    """Start of a statistics period ('today', 'week' or 'month')"""
+    now = timezone.now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    if period == 'week':
+        return today_start - timedelta(days=7)
+    elif period == 'month':
+        return today_start - timedelta(days=30)
+    return today_start
+
+
+def _statistics_queries(start_date):
+    """Independent statistics queries, keyed by name.
+
+    Each value is a zero-argument callable, so callers can run them one
+    after another or fan them out concurrently.
+    """
+    queries = _sales_queries(
+        Order.objects.filter(created_at__gte=start_date),
+        OrderItem.objects.filter(order__created_at__gte=start_date),
+    )
+    
+    # Older parts of the range live in the archive tables
+    if range_needs_archive(start_date):
+        archived = _sales_queries(
+            ArchivedOrder.objects.filter(created_at__gte=start_date),
+            ArchivedOrderItem.objects.filter(order__created_at__gte=start_date),
+        )
+        queries.update({f'archived_{name}': query for name, query in archived.items()})
+    
+    return queries
+
+
+def _sales_queries(orders, order_items):
+    """Count, revenue, daily breakdown and per-item totals for a pair of querysets.
+
+    All figures are net of voids and refunds.
+    """
+    # Daily breakdown
+    daily_stats = orders.annotate(
+        date=TruncDate('created_at')
+    ).values('date').annotate(
+        orders_count=net_orders_count(),
+        revenue=net_revenue()
+    ).order_by('date')
+    
+    # Top selling items
+    top_items = order_items.values('item_name').annotate(
+        total_quantity=net_item_quantity(),
+        total_revenue=net_item_revenue()
+    ).order_by('-total_quantity')
+    
+    return {
+        'total_orders': orders.filter(is_voided=False).count,
+        'total_revenue': lambda: orders.aggregate(total=net_revenue())['total'] or 0,
+        'daily_stats': lambda: list(daily_stats),
+        'top_items': lambda: list(top_items),
+    }
+
+
+def _statistics_payload(period, results):
+    """Combine the results of ``_statistics_queries`` into the API payload"""
+    total_orders = results['total_orders']
+    total_revenue = results['total_revenue']
+    daily_stats = results['daily_stats']
+    top_items = results['top_items']
+    
+    if 'archived_total_orders' in results:
+        total_orders += results['archived_total_orders']
+        total_revenue += results['archived_total_revenue']
+        daily_stats = _merge_rows(
+            results['archived_daily_stats'] + daily_stats, 'date', ['orders_count', 'revenue']
+        )
+        top_items = _merge_rows(
+            results['archived_top_items'] + top_items, 'item_name', ['total_quantity', 'total_revenue']
+        )
+    
+    daily_stats.sort(key=lambda row: row['date'])
+    top_items.sort(key=lambda row: row['total_quantity'], reverse=True)
+    
+    return {
+        'period': period,
+        'total_orders': total_orders,
+        'total_revenue': total_revenue,
+        'daily_stats': daily_stats,
+        'top_items': top_items[:10],
+    }
+
+
+@require_http_methods(["GET"])
+@reporting_view
+def api_heatmap(request):
+    """API: Hour x weekday matrices of orders, revenue and item quantities"""
+    try:
+        start_day, end_day = _heatmap_range(request)
+        items = [name for name in request.GET.get('items', '').split(',') if name]
+        top = int(request.GET.get('top', 5))
+        
+        queries = heatmap_queries(start_day, end_day)
+        results = {name: query() for name, query in queries.items()}
         
-        now = timezone.now()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return JsonResponse({
+            'success': True,
+            **heatmap_payload(start_day, end_day, results, items=items, top=top),
+        })
         
-        if period == 'today':
-            start_date = today_start
-        elif period == 'week':
-            start_date = today_start - timedelta(days=7)
-        elif period == 'month':
-            start_date = today_start - timedelta(days=30)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'تاريخ غير صالح'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _heatmap_range(request):
+    """Local date range from date_from/date_to (default: the last 365 days)"""
+    today = timezone.localdate()
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+    
+    end_day = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else today
+    start_day = (
+        datetime.strptime(date_from, '%Y-%m-%d').date() if date_from
+        else end_day - timedelta(days=364)
+    )
+    return start_day, end_day
+
+
+def _merge_rows(rows, key, sum_fields):
+    """Merge grouped rows that share ``key`` by summing ``sum_fields``."""
+    merged = {}
+    for row in rows:
+        if row[key] in merged:
+            for field in sum_fields:
+                merged[row[key]][field] += row[field]
         else:
-            start_date = today_start
-        
-        # Get orders in date range
-        orders = Order.objects.filter(created_at__gte=start_date)
-        
-        # Calculate statistics
-        total_orders = orders.count()
-        total_revenue = orders.aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Daily breakdown
-        daily_stats = orders.annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            orders_count=Count('id'),
-            revenue=Sum('total_amount')
-        ).order_by('date')
-        
-        # Top selling items
-        top_items = OrderItem.objects.filter(
-            order__created_at__gte=start_date
-        ).values('item_name').annotate(
-            total_quantity=Sum('quantity'),
-            total_revenue=Sum('subtotal')
-        ).order_by('-total_quantity')[:10]
+            merged[row[key]] = dict(row)
+    return list(merged.values())
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@write_view('service')
+def api_sync_ingest(request):
+    """API: Receive a batch of orders from a branch (head office)"""
+    token = getattr(settings, 'SYNC_TOKEN', '')
+    if not token or request.headers.get('X-Sync-Token') != token:
+        return JsonResponse({'success': False, 'error': 'غير مصرح'}, status=403)
+    
+    try:
+        data = decode_batch(request.body, request.headers.get('Content-Encoding', ''))
+        branch = data.get('branch', '').strip()
+        orders = data.get('orders', [])
+        
+        if not branch:
+            return JsonResponse({'success': False, 'error': 'رمز الفرع مفقود'}, status=400)
+        
+        inserted = ingest_orders(branch, orders) if orders else 0
         
         return JsonResponse({
             'success': True,
-            'period': period,
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'daily_stats': list(daily_stats),
-            'top_items': list(top_items),
+            'received': len(orders),
+            'inserted': inserted,
         })
         
+    except (ValueError, KeyError, OSError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
-
 # ==================== Orders API ====================
 
 @require_http_methods(["GET"])
+@reporting_view
 def api_orders(request):
     """API: Get all orders with pagination and filtering"""
     try:
-        # Get query parameters
-        page = int(request.GET.get('page', 1))
-        per_page = int(request.GET.get('per_page', 20))
-        search = request.GET.get('search', '').strip()
-        date_from = request.GET.get('date_from', '')
-        date_to = request.GET.get('date_to', '')
-        
-        # Base queryset
-        orders = Order.objects.prefetch_related('items').order_by('-created_at')
+        page, per_page, orders, archived = _orders_querysets(request)
+        queries = _orders_queries(orders, archived, page, per_page)
+        results = {name: query() for name, query in queries.items()}
+        payload = _orders_results_payload(results, archived, page, per_page)
         
-        # Apply filters
-        if search:
-            orders = orders.filter(order_number__icontains=search)
-        
-        if date_from:
-            try:
-                from_date = datetime.strptime(date_from, '%Y-%m-%d')
-                from_date = timezone.make_aware(from_date)
-                orders = orders.filter(created_at__gte=from_date)
-            except ValueError:
-                pass
-        
-        if date_to:
-            try:
-                to_date = datetime.strptime(date_to, '%Y-%m-%d')
-                to_date = timezone.make_aware(to_date.replace(hour=23, minute=59, second=59))
-                orders = orders.filter(created_at__lte=to_date)
-            except ValueError:
-                pass
-        
-        # Get total count before pagination
-        total_count = orders.count()
-        total_pages = (total_count + per_page - 1) // per_page
-        
-        # Apply pagination
-        start = (page - 1) * per_page
-        end = start + per_page
-        orders = orders[start:end]
-        
-        # Serialize orders
-        orders_data = []
-        for order in orders:
-            order_items = [{
-                'item_name': item.item_name,
-                'quantity': item.quantity,
-                'unit_price': item.unit_price,
-                'subtotal': item.subtotal,
-            } for item in order.items.all()]
-            
-            orders_data.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'created_at': order.created_at.isoformat(),
-                'total_amount': order.total_amount,
-                'amount_paid': order.amount_paid,
-                'change_given': order.change_given,
-                'notes': order.notes,
-                'is_printed': order.is_printed,
-                'items': order_items,
-            })
+        if wants_columns(request):
+            payload['orders'] = columnar(payload['orders'], nested=('items',))
+        
+        return JsonResponse({'success': True, **payload})
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _orders_querysets(request):
+    """Parse the api_orders query string into (page, per_page, live, archived-or-None)"""
+    # Get query parameters
+    page = int(request.GET.get('page', 1))
+    per_page = int(request.GET.get('per_page', 20))
+    search = request.GET.get('search', '').strip()
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+    
+    # Base queryset
+    orders = Order.objects.prefetch_related('items').order_by('-created_at')
+    from_date = to_date = None
+    
+    # Apply filters
+    if search:
+        orders = orders.filter(order_number__icontains=search)
+    
+    if date_from:
+        try:
+            from_date = datetime.strptime(date_from, '%Y-%m-%d')
+            from_date = timezone.make_aware(from_date)
+            orders = orders.filter(created_at__gte=from_date)
+        except ValueError:
+            from_date = None
+    
+    if date_to:
+        try:
+            to_date = datetime.strptime(date_to, '%Y-%m-%d')
+            to_date = timezone.make_aware(to_date.replace(hour=23, minute=59, second=59))
+            orders = orders.filter(created_at__lte=to_date)
+        except ValueError:
+            to_date = None
+    
+    # Only consult the archive when the date range reaches back into it
+    archived = None
+    if range_needs_archive(from_date):
+        archived = archived_orders(search, from_date, to_date).prefetch_related('items')
+    
+    return page, per_page, orders, archived
+
+
+def _orders_page(live_page, archived, live_count, start, end):
+    """Complete a page of live orders from the archive when it runs past them.
+
+    Archived orders are all older than live ones, so they simply continue
+    the list after the last live order.
+    """
+    page_orders = list(live_page)
+    if archived is not None and end > live_count:
+        page_orders += list(archived[max(0, start - live_count):end - live_count])
+    return page_orders
+
+
+def _orders_payload(page_orders, page, per_page, total_count):
+    return {
+        'orders': [_serialize_order(order) for order in page_orders],
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total_count': total_count,
+            'total_pages': (total_count + per_page - 1) // per_page,
+        }
+    }
+
+
+@require_http_methods(["GET"])
+@reporting_view
+def api_order_detail(request, order_id):
+    """API: Get single order details"""
+    try:
+        order = _load_order(order_id)
         
         return JsonResponse({
             'success': True,
-            'orders': orders_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total_count': total_count,
-                'total_pages': total_pages,
-            }
+            'order': _serialize_order(order),
         })
         
+    except ArchivedOrder.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'الطلب غير موجود'}, status=404)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _load_order(order_id):
+    """Fetch a live order, falling back to the archive; raises ArchivedOrder.DoesNotExist"""
+    order = Order.objects.prefetch_related('items').filter(id=order_id).first()
+    if order is None:
+        order = ArchivedOrder.objects.prefetch_related('items').get(id=order_id)
+    return order
+
+
+def _serialize_order(order):
+    """Serialize a live or archived order with its (prefetched) lines"""
+    order_items = [{
+        'id': item.id,
+        'item_name': item.item_name,
+        'quantity': item.quantity,
+        'unit_price': item.unit_price,
+        'subtotal': item.subtotal,
+        'refunded_quantity': item.refunded_quantity,
+        'list_price': item.list_price,
+        'price_rule': item.price_rule_name or None,
+    } for item in order.items.all()]
+    
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'created_at': order.created_at.isoformat(),
+        'total_amount': order.total_amount,
+        'amount_paid': order.amount_paid,
+        'change_given': order.change_given,
+        'notes': order.notes,
+        'is_printed': order.is_printed,
+        'is_voided': order.is_voided,
+        'refunded_amount': order.refunded_amount,
+        'items': order_items,
+    }
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@write_view('service')
+def api_void_order(request, order_id):
+    """API: Void a whole order"""
+    try:
+        data = json.loads(request.body) if request.body else {}
+        adjustment = void_order(order_id, reason=data.get('reason', '').strip())
+        
+        return JsonResponse({
+            'success': True,
+            'adjustment': _serialize_adjustment(adjustment),
+        })
+        
+    except AdjustmentError as e:
+        return JsonResponse({'success': False, 'error': e.message}, status=e.status)
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@write_view('service')
+def api_refund_order(request, order_id):
+    """API: Refund some lines of an order
+
+    Body: ``{"items": [{"id": <order line id>, "quantity": n}], "reason": ""}``
+    """
+    try:
+        data = json.loads(request.body)
+        quantities = {}
+        for line in data.get('items', []):
+            quantities[int(line['id'])] = quantities.get(int(line['id']), 0) + int(line.get('quantity', 1))
+        
+        adjustment = refund_items(order_id, quantities, reason=data.get('reason', '').strip())
+        
+        return JsonResponse({
+            'success': True,
+            'adjustment': _serialize_adjustment(adjustment),
+        })
+        
+    except AdjustmentError as e:
+        return JsonResponse({'success': False, 'error': e.message}, status=e.status)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _serialize_adjustment(adjustment):
+    return {
+        'id': adjustment.id,
+        'order_id': adjustment.order_id,
+        'order_number': adjustment.order_number,
+        'kind': adjustment.kind,
+        'amount': adjustment.amount,
+        'lines': [
+            {'item_name': item_name, 'quantity': quantity, 'amount': amount}
+            for item_name, quantity, amount in adjustment.lines
+        ],
+        'reason': adjustment.reason,
+        'created_at': adjustment.created_at.isoformat(),
+    }
+
+
+# ==================== Shift Close API ====================
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@write_view('service')
+def api_close_shift(request):
+    """API: Close the current shift and freeze its Z-report"""
+    try:
+        data = json.loads(request.body) if request.body else {}
+        shift = close_shift(notes=data.get('notes', '').strip())
+        
+        return JsonResponse({
+            'success': True,
+            'shift': serialize_shift(shift),
+        })
+        
+    except ShiftAlreadyClosed:
+        return JsonResponse({'success': False, 'error': 'تم إغلاق الوردية للتو'}, status=409)
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
 @require_http_methods(["GET"])
-def api_order_detail(request, order_id):
-    """API: Get single order details"""
+@reporting_view
+def api_shifts(request):
+    """API: Recent Z-reports (frozen summaries, no re-aggregation)"""
     try:
-        order = Order.objects.prefetch_related('items').get(id=order_id)
+        limit = min(int(request.GET.get('limit', 30)), 365)
+        shifts = Shift.objects.all()[:max(limit, 1)]
+        
+        return JsonResponse({
+            'success': True,
+            'shifts': [serialize_shift(shift, with_items=False) for shift in shifts],
+        })
         
-        order_items = [{
-            'item_name': item.item_name,
-            'quantity': item.quantity,
-            'unit_price': item.unit_price,
-            'subtotal': item.subtotal,
-        } for item in order.items.all()]
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@reporting_view
+def api_shift_detail(request, shift_id):
+    """API: A single Z-report with its per-item summary"""
+    try:
+        shift = Shift.objects.get(id=shift_id)
         
         return JsonResponse({
             'success': True,
-            'order': {
-                'id': order.id,
-                'order_number': order.order_number,
-                'created_at': order.created_at.isoformat(),
-                'total_amount': order.total_amount,
-                'amount_paid': order.amount_paid,
-                'change_given': order.change_given,
-                'notes': order.notes,
-                'is_printed': order.is_printed,
-                'items': order_items,
-            }
+            'shift': serialize_shift(shift),
         })
         
-    except Order.DoesNotExist:
+    except Shift.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'الوردية غير موجودة'}, status=404)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_print_shift(request, shift_id):
+    """API: A Z-report as an ESC/POS byte stream for the receipt printer"""
+    try:
+        shift = Shift.objects.get(id=shift_id)
+        
+        image = render_receipt(_shift_report_data(shift), getattr(settings, 'CAFE_RECEIPT_FONT', ''))
+        response = HttpResponse(escpos_bytes(image), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="z-report-{shift.id}.bin"'
+        return response
+        
+    except Shift.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'الوردية غير موجودة'}, status=404)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def _shift_report_data(shift):
+    """Plain data for a Z-report printout (see printer.shift_layout)"""
+    return {
+        'kind': 'shift',
+        'header': settings.CAFE_NAME,
+        'number': shift.id,
+        'opened': timezone.localtime(shift.opened_at).strftime('%Y-%m-%d %H:%M'),
+        'closed': timezone.localtime(shift.closed_at).strftime('%Y-%m-%d %H:%M'),
+        'first_order': shift.first_order_number,
+        'last_order': shift.last_order_number,
+        'lines': [(item['item_name'], item['quantity'], item['revenue']) for item in shift.item_summary],
+        'orders_count': shift.orders_count,
+        'voided_count': shift.voided_count,
+        'total_revenue': shift.total_revenue,
+        'cash_in': shift.cash_in,
+        'cash_out': shift.cash_out,
+        'refunds': shift.refunds,
+        'net_cash': shift.net_cash,
+    }
+
+
+# ==================== Kitchen Display API ====================
+# Stations long-poll the feed with the last version they have seen; see
+# cafe/kitchen.py. The feed is async so waiting displays hold no thread
+# under ASGI; under WSGI each poll is cut short instead (feed_timeout).
+
+@require_http_methods(["GET"])
+async def api_kitchen_feed(request, station_slug):
+    """API (async): Ticket changes for a station after ``since`` (long-poll)"""
+    try:
+        station = await run_in_pool(lambda: Station.objects.get(slug=station_slug))
+    except Station.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'المحطة غير موجودة'}, status=404)
+    
+    try:
+        since = int(request.GET.get('since', 0))
+        
+        # A fresh display gets the open tickets and the current cursor at once
+        if since <= 0:
+            version, tickets = await run_in_pool(station_snapshot, station.id)
+            return JsonResponse({'success': True, 'version': version, 'snapshot': True, 'tickets': tickets})
+        
+        tickets = await wait_for_changes(station.id, since, timeout=feed_timeout(request))
+        version = tickets[-1]['version'] if tickets else since
+        return JsonResponse({'success': True, 'version': version, 'snapshot': False, 'tickets': tickets})
+        
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@write_view('service')
+def api_ticket_bump(request, ticket_id):
+    """API: Move a ticket to its next status (new -> preparing -> done)"""
+    try:
+        if not bump_ticket(ticket_id):
+            return JsonResponse({'success': False, 'error': 'التذكرة غير موجودة أو مكتملة'}, status=404)
+        return JsonResponse({'success': True})
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@write_view('service')
+def api_ticket_complete(request, ticket_id):
+    """API: Mark a ticket as done"""
+    try:
+        if not complete_ticket(ticket_id):
+            return JsonResponse({'success': False, 'error': 'التذكرة غير موجودة أو مكتملة'}, status=404)
+        return JsonResponse({'success': True})
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+# ==================== Async Read API ====================
+# Async twins of the read-only views above, meant to be served through
+# ASGI (home_inn_cafe/asgi.py). Independent queries run concurrently on
+# the bounded pool in cafe/fanout.py instead of one after another.
+
+@require_http_methods(["GET"])
+@reporting_view
+async def api_statistics_async(request):
+    """API (async): Get sales statistics"""
+    try:
+        period = request.GET.get('period', 'today')
+        queries = await run_in_pool(_statistics_queries, _period_start(period))
+        results = await gather_queries(queries)
+        return JsonResponse({'success': True, **_statistics_payload(period, results)})
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@reporting_view
+async def api_orders_async(request):
+    """API (async): Get all orders with pagination and filtering"""
+    try:
+        page, per_page, orders, archived = await run_in_pool(_orders_querysets, request)
+        results = await gather_queries(_orders_queries(orders, archived, page, per_page))
+        payload = await run_in_pool(_orders_results_payload, results, archived, page, per_page)
+        if wants_columns(request):
+            payload['orders'] = columnar(payload['orders'], nested=('items',))
+        return JsonResponse({'success': True, **payload})
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@reporting_view
+async def api_order_detail_async(request, order_id):
+    """API (async): Get single order details"""
+    try:
+        order = await run_in_pool(_load_order, order_id)
+        return JsonResponse({'success': True, 'order': _serialize_order(order)})
+        
+    except ArchivedOrder.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'الطلب غير موجود'}, status=404)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@require_http_methods(["GET"])
+@reporting_view
+async def api_dashboard(request):
+    """API (async): Several dashboard sections in one round trip
+
+    ``sections`` is a comma-separated list of ``statistics`` (uses
+    ``period``), ``orders`` (latest orders; uses ``per_page``) and
+    ``heatmap`` (covers ``period``). The queries of every requested
+    section run concurrently.
+    """
+    try:
+        sections = [name for name in request.GET.get('sections', 'statistics').split(',') if name]
+        unknown = set(sections) - set(DASHBOARD_SECTIONS)
+        if unknown:
+            return JsonResponse({
+                'success': False,
+                'error': f"أقسام غير معروفة: {', '.join(sorted(unknown))}",
+            }, status=400)
+        
+        plans = await run_in_pool(_dashboard_plans, request, sections)
+        queries = {
+            f'{section}:{name}': query
+            for section, (section_queries, _) in plans.items()
+            for name, query in section_queries.items()
+        }
+        results = await gather_queries(queries)
+        
+        data = {'success': True}
+        for section, (section_queries, build_payload) in plans.items():
+            section_results = {name: results[f'{section}:{name}'] for name in section_queries}
+            data[section] = await run_in_pool(build_payload, section_results)
+        return JsonResponse(data)
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+DASHBOARD_SECTIONS = ['statistics', 'orders', 'heatmap']
+
+
+def _dashboard_plans(request, sections):
+    """Per section: its independent queries and a function building its payload"""
+    plans = {}
+    if 'statistics' in sections:
+        period = request.GET.get('period', 'today')
+        plans['statistics'] = (
+            _statistics_queries(_period_start(period)),
+            lambda results: _statistics_payload(period, results),
+        )
+    if 'orders' in sections:
+        per_page = int(request.GET.get('per_page', 10))
+        orders = Order.objects.prefetch_related('items').order_by('-created_at')
+        plans['orders'] = (
+            _orders_queries(orders, None, 1, per_page),
+            lambda results: _orders_results_payload(results, None, 1, per_page),
+        )
+    if 'heatmap' in sections:
+        start_day = timezone.localdate(_period_start(request.GET.get('period', 'today')))
+        end_day = timezone.localdate()
+        plans['heatmap'] = (
+            heatmap_queries(start_day, end_day),
+            lambda results: heatmap_payload(start_day, end_day, results, top=5),
+        )
+    return plans
+
+
+def _orders_queries(orders, archived, page, per_page):
+    """Independent queries for one orders page (the live slice is fetched speculatively)"""
+    start = (page - 1) * per_page
+    queries = {
+        'live_count': orders.count,
+        'live_page': lambda: list(orders[start:start + per_page]),
+    }
+    if archived is not None:
+        queries['archived_count'] = archived.count
+    return queries
+
+
+def _orders_results_payload(results, archived, page, per_page):
+    start = (page - 1) * per_page
+    live_count = results['live_count']
+    page_orders = _orders_page(results['live_page'], archived, live_count, start, start + per_page)
+    total_count = live_count + results.get('archived_count', 0)
+    return _orders_payload(page_orders, page, per_page, total_count)
+
+# ==================== Write Admission API ====================
+# Queue waits and rejections of the write gates; see cafe/admission.py.
+
+@require_http_methods(["GET"])
+def api_admission(request):
+    """API: Write admission metrics per database and priority class"""
+    return JsonResponse({'success': True, 'gates': admission_snapshot()})
+
+
+# ==================== Bulk Edit Helpers ====================
+
+def _json_bool(value):
+    """Only a real JSON boolean; bool("false") would be True"""
+    if not isinstance(value, bool):
+        raise TypeError('expected a boolean')
+    return value
+
+
+def _json_int(value):
+    """Only a real JSON integer; int(12.7) would be 12 and int(True) 1"""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError('expected an integer')
+    return value
+
+
+def _json_stock(value):
+    return parse_stock(None if value is None else _json_int(value))
+
+
+def _json_text(value):
+    if not isinstance(value, str):
+        raise TypeError('expected a string')
+    return value.strip()
+
+
+def _json_name(value):
+    """A non-empty string; str(None) would store the text None"""
+    value = _json_text(value)
+    if not value:
+        raise ValueError('empty name')
+    return value
+
+
+CATEGORY_BULK_FIELDS = {
+    'name': _json_name,
+    'order': _json_int,
+    'is_active': _json_bool,
+}
+
+ITEM_BULK_FIELDS = {
+    'name': _json_name,
+    'price': _json_int,
+    'description': _json_text,
+    'is_available': _json_bool,
+    'stock_quantity': _json_stock,
+    'category_id': _json_int,
+}
+
+
+def _patch_is_valid(patch):
+    """``{id: int, fields: {...}}``; anything else is reported, not raised"""
+    return (
+        isinstance(patch, dict)
+        and isinstance(patch.get('id'), int) and not isinstance(patch.get('id'), bool)
+        and isinstance(patch.get('fields') or {}, dict)
+    )
+
+
+def _patch_ids(updates):
+    return [patch['id'] for patch in updates if _patch_is_valid(patch)]
+
+
+def _apply_patches(objects, updates, allowed_fields, missing_error, known_categories=None):
+    """Apply ``[{id, fields}]`` patches to already-loaded objects.
+
+    Returns the changed objects, the union of touched field names (ready for
+    ``bulk_update``) and a compact per-row result list. Invalid rows are
+    reported and skipped; they never abort the rest of the batch.
+    """
+    changed = []
+    touched = set()
+    results = []
+
+    for patch in updates:
+        if not _patch_is_valid(patch):
+            obj_id = patch.get('id') if isinstance(patch, dict) else None
+            results.append({'id': obj_id, 'success': False, 'error': 'بيانات غير صالحة'})
+            continue
+
+        obj_id = patch['id']
+        fields = patch.get('fields') or {}
+        obj = objects.get(obj_id)
+
+        if obj is None:
+            results.append({'id': obj_id, 'success': False, 'error': missing_error})
+            continue
+
+        unknown = set(fields) - set(allowed_fields)
+        if unknown:
+            results.append({
+                'id': obj_id,
+                'success': False,
+                'error': f"حقول غير مدعومة: {', '.join(sorted(unknown))}",
+            })
+            continue
+
+        try:
+            values = {name: allowed_fields[name](value) for name, value in fields.items()}
+        except (ValueError, TypeError):
+            results.append({'id': obj_id, 'success': False, 'error': 'قيمة غير صالحة'})
+            continue
+
+        if values.get('price', 0) < 0 or values.get('order', 0) < 0:
+            results.append({'id': obj_id, 'success': False, 'error': 'قيمة غير صالحة'})
+            continue
+
+        if 'category_id' in values and values['category_id'] not in known_categories:
+            results.append({'id': obj_id, 'success': False, 'error': 'التصنيف غير موجود'})
+            continue
+
+        for name, value in values.items():
+            setattr(obj, name, value)
+        if values:
+            changed.append(obj)
+            touched.update(values)
+        results.append({'id': obj_id, 'success': True})
+
+    return changed, sorted(touched), results
+
+
 # ==================== Category Management API ====================
 
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@write_view('menu')
 def api_categories(request):
     """API: List all categories or create a new one"""
     try:
@@ -366,6 +1247,7 @@ def api_categories(request):
 
 @csrf_exempt
 @require_http_methods(["PUT", "DELETE"])
+@write_view('menu')
 def api_category_detail(request, category_id):
     """API: Update or delete a category"""
     try:
@@ -398,10 +1280,45 @@ def api_category_detail(request, category_id):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["PUT"])
+@write_view('menu')
+def api_categories_bulk(request):
+    """API: Apply a batch of category patches in one transaction"""
+    try:
+        data = json.loads(request.body)
+        updates = data.get('updates', [])
+
+        if not isinstance(updates, list):
+            return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+        if not updates:
+            return JsonResponse({'success': False, 'error': 'لا توجد تعديلات'}, status=400)
+
+        with transaction.atomic():
+            categories = Category.objects.select_for_update().in_bulk(_patch_ids(updates))
+            changed, fields, results = _apply_patches(
+                categories, updates, CATEGORY_BULK_FIELDS, 'التصنيف غير موجود'
+            )
+            if changed:
+                Category.objects.bulk_update(changed, fields)
+
+        return JsonResponse({
+            'success': True,
+            'updated': len(changed),
+            'results': results,
+        })
+
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 # ==================== Menu Items Management API ====================
 
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@write_view('menu')
 def api_items(request):
     """API: List all items or create a new one"""
     try:
@@ -421,10 +1338,14 @@ def api_items(request):
                 'description': item.description,
                 'image': item.image.url if item.image else None,
                 'is_available': item.is_available,
+                'stock_quantity': item.stock_quantity,
                 'category_id': item.category_id,
                 'category_name': item.category.name,
             } for item in items]
             
+            if wants_columns(request):
+                data = columnar(data)
+            
             return JsonResponse({'success': True, 'items': data})
         
         elif request.method == 'POST':
@@ -434,6 +1355,7 @@ def api_items(request):
             price = request.POST.get('price', 0)
             description = request.POST.get('description', '')
             is_available = request.POST.get('is_available', 'true').lower() == 'true'
+            stock_quantity = parse_stock(request.POST.get('stock_quantity'))
             image = request.FILES.get('image')
             
             category = Category.objects.get(id=category_id)
@@ -444,6 +1366,7 @@ def api_items(request):
                 price=int(price),
                 description=description,
                 is_available=is_available,
+                stock_quantity=stock_quantity,
                 image=image
             )
             
@@ -456,6 +1379,7 @@ def api_items(request):
                     'description': item.description,
                     'image': item.image.url if item.image else None,
                     'is_available': item.is_available,
+                    'stock_quantity': item.stock_quantity,
                     'category_id': item.category_id,
                 }
             })
@@ -467,6 +1391,7 @@ def api_items(request):
 
 @csrf_exempt
 @require_http_methods(["PUT", "DELETE"])
+@write_view('menu')
 def api_item_detail(request, item_id):
     """API: Update or delete a menu item"""
     try:
@@ -482,6 +1407,8 @@ def api_item_detail(request, item_id):
             item.price = int(request.POST.get('price', item.price))
             item.description = request.POST.get('description', item.description)
             item.is_available = request.POST.get('is_available', 'true').lower() == 'true'
+            if 'stock_quantity' in request.POST:
+                item.stock_quantity = parse_stock(request.POST['stock_quantity'])
             
             if 'image' in request.FILES:
                 item.image = request.FILES['image']
@@ -497,6 +1424,7 @@ def api_item_detail(request, item_id):
                     'description': item.description,
                     'image': item.image.url if item.image else None,
                     'is_available': item.is_available,
+                    'stock_quantity': item.stock_quantity,
                     'category_id': item.category_id,
                 }
             })
@@ -511,3 +1439,51 @@ def api_item_detail(request, item_id):
         return JsonResponse({'success': False, 'error': 'التصنيف غير موجود'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+@write_view('menu')
+def api_items_bulk(request):
+    """API: Apply a batch of menu item patches in one transaction"""
+    try:
+        data = json.loads(request.body)
+        updates = data.get('updates', [])
+
+        if not isinstance(updates, list):
+            return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+        if not updates:
+            return JsonResponse({'success': False, 'error': 'لا توجد تعديلات'}, status=400)
+
+        # Validate target categories up front with a single query
+        category_ids = {
+            patch['fields']['category_id'] for patch in updates
+            if _patch_is_valid(patch) and isinstance((patch.get('fields') or {}).get('category_id'), int)
+        }
+        known_categories = set(
+            Category.objects.filter(id__in=category_ids).values_list('id', flat=True)
+        )
+
+        with transaction.atomic():
+            items = MenuItem.objects.select_for_update().in_bulk(_patch_ids(updates))
+            changed, fields, results = _apply_patches(
+                items, updates, ITEM_BULK_FIELDS, 'الصنف غير موجود',
+                known_categories=known_categories,
+            )
+            if changed:
+                # bulk_update() bypasses save(), so keep auto_now in step by hand
+                now = timezone.now()
+                for item in changed:
+                    item.updated_at = now
+                MenuItem.objects.bulk_update(changed, fields + ['updated_at'])
+
+        return JsonResponse({
+            'success': True,
+            'updated': len(changed),
+            'results': results,
+        })
+
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'بيانات غير صالحة'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -0,0 +1,15 @@
+"""
+ASGI config for Home Inn Cafe project.
+
+Serves the async views (cafe.views.api_*_async, api_dashboard and the
+kitchen feed) natively. ``python manage.py serve`` runs it with uvicorn;
+by hand: uvicorn home_inn_cafe.asgi:application --host 0.0.0.0 --port 8000
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'home_inn_cafe.settings')
+
+application = get_asgi_application()
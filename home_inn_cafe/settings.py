@@ -27,7 +27,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cafe.responses.CompressionMiddleware',  # gzip, or Brotli for JSON if the brotli package is installed
     'django.middleware.security.SecurityMiddleware',
+    'cafe.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,15 +57,25 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'home_inn_cafe.wsgi.application'
+ASGI_APPLICATION = 'home_inn_cafe.asgi.application'
 
 # Database
+# 'reporting' is a read-only connection to the same file, used by the
+# statistics/order-search views and admin changelists (see cafe/routers.py)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    'reporting': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': (BASE_DIR / 'db.sqlite3').as_uri() + '?mode=ro',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['cafe.routers.ReportingRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -102,3 +114,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Cafe Information
 CAFE_NAME = 'هوم إن كافيه'
 CAFE_NAME_EN = 'Home Inn Cafe'
+
+# Worker threads for concurrent queries in the async read API (cafe/fanout.py)
+CAFE_QUERY_WORKERS = 4
+
+# Branch replication (see: python manage.py sync_branch)
+BRANCH_CODE = 'main'
+HEAD_OFFICE_URL = ''  # e.g. 'http://head-office:8000'; empty disables syncing
+SYNC_TOKEN = ''  # shared secret; the head office rejects ingest while empty
+
+# Database backups (see: python manage.py backup_db)
+BACKUP_DIR = BASE_DIR / 'backups'
+BACKUP_KEEP = 14
+
+# Per-request profiling (header from: python manage.py profile_token, or the
+# toggle on the admin's profile captures page)
+CAFE_PROFILE_BUFFER = 50  # captures kept
+CAFE_PROFILE_MAX_AGE = 3600  # seconds a token/toggle stays valid
+
+# Batch receipt reprints (GET /api/orders/receipts/, rendered by cafe/printer.py)
+CAFE_RECEIPT_WORKERS = 2  # rendering processes; 1 renders inside the request thread
+CAFE_RECEIPT_FONT = ''  # TTF with Arabic glyphs; empty tries Tahoma/Arial/DejaVu
+
+# Write admission (cafe/admission.py): writers let into each database at once,
+# and per priority class the queue length and seconds a request may wait
+# before it gets a 503 with Retry-After. Metrics: GET /api/admission/
+CAFE_WRITE_ADMISSION = {
+    'slots': 1,  # SQLite has a single writer
+    'queue': {'checkout': 32, 'service': 16, 'menu': 4},
+    'wait': {'checkout': 10, 'service': 5, 'menu': 2},
+}